@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Measures Cube.encode_state throughput against the original
+# nested-loop edge/corner search
+# ----------------------------------------------------------
+import heykube
+import random
+import time
+
+# ----------------------------------------------------------
+# Original edge/corner search, kept for reference
+# ----------------------------------------------------------
+def legacy_find_cubies(cube):
+
+    edge_orient = 0
+    edge_cubies = [-1]*12
+    for loop1 in range(12):
+        edgePiece = cube.state[int(cube.EdgePairs[loop1][0])]
+        edge_orient <<= 1
+        for loop2 in range(12):
+            for loop3 in range(2):
+                if edgePiece == int(cube.EdgePairs[loop2][loop3]):
+                    edge_cubies[loop1] = loop2
+                    edge_orient += loop3
+            if edge_cubies[loop1] >= 0:
+                break
+
+    corner_orient = 0
+    corner_cubies = [-1]*8
+    for loop1 in range(8):
+        cornerPiece = cube.state[int(cube.CornerSets[loop1][0])]
+        corner_orient *= 3
+        for loop2 in range(8):
+            for loop3 in range(3):
+                if cornerPiece == int(cube.CornerSets[loop2][loop3]):
+                    corner_cubies[loop1] = loop2
+                    corner_orient += loop3
+            if corner_cubies[loop1] >= 0:
+                break
+
+    # same permutation encoding as encode_state
+    edge_perm = cube.encodePerm(edge_cubies)
+    corner_perm = cube.encodePerm(corner_cubies)
+    return (edge_perm, edge_orient, corner_perm, corner_orient)
+
+def run_benchmark(name, encoder, cubes):
+    start_time = time.perf_counter()
+    for cube in cubes:
+        encoder(cube)
+    run_time = time.perf_counter() - start_time
+    print('{:>10} : {:8.2f} us per encode, {:10.0f} encodes/sec'.format(name, 1e6*run_time/len(cubes), len(cubes)/run_time))
+
+if __name__ == '__main__':
+
+    # random cube states
+    random.seed(0)
+    cubes = list()
+    for loop1 in range(5000):
+        moves = heykube.Moves()
+        moves.randomize(25)
+        cube = heykube.Cube()
+        cube.apply_moves(moves)
+        cubes.append(cube)
+
+    run_benchmark('legacy', legacy_find_cubies, cubes)
+    run_benchmark('encode', heykube.Cube.encode_state, cubes)
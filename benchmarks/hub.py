@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Compares one thread per cube with the shared heykube_hub
+# loop, using a simulated BLE client so no cubes are needed.
+# Reports CPU use and notification latency vs number of cubes
+# ----------------------------------------------------------
+import heykube
+import sys
+import queue
+import asyncio
+import threading
+import time
+
+btle_module = sys.modules['heykube.heykube_btle']
+
+# time between simulated moves on each cube
+move_interval = 0.1
+
+class SimulatedClient():
+    """Stands in for BleakClient, sends a CubeState notification every move_interval"""
+
+    def __init__(self, address, loop=None):
+        self.address = address
+        self.is_connected = False
+        self.send_times = dict()
+
+    async def connect(self):
+        self.is_connected = True
+
+    def set_disconnected_callback(self, callback):
+        pass
+
+    async def disconnect(self):
+        self.is_connected = False
+        self.task.cancel()
+
+    async def read_gatt_char(self, uuid):
+        return bytearray(23)
+
+    async def write_gatt_char(self, uuid, data, response=False):
+        pass
+
+    async def start_notify(self, uuid, callback):
+        self.task = asyncio.get_event_loop().create_task(self.send_moves(callback))
+
+    async def stop_notify(self, uuid):
+        self.task.cancel()
+
+    async def send_moves(self, callback):
+        seq_num = 0
+        while True:
+            await asyncio.sleep(move_interval)
+            seq_num = (seq_num + 1) & 0xff
+            self.send_times[seq_num] = time.perf_counter()
+            callback(19, bytearray([0]*9 + [8, 0, seq_num] + [0]*11))
+
+class SimulatedDevice():
+    def __init__(self, index):
+        self.address = 'SIM-{}'.format(index)
+        self.name = 'HEYKUBE-SIM{}'.format(index)
+
+def track_cube(connection, latency, stop_time):
+    """Receives notifications until stop_time, and records the latency"""
+    while time.perf_counter() < stop_time:
+        try:
+            field, data, receive_time = connection.notify_queue.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        latency.append(time.perf_counter() - connection.client.send_times[data[11]])
+
+def run_benchmark(num_cubes, use_hub, run_time=3.0):
+
+    hub = heykube.heykube_hub() if use_hub else None
+    connections = list()
+    for loop1 in range(num_cubes):
+        connection = hub.add_connection() if hub else btle_module.heykube_btle()
+        connection.connect(SimulatedDevice(loop1))
+        connection.subscribe('CubeState')
+        connections.append(connection)
+
+    # one tracker per cube, same for both modes
+    latency = list()
+    stop_time = time.perf_counter() + run_time
+    trackers = [threading.Thread(target=track_cube, args=(connection, latency, stop_time)) for connection in connections]
+
+    start_cpu = time.process_time()
+    start_threads = threading.active_count()
+    for tracker in trackers:
+        tracker.start()
+    for tracker in trackers:
+        tracker.join()
+    cpu = (time.process_time() - start_cpu)/run_time
+
+    for connection in connections:
+        connection.disconnect()
+    if hub:
+        hub.close()
+
+    latency.sort()
+    print('{:>6} {:5d} cubes : {:3d} threads, {:5.1f}% CPU, latency median {:6.2f} ms, p99 {:6.2f} ms'.format(
+        'hub' if use_hub else 'thread', num_cubes, start_threads, 100*cpu,
+        1e3*latency[len(latency)//2], 1e3*latency[int(0.99*len(latency))]))
+
+if __name__ == '__main__':
+
+    btle_module.BleakClient = SimulatedClient
+    for num_cubes in [1, 8, 32, 64]:
+        run_benchmark(num_cubes, use_hub=False)
+        run_benchmark(num_cubes, use_hub=True)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Throughput of the MoveIngest pipeline, rebuilding the state
+# after every move of many interleaved sessions. Records are
+# generated on the fly, so memory stays flat
+# ----------------------------------------------------------
+from heykube.ingest import MoveIngest
+import tracemalloc
+import random
+import time
+
+face_moves = [0, 1, 2, 3, 4, 5, 8, 9, 10, 11, 12, 13]
+
+def generate_records(num_sessions, num_records):
+    """Yields wait_for_cube_state() style records, 1-4 new moves each"""
+    seq_nums = [0]*num_sessions
+    for loop1 in range(num_records):
+        session = random.randrange(num_sessions)
+        moves = [random.choice(face_moves) for loop2 in range(random.randint(1, 4))]
+        seq_nums[session] = (seq_nums[session] + len(moves)) & 0xff
+        yield session, seq_nums[session], moves, loop1*0.01
+
+def run_benchmark(num_sessions, num_records, encode):
+
+    ingest = MoveIngest()
+    start_time = time.perf_counter()
+    for item in ingest.process(generate_records(num_sessions, num_records), encode):
+        pass
+    run_time = time.perf_counter() - start_time
+
+    num_moves = ingest.get_stats()['moves']
+    print('{:6d} sessions, {:>7s} : {:8d} moves in {:5.2f} s, {:6.2f} M moves/min'.format(
+        num_sessions, 'encoded' if encode else 'states', num_moves, run_time, 60e-6*num_moves/run_time))
+
+def peak_memory(num_sessions, num_records):
+    """Peak traced memory in MB, should not grow with num_records"""
+    tracemalloc.start()
+    for item in MoveIngest().process(generate_records(num_sessions, num_records)):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak/2**20
+
+if __name__ == '__main__':
+
+    for num_sessions in [100, 10000]:
+        for encode in [False, True]:
+            run_benchmark(num_sessions, 200000, encode)
+
+    for num_records in [20000, 200000]:
+        print('peak memory for {:6d} records, 1000 sessions : {:5.2f} MB'.format(num_records, peak_memory(1000, num_records)))
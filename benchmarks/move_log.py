@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Compares the columnar move log with the text archive
+# (str(Moves) and the timestamps, one session per line)
+# in file size and time to parse every session
+# ----------------------------------------------------------
+import heykube
+from heykube.move_log import MoveLogWriter, read_move_log
+import tempfile
+import random
+import time
+import os
+
+def make_sessions(num_sessions, moves_per_session):
+    sessions = list()
+    for loop1 in range(num_sessions):
+        moves = heykube.Moves()
+        moves.randomize(moves_per_session)
+        timestamps = list()
+        timestamp = 0.0
+        for loop2 in range(moves_per_session):
+            # mostly quick turns, with the odd pause
+            timestamp += round(512*random.expovariate(1/0.15))/512.0
+            timestamps.append(timestamp)
+        sessions.append(('session{}'.format(loop1), moves, timestamps))
+    return sessions
+
+def write_text(file_name, sessions):
+    with open(file_name, 'w') as fh:
+        for name, moves, timestamps in sessions:
+            fh.write('{}\t{}\t{}\n'.format(name, moves, ' '.join('{:.3f}'.format(val) for val in timestamps)))
+
+def read_text(file_name):
+    with open(file_name) as fh:
+        for line in fh:
+            name, moves, timestamps = line.rstrip('\n').split('\t')
+            yield name, heykube.Moves(moves).to_list(), [float(val) for val in timestamps.split()]
+
+if __name__ == '__main__':
+
+    sessions = make_sessions(2000, 300)
+    num_moves = sum(len(val[1]) for val in sessions)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        text_name = os.path.join(temp_dir, 'sessions.txt')
+        log_name = os.path.join(temp_dir, 'sessions.hkmoves')
+
+        write_text(text_name, sessions)
+        with MoveLogWriter(log_name) as writer:
+            for name, moves, timestamps in sessions:
+                writer.write_session(name, moves, timestamps)
+
+        for label, file_name, reader in [('text', text_name, read_text), ('move log', log_name, read_move_log)]:
+            start_time = time.perf_counter()
+            parsed = sum(len(moves) for name, moves, timestamps in reader(file_name))
+            run_time = time.perf_counter() - start_time
+            print('{:8s} : {:9d} bytes, {:5.2f} bytes/move, parsed {} moves in {:6.3f} s ({:6.2f} M moves/s)'.format(
+                label, os.path.getsize(file_name), os.path.getsize(file_name)/num_moves, parsed, run_time, 1e-6*parsed/run_time))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Compares the single-pass move parser with the original
+# Moves.add_moves string parser on long move logs
+# ----------------------------------------------------------
+import heykube
+from heykube.heykube import parse_moves
+import random
+import time
+
+# ----------------------------------------------------------
+# Original Moves.add_moves string parser, kept for reference
+# ----------------------------------------------------------
+def legacy_parse_moves(move_str):
+
+    moves = heykube.Moves()
+    move_list = list()
+
+    # pad to check for 2x notation
+    move_str += '  '
+
+    # Deal with groupings
+    while True:
+        group_start = move_str.find('(')
+        if group_start == -1:
+            break
+        group_end = move_str.find(')')
+        rot_group = move_str[group_start+1:group_end]
+
+        # Double the group
+        if move_str[group_end+1] == '2':
+            rot_group += ' '
+            rot_group += rot_group
+            group_end += 1
+        elif move_str[group_end+1] == '3':
+            rot_group += ' '
+            rot_group += rot_group + rot_group
+            group_end += 1
+
+        # Rebuild string
+        move_str = move_str[0:group_start] + rot_group + move_str[group_end+1:]
+
+    str_index = 0
+    while str_index < len(move_str):
+
+        if move_str[str_index] == ' ':
+            str_index += 1
+            continue
+
+        if move_str[str_index] in moves.FaceRotations:
+            table = None
+        elif move_str[str_index] in moves.DoubleFaceRotations:
+            table = moves.DoubleFaceRotations
+        elif move_str[str_index] in moves.CenterRotations:
+            table = moves.CenterRotations
+        else:
+            str_index += 1
+            continue
+
+        # Get move
+        next_val = move_str[str_index]
+        str_index += 1
+
+        num_moves = 1
+        if move_str[str_index] == '2':
+            num_moves = 2
+            str_index += 1
+        elif move_str[str_index] == '3':
+            num_moves = 3
+            str_index += 1
+        if move_str[str_index] == "'":
+            next_val += "'"
+            str_index += 1
+
+        for loop1 in range(num_moves):
+            if table is None:
+                move_list.append(next_val)
+            else:
+                move_list.extend(table[next_val])
+
+    return move_list
+
+# ----------------------------------------------------------
+# Build a long move log
+# ----------------------------------------------------------
+def build_move_log(num_tokens):
+    tokens = ['U', 'L', 'F', 'R', 'B', 'D', 'u', 'r', 'M', 'E', 'x', 'y']
+    suffix = ['', "'", '2', "2'"]
+    log = list()
+    for loop1 in range(num_tokens):
+        token = random.choice(tokens) + random.choice(suffix)
+        if random.random() < 0.05:
+            token = '(R U R\' U\'){}'.format(random.choice([2, 3]))
+        log.append(token)
+    return ' '.join(log)
+
+def run_benchmark(name, parser, move_str, num_runs):
+    start_time = time.perf_counter()
+    for loop1 in range(num_runs):
+        move_list = parser(move_str)
+    run_time = (time.perf_counter() - start_time) / num_runs
+    print('{:>10} : {:8.2f} ms per log, {:10.0f} moves/sec'.format(name, 1e3*run_time, len(move_list)/run_time))
+    return move_list
+
+if __name__ == '__main__':
+
+    random.seed(0)
+    for num_tokens in [100, 1000, 10000]:
+        move_str = build_move_log(num_tokens)
+        print('Move log with {} tokens'.format(num_tokens))
+
+        legacy = run_benchmark('legacy', legacy_parse_moves, move_str, 20)
+        parsed = run_benchmark('parser', parse_moves, move_str, 20)
+
+        # both parsers must agree
+        if [heykube.Moves.FaceRotations[val] for val in legacy] != parsed:
+            print('ERROR - parsers do not match')
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Measures heykube_btle.notification_handler on a synthetic
+# stream of notifications, against the original handler that
+# ran a regex on every BlueZ sender path
+# ----------------------------------------------------------
+import heykube
+import sys
+import re
+import time
+
+btle_module = sys.modules['heykube.heykube_btle']
+
+# ----------------------------------------------------------
+# Original handler, kept for reference
+# ----------------------------------------------------------
+def legacy_notification_handler(self, sender, data):
+
+    try:
+        self.logger.info('Notification from {}'.format(sender))
+
+        # Handle both int and characteristics list
+        sender_id = 0
+        if isinstance(sender, int):
+            sender_id = sender
+        else:
+            m = re.search('service000c\/char([0-9A-Fa-f]+)', sender)
+            if m:
+                sender_id = int(m.group(1),16)
+                self.logger.info('Convert notification to {}'.format(sender_id))
+
+        if sender_id in self.char_handles:
+            field = self.char_handles[sender_id]
+            self.notify_queue.put([field, list(data)])
+
+    except:
+        self.logger.exception('Bad notification from {}'.format(sender))
+
+def run_benchmark(name, handler, senders, data):
+    # nothing reads the queue, so drop instead of blocking
+    connection = btle_module.heykube_btle(notify_policy='drop_oldest')
+    start_time = time.perf_counter()
+    for sender in senders:
+        handler(connection, sender, data)
+    run_time = time.perf_counter() - start_time
+    print('{:>8} {:>6} : {:6.2f} us per notification, {:9.0f} notifications/sec'.format(
+        name, 'int' if isinstance(senders[0], int) else 'path', 1e6*run_time/len(senders), len(senders)/run_time))
+
+if __name__ == '__main__':
+
+    num_notifications = 200000
+    data = bytearray(23)
+
+    # BlueZ characteristic paths, and integer handles
+    path = '/org/bluez/hci0/dev_FC_AE_7C_F7_28_F1/service000c/char0013'
+    for senders in [[path]*num_notifications, [19]*num_notifications]:
+        run_benchmark('legacy', legacy_notification_handler, senders, data)
+        run_benchmark('resolved', btle_module.heykube_btle.notification_handler, senders, data)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Regression benchmark for the decode/notification path.
+# Records a heykube_sim session once, then replays it as
+# fast as possible through heykube()
+# ----------------------------------------------------------
+import heykube
+import tempfile
+import time
+import os
+
+def record_session(file_name, num_moves):
+    # nothing reads the notifications while recording, the log keeps them all
+    sim = heykube.heykube_sim(notify_policy='drop_oldest')
+    cube = heykube.heykube(sim)
+    cube.connect(sim.device)
+    sim.start_recording(file_name)
+    cube.read_cube_state()
+    cube.enable_notifications(['CubeState'])
+    cube.enable_notifications(['solution', 'move'])
+    sim.play_moves(num_moves, rate=None, wait=True)
+    sim.stop_recording()
+    cube.disconnect()
+
+def replay_session(file_name, use_handlers):
+    """Returns the seconds to follow every move of the session"""
+
+    cube = heykube.heykube(heykube.heykube_replay(file_name, speed=None))
+    if use_handlers:
+        cube.add_handler('CubeState', lambda event, value: None)
+        cube.add_handler('move', lambda event, value: None)
+
+    start_time = time.perf_counter()
+    cube.connect(cube.connectivity.device)
+    cube.read_cube_state()
+    prev_seq_num = None
+    while True:
+        num_moves, status = cube.wait_for_cube_state(prev_seq_num, timeout=0.01)
+        if 'seq_num' in status:
+            prev_seq_num = status['seq_num']
+        elif cube.connectivity.wait_for_replay(0) and cube.notify_queue.empty():
+            break
+    # decode the final state too
+    cube.cube
+    run_time = time.perf_counter() - start_time
+    cube.disconnect()
+    return run_time
+
+if __name__ == '__main__':
+
+    num_moves = 20000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, 'session.hklog')
+        record_session(file_name, num_moves)
+        print('{} moves recorded, {:.1f} bytes per move'.format(num_moves, os.path.getsize(file_name)/num_moves))
+
+        for use_handlers in [False, True]:
+            run_time = replay_session(file_name, use_handlers)
+            print('replay {:14s} : {:8.0f} moves/s, {:6.2f} us per move'.format(
+                'with handlers' if use_handlers else 'queue only', num_moves/run_time, 1e6*run_time/num_moves))
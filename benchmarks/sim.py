@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# End-to-end notification throughput and latency through
+# heykube(), with heykube_sim cubes playing random moves
+# ----------------------------------------------------------
+import heykube
+import threading
+import time
+
+def track_cube(cube, num_moves, results):
+    """Follows the moves with wait_for_cube_state() until num_moves are seen"""
+    seen = 0
+    prev_seq_num = None
+    while seen < num_moves:
+        new_moves, status = cube.wait_for_cube_state(prev_seq_num, timeout=1.0)
+        if 'seq_num' not in status:
+            break
+        seen += new_moves
+        prev_seq_num = status['seq_num']
+    results.append(seen)
+
+def run_benchmark(num_cubes, rate, num_moves=500):
+
+    cubes = list()
+    for loop1 in range(num_cubes):
+        cube = heykube.heykube(heykube.heykube_sim(notify_policy='coalesce'))
+        cube.connect(cube.connectivity.device)
+        cube.enable_notifications(['CubeState'])
+        cubes.append(cube)
+
+    results = list()
+    trackers = [threading.Thread(target=track_cube, args=(cube, num_moves, results)) for cube in cubes]
+    for tracker in trackers:
+        tracker.start()
+
+    start_time = time.perf_counter()
+    start_cpu = time.process_time()
+    for cube in cubes:
+        cube.connectivity.play_moves(num_moves, rate=rate)
+    for tracker in trackers:
+        tracker.join()
+    run_time = time.perf_counter() - start_time
+    cpu = (time.process_time() - start_cpu)/run_time
+
+    # merge the latency of all the cubes
+    latency = sorted(val for cube in cubes for val in cube.notify_latency)
+    coalesced = sum(cube.notify_queue.coalesced for cube in cubes)
+    for cube in cubes:
+        cube.disconnect()
+
+    print('{:4d} cubes at {:5d} moves/s : {:8.0f} moves/s total, {:5.1f}% CPU, latency median {:6.3f} ms, p99 {:6.3f} ms, {} coalesced'.format(
+        num_cubes, rate, sum(results)/run_time, 100*cpu,
+        1e3*latency[len(latency)//2], 1e3*latency[int(0.99*len(latency))], coalesced))
+
+if __name__ == '__main__':
+
+    for num_cubes in [1, 8, 32]:
+        for rate in [10, 100, 1000]:
+            run_benchmark(num_cubes, rate, num_moves=max(50, rate*2))
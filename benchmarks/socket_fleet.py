@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Drives a fleet of client processes against heykube_server
+# on localhost, to find where the notification rate saturates.
+# Each process follows its cubes with wait_for_cube_state()
+# ----------------------------------------------------------
+import heykube
+import multiprocessing
+import threading
+import argparse
+import time
+
+def track_cube(address, device, run_time, results):
+    cube = heykube.heykube(heykube.heykube_socket(address))
+    if not cube.connect(device):
+        return
+    cube.enable_notifications(['CubeState'])
+
+    seen = 0
+    prev_seq_num = None
+    stop_time = time.perf_counter() + run_time
+    while time.perf_counter() < stop_time:
+        new_moves, status = cube.wait_for_cube_state(prev_seq_num, timeout=0.5)
+        if 'seq_num' in status:
+            seen += new_moves
+            prev_seq_num = status['seq_num']
+
+    # request round trip, while the cubes are still moving
+    start_time = time.perf_counter()
+    for loop1 in range(20):
+        cube.read_cube('CubeState')
+    read_time = (time.perf_counter() - start_time)/20
+
+    results.append((seen, read_time, list(cube.notify_latency)))
+    cube.disconnect()
+
+def run_client(address, devices, run_time, result_queue):
+    """One client process, one thread per cube"""
+    results = list()
+    trackers = [threading.Thread(target=track_cube, args=(address, device, run_time, results)) for device in devices]
+    for tracker in trackers:
+        tracker.start()
+    for tracker in trackers:
+        tracker.join()
+    result_queue.put(results)
+
+def run_benchmark(address, num_cubes, num_processes, rate, run_time=3.0):
+
+    server = multiprocessing.Process(target=heykube.heykube_server(num_cubes, rate, int(rate*(run_time+5))).run, args=(address,), daemon=True)
+    server.start()
+    time.sleep(0.5)
+
+    # spread the cubes over the client processes
+    devices = heykube.heykube_socket(address).scan()
+    result_queue = multiprocessing.Queue()
+    clients = [multiprocessing.Process(target=run_client, args=(address, devices[loop1::num_processes], run_time, result_queue))
+               for loop1 in range(num_processes)]
+    for client in clients:
+        client.start()
+    results = [val for client in clients for val in result_queue.get()]
+    for client in clients:
+        client.join()
+    server.terminate()
+    server.join()
+
+    moves = sum(val[0] for val in results)
+    read_time = sorted(val[1] for val in results)
+    latency = sorted(x for val in results for x in val[2])
+    print('{:4d} cubes, {:2d} processes, {:5.0f} moves/s each : {:8.0f} moves/s of {:8.0f}, read {:6.3f} ms, notify latency median {:6.3f} ms, p99 {:6.3f} ms'.format(
+        num_cubes, num_processes, rate, moves/run_time, num_cubes*rate, 1e3*read_time[len(read_time)//2],
+        1e3*latency[len(latency)//2], 1e3*latency[int(0.99*len(latency))]))
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Fleet benchmark against a local heykube_server')
+    parser.add_argument('-u', "--unix", action='store', type=str, help="Unix socket path, otherwise TCP on localhost")
+    parser.add_argument('-r', "--rate", action='store', type=float, default=20.0, help="Moves per second for each cube")
+    args = parser.parse_args()
+    address = args.unix if args.unix else ('127.0.0.1', 9524)
+
+    for num_cubes, num_processes in [(8, 1), (32, 4), (128, 8), (256, 8)]:
+        run_benchmark(address, num_cubes, num_processes, args.rate)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+# ----------------------------------------------------------
+# Measures two-phase Solver throughput on random states
+# ----------------------------------------------------------
+import heykube
+import logging
+import random
+import time
+
+if __name__ == '__main__':
+
+    logging.basicConfig()
+
+    # load (or generate once) the tables
+    start_time = time.perf_counter()
+    solver = heykube.Solver()
+    print('Table load: {:.2f} sec'.format(time.perf_counter() - start_time))
+
+    # random cube states
+    random.seed(0)
+    cubes = list()
+    for loop1 in range(50):
+        moves = heykube.Moves()
+        moves.randomize(40)
+        cube = heykube.Cube()
+        cube.apply_moves(moves)
+        cubes.append(cube)
+
+    # solve them, stopping at the first solution of at most target_length face turns
+    target_length = 22
+    num_moves = 0
+    num_solved = 0
+    start_time = time.perf_counter()
+    for cube in cubes:
+        solution = solver.solve(cube, target_length=target_length)
+        if solution is not None:
+            num_moves += len(solution)
+            num_solved += 1
+    run_time = time.perf_counter() - start_time
+
+    print('Solved {} of {} states'.format(num_solved, len(cubes)))
+    print('{:8.1f} ms per solve, {:6.2f} solves/sec, {:.1f} quarter turns on average'.format(
+        1e3*run_time/len(cubes), len(cubes)/run_time, num_moves/max(num_solved, 1)))
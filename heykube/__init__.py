@@ -4,3 +4,17 @@ from .heykube import Moves
 from .heykube import Match
 from .heykube import Facelet
 from .heykube import Cube
+from .heykube import CubeKey
+from .heykube import CubeStateFrame
+from .heykube_async import AsyncHeyKube
+from .heykube_hub import heykube_hub
+from .heykube_transport import heykube_transport
+from .heykube_sim import heykube_sim
+from .heykube_socket import heykube_socket
+from .heykube_socket import heykube_server
+from .heykube_replay import heykube_replay
+from .cube_batch import CubeBatch
+from .solver import Solver
+from .table_store import TableStore
+from .move_log import MoveLogWriter
+from .ingest import MoveIngest
@@ -0,0 +1,145 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube import Cube, Cube_Color, compose_move_sequence
+from heykube.heykube import edge_locations, facelet_edge, facelet_edge_orient
+from heykube.heykube import corner_locations, facelet_corner, facelet_corner_orient
+
+# numpy is optional, only needed for CubeBatch
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# -------------------------------------------------------
+# Holds many cube states as a 2-D array, and runs the
+# same moves/checks on all of them at once
+# -------------------------------------------------------
+class CubeBatch():
+    """Holds N cube states as an N x 54 uint8 array
+
+Moves, solved checks, matches and the 11-byte state encoding
+all operate on the whole batch at once. Requires numpy"""
+
+    def __init__(self, states=1):
+
+        if np is None:
+            raise ImportError('CubeBatch requires numpy, install it with pip3 install numpy')
+
+        # number of solved cubes
+        if isinstance(states, int):
+            self.states = np.tile(np.arange(54, dtype=np.uint8), (states, 1))
+        # list of Cube() objects
+        elif len(states) and isinstance(states[0], Cube):
+            self.states = np.array([cube.state for cube in states], dtype=np.uint8)
+        # list or array of facelet states
+        else:
+            self.states = np.array(states, dtype=np.uint8).reshape(-1, 54)
+
+    def __len__(self):
+        return self.states.shape[0]
+
+    def __getitem__(self, index):
+        cube = Cube()
+        cube.state = self.states[index].tolist()
+        return cube
+
+    def to_cubes(self):
+        """Returns a list of Cube() objects for the batch"""
+        return [self[loop1] for loop1 in range(len(self))]
+
+    def apply_moves(self, moves):
+        """Applies the same moves to every cube in the batch"""
+
+        # compose into a single permutation and gather all the states
+        _, perm = compose_move_sequence(moves)
+        self.states = self.states[:, np.frombuffer(perm, dtype=np.uint8)]
+
+    def is_solved(self):
+        """Returns a bool array, True where the cube is solved"""
+        return np.all(self.states == np.arange(54, dtype=np.uint8), axis=1)
+
+    def test_match(self, match):
+        """Returns a bool array, True where the cube matches the Match() object"""
+
+        match_colors = np.array([val.value for val in match.match_state], dtype=np.uint8)
+        care = match_colors != Cube_Color.DontCare.value
+
+        colors = self.states[:, care] // 9
+        return np.all(colors == match_colors[care], axis=1)
+
+    def encode_state(self):
+        """Returns the 11-byte encoding of every state as an N x 11 uint8 array
+matching Cube.encode_state()"""
+
+        num_cubes = len(self)
+        cstate = np.zeros((num_cubes, 11), dtype=np.int64)
+
+        # get the edge pieces and orientation
+        edge_pieces = self.states[:, edge_locations]
+        edge_perm = np.array(facelet_edge)[edge_pieces]
+        edge_orients = np.array(facelet_edge_orient)[edge_pieces]
+        edge_orient = np.zeros(num_cubes, dtype=np.int64)
+        for loop1 in range(12):
+            edge_orient = (edge_orient << 1) + edge_orients[:, loop1]
+
+        # encode the edges
+        encode = _encode_perm(edge_perm) & 0x1fffffff
+        for loop1 in range(4):
+            cstate[:, loop1] = encode & 0xff
+            encode >>= 8
+        cstate[:, 3] |= (edge_orient & 0x7) << 5
+        edge_orient >>= 3
+        cstate[:, 4] = edge_orient & 0xff
+        edge_orient >>= 8
+        cstate[:, 5] = edge_orient & 0x1
+
+        # get the corner pieces and orientation
+        corner_pieces = self.states[:, corner_locations]
+        corner_perm = np.array(facelet_corner)[corner_pieces]
+        corner_orients = np.array(facelet_corner_orient)[corner_pieces]
+        corner_orient = np.zeros(num_cubes, dtype=np.int64)
+        for loop1 in range(8):
+            corner_orient = corner_orient*3 + corner_orients[:, loop1]
+
+        # encode the corners
+        encode = _encode_perm(corner_perm) & 0xffff
+        cstate[:, 5] |= (encode & 0x7f) << 1
+        encode >>= 7
+        cstate[:, 6] = encode & 0xff
+        encode >>= 8
+        cstate[:, 7] = encode & 0x1
+        cstate[:, 7] |= (corner_orient & 0x7f) << 1
+        corner_orient >>= 7
+        cstate[:, 8] = corner_orient & 0x3f
+
+        # puzzle orientation is always U, L
+        cstate[:, 9] = 0x8
+
+        return cstate.astype(np.uint8)
+
+def _encode_perm(a):
+    """Vectorized version of Cube.encodePerm over the rows of a"""
+
+    n = a.shape[1]
+    r = np.zeros(a.shape[0], dtype=np.int64)
+    for loop1 in range(n):
+        # number of smaller entries already used
+        smaller = np.zeros(a.shape[0], dtype=np.int64)
+        for loop2 in range(loop1):
+            smaller += a[:, loop2] < a[:, loop1]
+        r = r*(n - loop1) + a[:, loop1] - smaller
+    return r
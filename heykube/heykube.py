@@ -15,13 +15,18 @@
 # 
 # ========================================
 from heykube import heykube_btle
+from heykube.permutation import rotation_table, is_valid_move, compose_moves, apply_permutation
 from enum import Enum
-from queue import Queue
+from queue import Queue, Empty
+from collections import deque
 import time
 import random
 import math
 import logging
 import json
+import functools
+from array import array
+import re
 
 # -------------------------------------------------
 # -------------------------------------------------
@@ -349,59 +354,59 @@ class Moves():
     """Defines the moves for HEYKUBE and translates
 betwen cubing notication U|L|F|R|B|D and the HEYKUBE index"""
 
-    def __init__(self, move_str=''):
-        self.move_list = list()
-        self.move_index = 0
-
-        # Define the direct face rotations and indices 
-        self.FaceRotations = {
-            "U"  : 0,  "L"  : 1,
-            "F"  : 2,  "R"  : 3, 
-            "B"  : 4,  "D"  : 5,
-            "U'" : 8,  "L'" : 9,
-            "F'" : 10, "R'" : 11, 
-            "B'" : 12, "D'" : 13,
-            # change orientation
-            "x"  : 16, "y"  : 17, "z"  : 18,
-            "x'" : 24, "y'" : 25, "z'" : 26,
-        }
-        self.InvFaceRotations = dict((self.FaceRotations[k], k) for k in self.FaceRotations)
-
-        # setup dual face rotaions
-        self.DoubleFaceRotations = {
-            "u"  : ["D",  "y"],
-            "l"  : ["R",  "x'"],
-            "f"  : ["B",  "z"],
-            "r"  : ["L",  "x"],
-            "b"  : ["F",  "z'"],
-            "d"  : ["U",  "y'"],
-            "u'" : ["D'", "y'"],
-            "l'" : ["R'", "x"],
-            "f'" : ["B'", "z'"],
-            "r'" : ["L'", "x'"],
-            "b'" : ["F'", "z"],
-            "d'" : ["U'", "y"]
-        }
-
-        # setup dual face rotaions
-        self.CenterRotations = {
-            "M"   : ["x'", "L'", "R"],
-            "E"   : ["y'", "U",  "D'"],
-            "S"   : ["z",  "F'", "B"],
-            "M'"  : ["x",  "L",  "R'"],
-            "E'"  : ["y",  "U'", "D"],
-            "S'"  : ["z'", "F",  "B'"],
-        }
+    # Define the direct face rotations and indices 
+    FaceRotations = {
+        "U"  : 0,  "L"  : 1,
+        "F"  : 2,  "R"  : 3, 
+        "B"  : 4,  "D"  : 5,
+        "U'" : 8,  "L'" : 9,
+        "F'" : 10, "R'" : 11, 
+        "B'" : 12, "D'" : 13,
+        # change orientation
+        "x"  : 16, "y"  : 17, "z"  : 18,
+        "x'" : 24, "y'" : 25, "z'" : 26,
+    }
+    InvFaceRotations = dict((v, k) for k, v in FaceRotations.items())
+
+    # setup dual face rotaions
+    DoubleFaceRotations = {
+        "u"  : ["D",  "y"],
+        "l"  : ["R",  "x'"],
+        "f"  : ["B",  "z"],
+        "r"  : ["L",  "x"],
+        "b"  : ["F",  "z'"],
+        "d"  : ["U",  "y'"],
+        "u'" : ["D'", "y'"],
+        "l'" : ["R'", "x"],
+        "f'" : ["B'", "z'"],
+        "r'" : ["L'", "x'"],
+        "b'" : ["F'", "z"],
+        "d'" : ["U'", "y"]
+    }
+
+    # setup dual face rotaions
+    CenterRotations = {
+        "M"   : ["x'", "L'", "R"],
+        "E"   : ["y'", "U",  "D'"],
+        "S"   : ["z",  "F'", "B"],
+        "M'"  : ["x",  "L",  "R'"],
+        "E'"  : ["y",  "U'", "D"],
+        "S'"  : ["z'", "F",  "B'"],
+    }
+
+    # Define absolution rotations
+    AbsFaceRotations = {
+        "Wh"  : 0, "Or"   : 1,
+        "Gr"  : 2, "Re"   : 3, 
+        "Bl"  : 4, "Ye"   : 5,
+        "Wh'" : 8, "Or'"  : 9,
+        "Gr'" : 10, "Re'" : 11, 
+        "Bl'" : 12, "Ye'" : 13
+    }
 
-        # Define absolution rotations
-        self.AbsFaceRotations = {
-            "Wh"  : 0, "Or"   : 1,
-            "Gr"  : 2, "Re"   : 3, 
-            "Bl"  : 4, "Ye"   : 5,
-            "Wh'" : 8, "Or'"  : 9,
-            "Gr'" : 10, "Re'" : 11, 
-            "Bl'" : 12, "Ye'" : 13
-        }
+    def __init__(self, move_str=''):
+        # HEYKUBE move indices
+        self.move_list = array('B')
 
         # add moves
         self.add_moves(move_str)
@@ -410,208 +415,88 @@ betwen cubing notication U|L|F|R|B|D and the HEYKUBE index"""
         return self.__str__()
 
     def __iter__(self):
-        self.move_index = 0
-        return self
+        """Iterates over the HEYKUBE move indices as ints, use str() or
+InvFaceRotations for the notation"""
+        return iter(self.move_list)
 
     def __len__(self):
         return len(self.move_list)
 
     def __add__(self, other):
         y = Moves()
-        for val in self.move_list:
-            y.move_list.append(val)    
-        for val in other.move_list:
-            y.move_list.append(val)    
+        y.move_list = self.move_list + other.move_list
         return y
 
     def clear(self):
         """Clears the list of moves"""
-        self.move_list = list()
+        self.move_list = array('B')
 
     def absolute(self):
+        """Returns the face turns as absolute rotations, a list of AbsFaceRotations names
 
-        # set the orientation
-        self.orientation = {"U" : Cube_Color.White, "F" : Cube_Color.Green}
-
-        self.order = {"U" : "U", "L" : "L", "F" : "F", "R" : "R", "B" : "B", "D" : "D"}
+Starts with White up and Green front, and follows the x/y/z rotations
+(including the ones in wide and slice moves) to find the color of the
+center each face turn rotates. The rotations themselves are dropped"""
 
-        abs_moves = Moves()
-        for loop1 in range(len(self.move_list)):
-            move = self.move_list[len(self.move_list)-1-loop1]
-            move_index = self.FaceRotations[move]
+        InvAbsFaceRotations = dict((v, k) for k, v in self.AbsFaceRotations.items())
 
-            # Flip the list
-            if (move_index & 0x8):
-                move_index &= 0x7
-            else:
-                move_index |= 0x8
-            reverse_moves.add(self.InvFaceRotations[move_index])
-        return reverse_moves
+        abs_moves = list()
+        orientation = compose_moves([])
+        for move_index in self.move_list:
 
+            # follow the centers through the rotations
+            if move_index & 0x10:
+                orientation = compose_moves([move_index], orientation)
 
+            # face turn, of the center color now at that face
+            else:
+                center_color = orientation[9*(move_index & 0x7) + 4] // 9
+                abs_moves.append(InvAbsFaceRotations[center_color | (move_index & 0x8)])
+        return abs_moves
 
     def reverse(self):
         """Returns a new Moves() object which is reversed.
-The reverse the moves, and convert clockwise to counter-clockwise moves (and vice versa)"""
+The reverse the moves, and convert clockwise to counter-clockwise moves (and vice versa).
+Rotations reverse as well, so x reverses to x' and not to a face turn"""
 
         reverse_moves = Moves()
-        for loop1 in range(len(self.move_list)):
-            move = self.move_list[len(self.move_list)-1-loop1]
-            move_index = self.FaceRotations[move]
-
-            # Flip the list
-            if (move_index & 0x8):
-                move_index &= 0x7
-            else:
-                move_index |= 0x8
-            reverse_moves.add(self.InvFaceRotations[move_index])
+        reverse_moves.move_list = array('B', [move_index ^ 0x8 for move_index in reversed(self.move_list)])
         return reverse_moves
 
     def add_moves(self, move_str):
-        """Add more moves to the list"""
-
-        # Deal with lists
-        if isinstance(move_str, list):
-            for val in move_str:
-                if isinstance(val, int):
-                    self.move_list.append(self.InvFaceRotations[val])
-                else:
-                    self.move_list.append(self.FaceRotations[val])
+        """Add more moves to the list, from a string or a list of moves"""
 
         # Deal with strings
-        else:
-            # pad to check for 2x notation
-            move_str += '  '
-
-            # Deal with groupings
-            while True:
-                group_start = move_str.find('(')
-                if group_start == -1:
-                    break
-
-                group_end = move_str.find(')')
-
-                rot_group = move_str[group_start+1:group_end]
-
-                # Double the group
-                if move_str[group_end+1] == '2':
-                    rot_group += ' '  
-                    rot_group += rot_group  
-                    group_end += 1
-                elif move_str[group_end+1] == '3':
-                    rot_group += ' '  
-                    rot_group += rot_group + rot_group
-                    group_end += 1
-
-                # Rebuild string
-                move_str = move_str[0:group_start] + rot_group + move_str[group_end+1:]
-
-            # pad so we can check for extra parameters
-            str_index = 0
-            while str_index < len(move_str):
-
-                if move_str[str_index] == ' ':
-                    str_index += 1
-
-                # Handle regular moves
-                elif move_str[str_index] in self.FaceRotations:
-
-                    # Get move
-                    next_val = move_str[str_index]
-                    str_index += 1
-                    
-                    num_moves = 1
-                    if move_str[str_index] == '2':
-                        num_moves = 2
-                        str_index += 1
-                    elif move_str[str_index] == '3':
-                        num_moves = 3
-                        str_index += 1
-
-                    if move_str[str_index] == "'":
-                        next_val += "'"
-                        str_index += 1
-
-                    for loop1 in range(num_moves):
-                        self.move_list.append(next_val)
-
-                # Handle double moves
-                elif move_str[str_index] in self.DoubleFaceRotations:
-
-                    # Get move
-                    next_val = move_str[str_index]
-                    str_index += 1
-                    
-                    num_moves = 1
-                    if move_str[str_index] == '2':
-                        num_moves = 2
-                        str_index += 1
-                    elif move_str[str_index] == '3':
-                        num_moves = 3
-                        str_index += 1
-                    if move_str[str_index] == "'":
-                        next_val += "'"
-                        str_index += 1
-
-                    next_set = self.DoubleFaceRotations[next_val]
-                    for loop1 in range(num_moves):
-                        self.move_list.extend(next_set)
-
-                # Handle double moves
-                elif move_str[str_index] in self.CenterRotations:
-
-                    # Get move
-                    next_val = move_str[str_index]
-                    str_index += 1
-                    
-                    num_moves = 1
-                    if move_str[str_index] == '2':
-                        num_moves = 2
-                        str_index += 1
-                    elif move_str[str_index] == '3':
-                        num_moves = 3
-                        str_index += 1
-                    if move_str[str_index] == "'":
-                        next_val += "'"
-                        str_index += 1
-
-                    next_set = self.CenterRotations[next_val]
-                    for loop1 in range(num_moves):
-                        self.move_list.extend(next_set)
+        if isinstance(move_str, str):
+            self.move_list.extend(parse_moves(move_str))
 
-                else:
-                    print('Cannot processing {}'.format(move_str[str_index]))
-                    str_index += 1
-
-    def __next__(self):
-        if self.move_index < len(self.move_list):
-            y = Moves()
-            y.add(self.move_list[self.move_index])
-            self.move_index += 1
-            return y
+        # Deal with lists
         else:
-            raise StopIteration
+            for val in move_str:
+                self.add(val)
 
     def add(self, x):
-        self.move_list.append(x)
+        """Adds a single move, either the HEYKUBE index or the notation"""
+        if isinstance(x, str):
+            self.move_list.append(self.FaceRotations[x])
+        elif x in self.InvFaceRotations:
+            self.move_list.append(x)
+        else:
+            raise KeyError(x)
+
+    def to_list(self):
+        """Returns the list of HEYKUBE move indices"""
+        return self.move_list.tolist()
 
     def __int__(self):
         if len(self.move_list) == 1:
-            y = int(self.FaceRotations[self.move_list[0]])            
+            y = self.move_list[0]
         else:
-            y = list()
-            for val in self.move_list:
-                y.append(int(self.FaceRotations[val]))
+            y = self.move_list.tolist()
         return y
 
     def __str__(self):
-        move_str = ''
-        for loop1, val in enumerate(self.move_list):
-
-            move_str += self.move_list[loop1]
-            if loop1 < (len(self.move_list)-1):
-                move_str += ' '
-        return move_str
+        return ' '.join([self.InvFaceRotations[val] for val in self.move_list])
 
     def __getitem__(self, index):
         y = Moves()
@@ -624,16 +509,7 @@ The reverse the moves, and convert clockwise to counter-clockwise moves (and vic
 
     def __eq__(self, other):
 
-        if len(other.move_list) != len(self.move_list):
-            return False
-        else:
-
-            match = True
-            for loop1 in range(len(self.move_list)):
-                if self.move_list[loop1] != other.move_list[loop1]:
-                    match = False
-                    break
-            return match
+        return self.move_list == other.move_list
 
 
     def scramble(self, num_rot):
@@ -654,7 +530,7 @@ The reverse the moves, and convert clockwise to counter-clockwise moves (and vic
 
 TODO -- this needs to be a WCA-type scramble"""
 
-        self.move_list = list()  
+        self.move_list = array('B')
         inv_last_move = random.randint(0,5) | (random.randint(0,1) << 3)
         for loop1 in range(num_rot):
 
@@ -665,12 +541,88 @@ TODO -- this needs to be a WCA-type scramble"""
             inv_last_move = next_move ^ 0x8
 
             # Add the list
-            self.move_list.append(self.InvFaceRotations[next_move])
-        logger.info('Randomized moves: {}'.format(self.move_list))
+            self.move_list.append(next_move)
+        logger.info('Randomized moves: {}'.format(self))
 
     def from_string(self, rot_str):
         pass
 
+# -----------------------------------------------
+# Single-pass parser for the cubing notation
+# ----------------------------------------------
+
+# HEYKUBE move indices for each move in the notation
+move_codes = dict((name, [val]) for name, val in Moves.FaceRotations.items())
+move_codes.update((name, [Moves.FaceRotations[x] for x in val]) for name, val in Moves.DoubleFaceRotations.items())
+move_codes.update((name, [Moves.FaceRotations[x] for x in val]) for name, val in Moves.CenterRotations.items())
+
+# Splits the string into moves and group brackets - R2', (, )3
+move_split = re.compile(r"\)\d*|\(|[^\s()]+")
+
+# Parses the moves when they are not space separated - RUR'U'
+move_token = re.compile(r"([ULFRBDxyzulfrbdMES])(\d*)(')?(\d*)|(\S)")
+
+# Precomputed move indices for the common moves with repeat counts and primes
+move_suffixes = [('', 1, ''), ("'", 1, "'"), ('2', 2, ''), ("2'", 2, "'"),
+                 ("'2", 2, "'"), ('3', 3, ''), ("3'", 3, "'")]
+token_codes = dict((name + suffix, move_codes[name + prime] * count)
+                   for name in move_codes if not name.endswith("'")
+                   for suffix, count, prime in move_suffixes)
+
+def parse_token(move_str):
+    """Parses moves with no spaces, or with unusual repeat counts"""
+
+    move_list = list()
+    for token in move_token.finditer(move_str):
+        name, count, prime, post_count, unknown = token.groups()
+        if name:
+            if prime:
+                name += "'"
+            move_list.extend(move_codes[name] * int(count or post_count or 1))
+        else:
+            logger.error('Cannot parse {}'.format(unknown))
+    return move_list
+
+def parse_moves(move_str):
+    """Parses a move string into a list of HEYKUBE move indices
+
+Handles face, wide and slice moves, repeat counts, primes and
+nested ( ... )N groups in a single pass over the string"""
+
+    # one list per open group
+    groups = [[]]
+    move_list = groups[0]
+    for token in move_split.findall(move_str):
+
+        # regular, wide and slice moves
+        codes = token_codes.get(token)
+        if codes is not None:
+            move_list.extend(codes)
+
+        # open a new group
+        elif token == '(':
+            move_list = list()
+            groups.append(move_list)
+
+        # close the group, and repeat it
+        elif token[0] == ')':
+            if len(groups) > 1:
+                group = groups.pop()
+                move_list = groups[-1]
+                move_list.extend(group * int(token[1:] or 1))
+            else:
+                logger.error('Cannot parse {}'.format(token))
+
+        else:
+            move_list.extend(parse_token(token))
+
+    # close any open groups
+    while len(groups) > 1:
+        group = groups.pop()
+        groups[-1].extend(group)
+
+    return groups[0]
+
 # Defines Cube Faces and Colors
 class Cube_Color(Enum):
     White = 0
@@ -802,11 +754,100 @@ class Facelet():
         else:
             raise StopIteration
 
+# ---------------------------------------------------
+# Converts Moves() or a list of moves to the legal
+# HEYKUBE move indices
+# ---------------------------------------------------
+def get_move_indices(moves):
+
+    # Moves() only holds legal moves
+    if isinstance(moves, Moves):
+        return moves.move_list
+
+    # get the HEYKUBE move indices
+    move_list = [int(move) for move in moves]
+
+    # drop illegal moves
+    valid_moves = list()
+    for move_index in move_list:
+        if is_valid_move(move_index):
+            valid_moves.append(move_index)
+        else:
+            logger.error('Illegal move specification {}'.format(move_index))
+
+    return valid_moves
+
+# Longest Moves() object that goes through the move cache
+move_cache_max_moves = 64
+
+@functools.lru_cache(maxsize=256)
+def compose_move_string(move_str):
+    """Parses and composes a move string, keeping the result in a bounded LRU cache
+
+Returns a tuple of (move indices, 54-entry permutation). Use
+compose_move_string.cache_info() for hit/miss counts"""
+    return compose_move_codes(Moves(move_str).move_list.tobytes())
+
+@functools.lru_cache(maxsize=256)
+def compose_move_codes(move_codes):
+    """Same as compose_move_string, but keyed by the bytes of the HEYKUBE move indices"""
+
+    move_list = bytes(move_codes)
+    return (move_list, compose_moves(move_list))
+
+def compose_move_sequence(moves):
+    """Returns the (move indices, permutation) for Moves(), a move string or a list of moves
+
+Move strings and short Moves() go through the compose_move_string cache"""
+
+    if isinstance(moves, str):
+        move_list, perm = compose_move_string(moves)
+    elif isinstance(moves, Moves) and len(moves) <= move_cache_max_moves:
+        move_list, perm = compose_move_codes(moves.move_list.tobytes())
+    else:
+        move_list = get_move_indices(moves)
+        perm = compose_moves(move_list)
+
+    return (move_list, perm)
+
 # ---------------------------------------------------
 # Main class to hold the model of a 3x3 cube
 # ---------------------------------------------------
 class Cube():
 
+    # Setup state
+    EdgePairs = [
+        # Up
+        [Facelet("UF"), Facelet("FU")],
+        [Facelet("UR"), Facelet("RU")],
+        [Facelet("UB"), Facelet("BU")],
+        [Facelet("UL"), Facelet("LU")],
+        # Down
+        [Facelet("DF"), Facelet("FD")],
+        [Facelet("DR"), Facelet("RD")],
+        [Facelet("DB"), Facelet("BD")],
+        [Facelet("DL"), Facelet("LD")],
+        # middle 
+        [Facelet("FR"), Facelet("RF")],
+        [Facelet("FL"), Facelet("LF")],
+        [Facelet("BR"), Facelet("RB")],
+        [Facelet("BL"), Facelet("LB")]
+    ]
+
+    # Corner sets
+    CornerSets = [
+        # Up
+        [Facelet("UFR"), Facelet("FUR"), Facelet("RUF")],
+        [Facelet("URB"), Facelet("RUB"), Facelet("BUR")],
+        [Facelet("ULB"), Facelet("BUL"), Facelet("LUB")],
+        [Facelet("ULF"), Facelet("LUF"), Facelet("FUL")],
+        # Down 
+        [Facelet("DFR"), Facelet("RFD"), Facelet("FRD")],
+        [Facelet("DLF"), Facelet("FLD"), Facelet("LFD")],
+        [Facelet("DLB"), Facelet("LBD"), Facelet("BLD")],
+        [Facelet("DRB"), Facelet("BRD"), Facelet("RBD")]
+    ]
+
     def __init__(self):
 
         # Initialize the state
@@ -824,64 +865,8 @@ class Cube():
         self.moves = Moves()
         self.seq_num = 0
 
-        # Setup state
-        self.EdgePairs = [
-            # Up
-            [Facelet("UF"), Facelet("FU")],
-            [Facelet("UR"), Facelet("RU")],
-            [Facelet("UB"), Facelet("BU")],
-            [Facelet("UL"), Facelet("LU")],
-            # Down
-            [Facelet("DF"), Facelet("FD")],
-            [Facelet("DR"), Facelet("RD")],
-            [Facelet("DB"), Facelet("BD")],
-            [Facelet("DL"), Facelet("LD")],
-            # middle 
-            [Facelet("FR"), Facelet("RF")],
-            [Facelet("FL"), Facelet("LF")],
-            [Facelet("BR"), Facelet("RB")],
-            [Facelet("BL"), Facelet("LB")]
-        ]
-
-        # Corner sets
-        self.CornerSets = [
-            # Up
-            [Facelet("UFR"), Facelet("FUR"), Facelet("RUF")],
-            [Facelet("URB"), Facelet("RUB"), Facelet("BUR")],
-            [Facelet("ULB"), Facelet("BUL"), Facelet("LUB")],
-            [Facelet("ULF"), Facelet("LUF"), Facelet("FUL")],
-            # Down 
-            [Facelet("DFR"), Facelet("RFD"), Facelet("FRD")],
-            [Facelet("DLF"), Facelet("FLD"), Facelet("LFD")],
-            [Facelet("DLB"), Facelet("LBD"), Facelet("BLD")],
-            [Facelet("DRB"), Facelet("BRD"), Facelet("RBD")]
-       ]
-
-
-        self.rotationTable = [
-          # ULFRBD
-          [  2,  5,  8,  1,  4,  7,  0,  3,  6, 18, 10, 11, 21, 13, 14, 24, 16, 17, 27, 19, 20, 30, 22, 23, 33, 25, 26, 36, 28, 29, 39, 31, 32, 42, 34, 35,  9, 37, 38, 12, 40, 41, 15, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52, 53], 
-          [ 44, 43, 42,  3,  4,  5,  6,  7,  8, 11, 14, 17, 10, 13, 16,  9, 12, 15,  0,  1,  2, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 47, 46, 45, 18, 19, 20, 48, 49, 50, 51, 52, 53],
-          [  0,  1, 17,  3,  4, 16,  6,  7, 15,  9, 10, 11, 12, 13, 14, 45, 48, 51, 20, 23, 26, 19, 22, 25, 18, 21, 24,  2,  5,  8, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 29, 46, 47, 28, 49, 50, 27, 52, 53],
-          [  0,  1,  2,  3,  4,  5, 24, 25, 26,  9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 51, 52, 53, 29, 32, 35, 28, 31, 34, 27, 30, 33,  8,  7,  6, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 38, 37, 36],
-          [ 33,  1,  2, 34,  4,  5, 35,  7,  8,  6,  3,  0, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 53, 50, 47, 38, 41, 44, 37, 40, 43, 36, 39, 42, 45, 46,  9, 48, 49, 10, 51, 52, 11],
-          [  0,  1,  2,  3,  4,  5,  6,  7,  8,  9, 10, 38, 12, 13, 41, 15, 16, 44, 18, 19, 11, 21, 22, 14, 24, 25, 17, 27, 28, 20, 30, 31, 23, 33, 34, 26, 36, 37, 29, 39, 40, 32, 42, 43, 35, 47, 50, 53, 46, 49, 52, 45, 48, 51],
-          # (ULFRBD)'
-          [  6,  3,  0,  7,  4,  1,  8,  5,  2, 36, 10, 11, 39, 13, 14, 42, 16, 17,  9, 19, 20, 12, 22, 23, 15, 25, 26, 18, 28, 29, 21, 31, 32, 24, 34, 35, 27, 37, 38, 30, 40, 41, 33, 43, 44, 45, 46, 47, 48, 49, 50, 51, 52, 53],
-          [ 18, 19, 20,  3,  4,  5,  6,  7,  8, 15, 12,  9, 16, 13, 10, 17, 14, 11, 45, 46, 47, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41,  2,  1,  0, 44, 43, 42, 48, 49, 50, 51, 52, 53],
-          [  0,  1, 27,  3,  4, 28,  6,  7, 29,  9, 10, 11, 12, 13, 14,  8,  5,  2, 24, 21, 18, 25, 22, 19, 26, 23, 20, 51, 48, 45, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44, 15, 46, 47, 16, 49, 50, 17, 52, 53],
-          [  0,  1,  2,  3,  4,  5, 38, 37, 36,  9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23,  6,  7,  8, 33, 30, 27, 34, 31, 28, 35, 32, 29, 53, 52, 51, 39, 40, 41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 24, 25, 26],
-          [ 11,  1,  2, 10,  4,  5,  9,  7,  8, 47, 50, 53, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32,  0,  3,  6, 42, 39, 36, 43, 40, 37, 44, 41, 38, 45, 46, 35, 48, 49, 34, 51, 52, 33],
-          [  0,  1,  2,  3,  4,  5,  6,  7,  8,  9, 10, 20, 12, 13, 23, 15, 16, 26, 18, 19, 29, 21, 22, 32, 24, 25, 35, 27, 28, 38, 30, 31, 41, 33, 34, 44, 36, 37, 11, 39, 40, 14, 42, 43, 17, 51, 48, 45, 52, 49, 46, 53, 50, 47],
-          # xyz
-          [ 18, 19, 20, 21, 22, 23, 24, 25, 26, 15, 12,  9, 16, 13, 10, 17, 14, 11, 45, 46, 47, 48, 49, 50, 51, 52, 53, 29, 32, 35, 28, 31, 34, 27, 30, 33,  8,  7,  6,  5,  4,  3,  2,  1,  0, 44, 43, 42, 41, 40, 39, 38, 37, 36], 
-          [  2,  5,  8,  1,  4,  7,  0,  3,  6, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 41, 42, 43, 44,  9, 10, 11, 12, 13, 14, 15, 16, 17, 51, 48, 45, 52, 49, 46, 53, 50, 47],
-          [ 11, 14, 17, 10, 13, 16,  9, 12, 15, 47, 50, 53, 46, 49, 52, 45, 48, 51, 20, 23, 26, 19, 22, 25, 18, 21, 24,  2,  5,  8,  1,  4,  7,  0,  3,  6,  42, 39, 36, 43, 40, 37, 44, 41, 38, 29, 32, 35, 28, 31, 34, 27, 30, 33],
-          # (xyz)'
-          [ 44, 43, 42, 41, 40, 39, 38, 37, 36, 11, 14, 17, 10, 13, 16,  9, 12, 15,  0,  1,  2,  3,  4,  5,  6,  7,  8, 33, 30, 27, 34, 31, 28, 35, 32, 29, 53, 52, 51, 50, 49, 48, 47, 46, 45, 18, 19, 20, 21, 22, 23, 24, 25, 26],
-          [  6,  3,  0,  7,  4,  1,  8,  5,  2, 36, 37, 38, 39, 40, 41, 42, 43, 44,  9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 47, 50, 53, 46, 49, 52, 45, 48, 51],
-          [ 33, 30, 27, 34, 31, 28, 35, 32, 29,  6,  3,  0,  7,  4,  1,  8,  5,  2, 24, 21, 18, 25, 22, 19, 26, 23, 20, 51, 48, 45, 52, 49, 46, 53, 50, 47, 38, 41, 44, 37, 40, 43, 36, 39, 42, 15, 12,  9, 16, 13, 10, 17, 14, 11]
-        ]
+        # Facelet permutations for each move
+        self.rotationTable = rotation_table
 
     def initialize(self):
         self.clear_moves()
@@ -890,39 +875,17 @@ class Cube():
 
     def apply_moves(self, moves):
 
-        # go through the moves
-        for move in moves:
-
-            # create new state
-            new_state = [0]*54
-
-            # get table index
-            move_index = int(move)     
-            if (move_index >= 0) and (move_index <= 5):
-                table_index = move_index
-            elif (move_index >= 8) and (move_index <= 13):
-                table_index = move_index - 2
-            elif (move_index >= 16) and (move_index <= 18):
-                table_index = move_index - 4
-            elif (move_index >= 24) and (move_index <= 26):
-                table_index = move_index - 9
-            else:
-                table_index = None
-                logger.error('Illegal move specification {}'.format(move))
+        """Applies Moves(), a move string or a list of HEYKUBE move indices to the cube"""
 
-            # with a valid entry run the move
-            if not table_index is None:
-                rotSet = self.rotationTable[table_index]
-                for loop1 in range(54):
-                    new_state[loop1] = self.state[rotSet[loop1]]
-                self.state = new_state
+        # compose all the moves, and apply them in one pass
+        valid_moves, perm = compose_move_sequence(moves)
+        self.state = apply_permutation(self.state, perm)
 
-                # keep track
-                #print('Adding {} move to the cube'.format(move))
-                self.moves.add_moves([move_index])
-                # updating seq number
-                self.seq_num += 1
-                self.seq_num &= 0xff
+        # keep track
+        self.moves.move_list.extend(valid_moves)
+        # updating seq number
+        self.seq_num += len(valid_moves)
+        self.seq_num &= 0xff
 
     def get_orientation(self):
         orientation = dict()
@@ -981,37 +944,11 @@ class Cube():
 
     # decode a permuation
     def decodePerm(self, lex, n):
-        a = list()
-        for loop1 in range(n):
-            a.append(0)
-
-        i = n-2
-        while i >= 0:
-            a[i] = lex % (n - i)
-            lex //= n-i
-            for j in range(i+1, n):
-                if a[j] >= a[i]:
-                    a[j] += 1
-            i -= 1
-        return a
+        return decode_perm(lex, n)
 
 
     def encodePerm(self, a):
-
-        # Permtation enocder
-        perm_popcount64 = [0,1,1,2,1,2,2,3, 1,2,2,3,2,3,3,4, 1,2,2,3,2,3,3,4, 2,3,3,4,3,4,4,5,
-                           1,2,2,3,2,3,3,4, 2,3,3,4,3,4,4,5, 2,3,3,4,3,4,4,5, 3,4,4,5,4,5,5,6 ]
-
-        n = len(a)
-        bits = 0
-        r = 0
-        for i in range(n):
-            bits |= 1 << a[i]
-            low = ((1<<a[i])-1) & bits
-            r = r * (n-i) + a[i] - perm_popcount64[low>>6] - perm_popcount64[low&63]
-        if ((bits + 1) != (1 << n)):
-            return -1
-        return r
+        return encode_perm(a)
 
     # --------------------------------------------------------
     # Encoding format is derived from the spec
@@ -1028,21 +965,13 @@ class Cube():
         # get the 12 edges pieces
         # -------------------------------------------------------
         edge_orient = 0;
-        cubies = [-1]*12
-
-        for loop1 in range(12):
-            # get piece
-            edgePiece = self.state[int(self.EdgePairs[loop1][0])]
+        cubies = list()
 
-            # find the piece number
-            edge_orient <<= 1
-            for loop2 in range(12):
-                for loop3 in range(2):
-                    if edgePiece == int(self.EdgePairs[loop2][loop3]):
-                        cubies[loop1] = loop2
-                        edge_orient += loop3
-                if cubies[loop1] >= 0:
-                    break
+        for edge_loc in edge_locations:
+            # get piece, and look up the cubie/orientation
+            edgePiece = self.state[edge_loc]
+            cubies.append(facelet_edge[edgePiece])
+            edge_orient = (edge_orient << 1) + facelet_edge_orient[edgePiece]
 
         # get the permutation
         encode = self.encodePerm(cubies) & 0x1fffffff
@@ -1061,18 +990,12 @@ class Cube():
         # Get the corner Pieces
         # ------------------------------------------------------
         corner_orient = 0;
-        cubies = [-1]*8
-        for loop1 in range(8):
-            cornerPiece = self.state[int(self.CornerSets[loop1][0])]
-	
-            corner_orient *= 3
-            for loop2 in range(8):
-                for loop3 in range(3):
-                    if cornerPiece == int(self.CornerSets[loop2][loop3]):
-                        cubies[loop1] = loop2
-                        corner_orient += loop3
-                if cubies[loop1] >= 0:
-                    break
+        cubies = list()
+        for corner_loc in corner_locations:
+            # get piece, and look up the cubie/orientation
+            cornerPiece = self.state[corner_loc]
+            cubies.append(facelet_corner[cornerPiece])
+            corner_orient = corner_orient*3 + facelet_corner_orient[cornerPiece]
 
         # get the permutation
         encode = self.encodePerm(cubies) & 0xffff
@@ -1098,102 +1021,16 @@ class Cube():
 
     # gets list of perm/orientation from cstate
     def recover_cstate_data(self, cstate):
-
-        valid_state = True
-
-        # get edge perm
-        r = cstate[0]
-        r |= cstate[1] << 8
-        r |= cstate[2] << 16
-        r |= (cstate[3] &0x1f) << 24
-
-        edge_orient = cstate[3] >> 5
-        edge_orient |= cstate[4] << 3
-        edge_orient |= (cstate[5] & 0x1) << 11;
-
-        # decode permutation
-        edge_perm = self.decodePerm(r, 12)
-
-        # get corner perm
-        r = cstate[5] >> 1
-        r |= cstate[6] << 7
-        r |= (cstate[7] & 0x1) << 15
-
-        # decode permutation
-        corner_perm = self.decodePerm(r, 8)
-
-        # get corner orientation
-        corner_orient = cstate[7] >> 1
-        corner_orient |= (cstate[8] & 0x3f) << 7
-
-        # get position of Faces - must be 0x0, 0x0
-        pos = cstate[8] >> 6
-        pos |= (cstate[9] & 0x7) << 2
-        if pos != 0:
-            valid_state = False
-
-        # get order
-        if (cstate[9] & 0x8):
-            center_orient = cstate[9] >> 4
-            center_orient |= cstate[10] << 4
-        else:
-            center_orient = 0
-
-        return (valid_state, edge_perm, edge_orient, corner_perm, corner_orient, center_orient)
+        return recover_cstate_data(cstate)
 
     # --------------------------------------------------------------
     # recover decoded state
     # --------------------------------------------------------------
     def decode_state(self, cstate):
 
-        # set new list
-        new_state = list()
-        for loop1 in range(54):
-            new_state.append(loop1)
-
-        # Set the center stage
-        for loop1 in range(6):
-            centerPiece = loop1*9+4
-            new_state[centerPiece] = centerPiece
-
-        # get the permuatioitatio
-        valid_state, edge_perm, edge_orient, corner_perm, corner_orient, center_orient = self.recover_cstate_data(cstate)
-        # put edge pieces into location
-        loop1 = 11
-        while loop1 >= 0:
-            orient_index = edge_orient & 0x1
-            for loop2 in range(2):
-                edgeLoc = int(self.EdgePairs[loop1][loop2])
-                edgePiece = int(self.EdgePairs[edge_perm[loop1]][orient_index])
-                new_state[edgeLoc] = edgePiece
-                orient_index ^= 0x1
-            # shift out orientation
-            edge_orient >>= 1
-            loop1 -= 1 
-
-        # Get corner permutation
-        loop1 = 7
-        while loop1 >= 0:
-            orient_index = corner_orient % 3
-            for loop2 in range(3):
-                cornerLoc   = int(self.CornerSets[loop1][loop2])
-                cornerPiece = int(self.CornerSets[corner_perm[loop1]][orient_index])
-                orient_index = (orient_index + 1) % 3
-
-                new_state[cornerLoc] = cornerPiece
-
-            # shift out
-            corner_orient //= 3;
-            loop1 -= 1
-
-        # Check the final sum
-        piece_sum = 0
-        for loop1 in range(54):
-            piece_sum += new_state[loop1]
-        if piece_sum != 1431:
-            valid_state = False
-
-        return (valid_state, new_state, center_orient)
+        # decoded states are cached on the 11-byte state
+        valid_state, new_state, center_orient = decode_cstate(bytes(cstate[:11]))
+        return (valid_state, list(new_state), center_orient)
 
     def clear_moves(self):
         self.moves.clear()
@@ -1210,6 +1047,12 @@ class Cube():
         if valid_cube:
             self.state = new_state
 
+        self.update_moves(cstate)
+        return valid_cube
+
+    def update_moves(self, cstate):
+        """Adds the new moves in the CubeState bytes to the move list, without decoding the state"""
+
         # Update moves
         new_seq_num = cstate[11]
         new_moves = (new_seq_num - self.seq_num) % 256
@@ -1232,8 +1075,6 @@ class Cube():
         self.moves.add_moves(move_list)
         self.seq_num = new_seq_num
         self.timestamp = (cstate[21] + cstate[22] << 8) / 512.0
-        
-        return valid_cube
 
 
     # --------------------------------------------------------
@@ -1276,10 +1117,11 @@ class Cube():
         return not self.__eq__(other)
 
     def __eq__(self,other):
-        for loop1 in range(54):
-            if (other.state[loop1] != self.state[loop1]):
-                return False
-        return True
+        return self.state == other.state
+
+    def get_key(self):
+        """Returns a hashable CubeKey() for the current state"""
+        return CubeKey.from_cube(self)
 
     def __repr__(self):
 
@@ -1324,6 +1166,636 @@ class Cube():
 
         return cube_str
 
+# ---------------------------------------------------
+# Lookup tables from the facelet to the edge/corner
+# cubie and its orientation, in the encode_state order
+# ---------------------------------------------------
+
+# Facelets that define the edge/corner positions
+edge_locations = [int(edge[0]) for edge in Cube.EdgePairs]
+corner_locations = [int(corner[0]) for corner in Cube.CornerSets]
+
+def build_facelet_lookup(cubie_sets):
+    """Returns the facelet to cubie and orientation tables, -1 for facelets not in the sets"""
+
+    facelet_cubie = [-1]*54
+    facelet_orient = [0]*54
+    for cubie, facelets in enumerate(cubie_sets):
+        for orient, facelet in enumerate(facelets):
+            facelet_cubie[int(facelet)] = cubie
+            facelet_orient[int(facelet)] = orient
+    return (facelet_cubie, facelet_orient)
+
+facelet_edge, facelet_edge_orient = build_facelet_lookup(Cube.EdgePairs)
+facelet_corner, facelet_corner_orient = build_facelet_lookup(Cube.CornerSets)
+
+# Facelet indices for each edge/corner cubie
+edge_facelets = [[int(facelet) for facelet in edge] for edge in Cube.EdgePairs]
+corner_facelets = [[int(facelet) for facelet in corner] for corner in Cube.CornerSets]
+
+# ---------------------------------------------------
+# Encoding/decoding the 11-byte cube state
+# ---------------------------------------------------
+
+# Factorials for decoding permutations
+perm_factorials = [math.factorial(n) for n in range(13)]
+
+# Permtation enocder
+perm_popcount64 = [0,1,1,2,1,2,2,3, 1,2,2,3,2,3,3,4, 1,2,2,3,2,3,3,4, 2,3,3,4,3,4,4,5,
+                   1,2,2,3,2,3,3,4, 2,3,3,4,3,4,4,5, 2,3,3,4,3,4,4,5, 3,4,4,5,4,5,5,6 ]
+
+def encode_perm(a):
+    """Encodes a permutation of up to 12 entries into its rank, -1 if it is not a permutation"""
+
+    n = len(a)
+    bits = 0
+    r = 0
+    for i in range(n):
+        bits |= 1 << a[i]
+        low = ((1<<a[i])-1) & bits
+        r = r * (n-i) + a[i] - perm_popcount64[low>>6] - perm_popcount64[low&63]
+    if ((bits + 1) != (1 << n)):
+        return -1
+    return r
+
+def decode_perm(lex, n):
+    """Decodes the permutation rank from Cube.encodePerm"""
+
+    # pick each entry from the unused values
+    unused = list(range(n))
+    a = list()
+    for i in range(n):
+        a.append(unused.pop((lex // perm_factorials[n-1-i]) % (n-i)))
+    return a
+
+# gets list of perm/orientation from cstate
+def recover_cstate_data(cstate):
+
+    valid_state = True
+
+    # get edge perm
+    r = cstate[0]
+    r |= cstate[1] << 8
+    r |= cstate[2] << 16
+    r |= (cstate[3] &0x1f) << 24
+
+    edge_orient = cstate[3] >> 5
+    edge_orient |= cstate[4] << 3
+    edge_orient |= (cstate[5] & 0x1) << 11;
+
+    # decode permutation
+    edge_perm = decode_perm(r, 12)
+
+    # get corner perm
+    r = cstate[5] >> 1
+    r |= cstate[6] << 7
+    r |= (cstate[7] & 0x1) << 15
+
+    # decode permutation
+    corner_perm = decode_perm(r, 8)
+
+    # get corner orientation
+    corner_orient = cstate[7] >> 1
+    corner_orient |= (cstate[8] & 0x3f) << 7
+
+    # get position of Faces - must be 0x0, 0x0
+    pos = cstate[8] >> 6
+    pos |= (cstate[9] & 0x7) << 2
+    if pos != 0:
+        valid_state = False
+
+    # get order
+    if (cstate[9] & 0x8):
+        center_orient = cstate[9] >> 4
+        center_orient |= cstate[10] << 4
+    else:
+        center_orient = 0
+
+    return (valid_state, edge_perm, edge_orient, corner_perm, corner_orient, center_orient)
+
+@functools.lru_cache(maxsize=1024)
+def decode_cstate(cstate):
+    """Decodes the 11-byte state into (valid_state, 54-facelet state tuple, center_orient)
+
+Results are kept in a bounded LRU cache since the same states recur during
+tracking. Use decode_cstate.cache_info() for hit/miss counts"""
+
+    # start from the solved state, which sets the centers
+    new_state = list(range(54))
+
+    # get the permuatioitatio
+    valid_state, edge_perm, edge_orient, corner_perm, corner_orient, center_orient = recover_cstate_data(cstate)
+
+    # put edge pieces into location
+    loop1 = 11
+    while loop1 >= 0:
+        orient_index = edge_orient & 0x1
+        edge_loc = edge_facelets[loop1]
+        edge_piece = edge_facelets[edge_perm[loop1]]
+        new_state[edge_loc[0]] = edge_piece[orient_index]
+        new_state[edge_loc[1]] = edge_piece[orient_index ^ 0x1]
+        # shift out orientation
+        edge_orient >>= 1
+        loop1 -= 1
+
+    # Get corner permutation
+    loop1 = 7
+    while loop1 >= 0:
+        orient_index = corner_orient % 3
+        corner_loc = corner_facelets[loop1]
+        corner_piece = corner_facelets[corner_perm[loop1]]
+        for loop2 in range(3):
+            new_state[corner_loc[loop2]] = corner_piece[(orient_index + loop2) % 3]
+        # shift out
+        corner_orient //= 3
+        loop1 -= 1
+
+    # Check the final sum
+    if sum(new_state) != 1431:
+        valid_state = False
+
+    return (valid_state, tuple(new_state), center_orient)
+
+# ---------------------------------------------------
+# Hashable key for a cube state
+# ---------------------------------------------------
+class CubeKey(int):
+    """Immutable, hashable key for a cube state, for sets and dicts
+
+Packs the edge permutation (29 bits), edge orientation (12 bits), corner
+permutation (16 bits) and corner orientation (13 bits) from encode_state()
+into the low 70 bits of an integer. The cube has 4.3e19 states, so 64 bits
+is not enough. The center orientation of the state goes above them, so
+from_cstate(cstate).to_cstate() gives back cstate
+
+encode_state() only encodes the white up, green front orientation, so
+from_cube() keys a copy of the cube turned to that orientation"""
+
+    # bits used by the edge/corner fields of the 11-byte state
+    key_bits = 70
+
+    @classmethod
+    def from_cstate(cls, cstate):
+        """Builds the key from the 11-byte state"""
+        key = int.from_bytes(bytes(cstate[:9]), 'little') & ((1 << cls.key_bits) - 1)
+        if cstate[9] & 0x8:
+            center_orient = (cstate[9] >> 4) | (cstate[10] << 4)
+            key |= center_orient << cls.key_bits
+        return cls(key)
+
+    @classmethod
+    def from_cube(cls, cube):
+        """Builds the key from a Cube() object, in the white up, green front orientation"""
+        if [cube.state[loop1*9 + 4] for loop1 in range(6)] != [4, 13, 22, 31, 40, 49]:
+            oriented = Cube()
+            oriented.state = list(cube.state)
+            oriented.reset_orientation()
+            cube = oriented
+        return cls.from_cstate(cube.encode_state())
+
+    def to_cstate(self):
+        """Returns the 11-byte state for the key"""
+        center_orient = int(self) >> self.key_bits
+        cstate = list((int(self) & ((1 << self.key_bits) - 1)).to_bytes(9, 'little'))
+        return cstate + [0x8 | ((center_orient & 0xf) << 4), center_orient >> 4]
+
+    def to_cube(self):
+        """Returns a new Cube() object in the state of the key"""
+        cube = Cube()
+        valid_state, new_state, center_orient = cube.decode_state(self.to_cstate())
+        cube.state = new_state
+        return cube
+
+    def __repr__(self):
+        return 'CubeKey(0x{:018x})'.format(int(self))
+
+
+# -------------------------------------------------
+# -------------------------------------------------
+# Encoding/decoding the HEYKUBE characteristics,
+# shared by heykube and AsyncHeyKube
+# -------------------------------------------------
+# -------------------------------------------------
+
+# timestamps count in 1/512 second steps
+time_step = 1.0/512
+
+# Report the states
+notify_states = ['solution', 'move', 'match', 'double_tap', 'instruction_empty', 'instruction_max']
+solution_states = ['scrambled', 'bottom_cross', 'bottom_layer',
+                   'middle_layer', 'top_layer_cross',
+                   'top_layer_face', 'top_layer_corner', 'solved']
+
+# patterns
+pattern_names = ['checkerboard', 'sixspots', 'cubeincube', 'anaconda',
+                 'tetris', 'dontcrossline', 'greenmamba', 'spiralpattern',
+                 'python', 'kilt', 'cubeincubeincube', 'orderinchaos',
+                 'plusminus', 'displacedmotif', 'cuaround', 'verticalstripes']
+
+# battery capacity curves
+battery_capacity = { 'volt'    : [3.0, 3.1, 3.2, 3.3, 3.4, 3.5, 3.6, 3.7, 3.8, 3.9, 4.0, 4.1, 4.2],
+                    'capacity' : [0.0, 0.01, 0.03, 0.04, 0.05, 0.1, 0.18, 0.35, 0.65, 0.8, 0.9, 0.95, 1.0]}
+
+def decode_move_nibbles(data):
+    """Returns the moves packed 2 per byte, skipping the 0xf padding"""
+    moves_list = list()
+    for val in data:
+        next_move = val & 0xf
+        if (next_move != 0xf):
+            moves_list.append(next_move)
+        next_move = (val >> 4) & 0xf
+        if (next_move != 0xf):
+            moves_list.append(next_move)
+    return moves_list
+
+def parse_cube_state(y):
+    """Parses the sequence number, recent moves and timestamp from the CubeState bytes"""
+    val = dict()
+    val['seq_num'] = int(y[11])
+
+    # Form full list
+    val['moves'] = Moves()
+    val['moves'].add_moves(decode_move_nibbles(y[12:21]))
+    val['timestamp'] = (y[21] + (y[22] << 8)) * time_step
+
+    return val
+
+def parse_cube_state_moves(y, prev_seq_num=None):
+    """Returns the number of moves since prev_seq_num and the Moves() from CubeState bytes"""
+
+    # commpute number of moves
+    if prev_seq_num is None:
+        num_moves = 1
+    else:
+        num_moves = (y[11] - prev_seq_num) & 0xff
+
+    # build the list of new moves, CubeState only carries the last 18
+    index = 42 - min(num_moves, 18)
+    move_list = []
+    for loop1 in range(min(num_moves, 18)):
+        if index & 0x1:
+            next_move = (y[index//2] >> 4) & 0xf
+        else:
+            next_move = y[index//2] & 0xf
+        move_list.append(next_move)
+        index += 1
+
+    moves = Moves()
+    moves.add_moves(move_list)
+    return num_moves, moves
+
+class CubeStateFrame():
+    """View over the raw bytes of a CubeState notification
+
+seq_num, timestamp and the moves read the bytes directly. The 54-facelet
+state is only decoded when .cube is used"""
+
+    def __init__(self, data, receive_time=None):
+        self.data = data
+        self.receive_time = receive_time
+        self._cube = None
+
+    @property
+    def seq_num(self):
+        return self.data[11]
+
+    @property
+    def timestamp(self):
+        return (self.data[21] + (self.data[22] << 8)) * time_step
+
+    def get_move_codes(self, num_moves=18):
+        """Returns the last num_moves HEYKUBE move indices, oldest first"""
+        data = self.data
+        move_list = list()
+        for index in range(42 - num_moves, 42):
+            if index & 0x1:
+                move_list.append((data[index//2] >> 4) & 0xf)
+            else:
+                move_list.append(data[index//2] & 0xf)
+        return move_list
+
+    def get_num_moves(self, prev_seq_num=None):
+        """Number of moves since prev_seq_num, 1 if there is no previous frame"""
+        if prev_seq_num is None:
+            return 1
+        return (self.data[11] - prev_seq_num) & 0xff
+
+    def get_moves(self, prev_seq_num=None):
+        """Returns the number of moves since prev_seq_num and the Moves()"""
+        return parse_cube_state_moves(self.data, prev_seq_num)
+
+    @property
+    def cube(self):
+        """Cube() in the frame's state, decoded on first use"""
+        if self._cube is None:
+            self._cube = Cube()
+            self._cube.set_state(self.data)
+        return self._cube
+
+    def __repr__(self):
+        return 'CubeStateFrame(seq_num={}, timestamp={:.3f})'.format(self.seq_num, self.timestamp)
+
+def parse_move_history(y, prev_seq_num=None):
+    """Parses the up to 42 previous moves from the Moves bytes"""
+    val = dict()
+    val['seq_num'] = y[0]
+    moves_list = decode_move_nibbles(y[1:21])
+
+    # drop last moves
+    if prev_seq_num:
+        num_moves = (val['seq_num'] - prev_seq_num) & 0xff
+        moves_list = moves_list[-num_moves:]
+
+    # Form full list
+    val['moves'] = Moves()
+    val['moves'].add_moves(moves_list)
+    val['timestamp'] = (y[21] + (y[22] << 8)) * time_step
+
+    return val
+
+def parse_version(y, disconnect_reasons=dict()):
+    """Parses the Version bytes"""
+    val = dict()
+
+    out_text = '0x'
+    for x in y:
+        out_text += '{:02x}'.format(x)
+    logger.info('HEYKUBE version: {}'.format(out_text))
+
+    # form the version number
+    val['version'] = 'v{}.{}'.format(y[1],y[0])
+    logger.info('HEYKUBE firmware version {}'.format(val['version']))
+
+    # check the accelerometer
+    if (y[2] & 0x2):
+        val['battery'] = True
+        logger.info('    Battery voltage in range')
+    else:
+        val['battery'] = False
+
+    # check the accelerometer
+    if (y[2] & 0x4):
+        val['motion'] = True
+        logger.info('    Motion enabled')
+    else:
+        val['motion'] = False
+
+    # Report the config
+    if (y[2] & 0x8):
+        val['full6'] = True
+        logger.info('    FULL6 Moves')
+    else:
+        val['full6'] = False
+
+    # Report the config
+    if (y[2] & 0x10):
+        val['custom_config'] = True
+        logger.info('    Using custom config')
+    else:
+        val['custom_config'] = False
+
+    # check the hints on/off
+    if (y[2] & 0x20):
+        val['hints'] = False
+        logger.info('    Hints off')
+    else:
+        val['hints'] = True
+
+    # Report BTLE disconnect
+    if y[3] in disconnect_reasons:
+        val['disconnect_reason'] = disconnect_reasons[y[3]]
+    else:
+        val['disconnect_reason'] = y[3]
+
+    return val
+
+def parse_status_info(status_bytes):
+    """Parses one 5-byte status event, returns None if it is empty"""
+
+    # Get the raw dictionary
+    status_out = dict()
+
+    # Check first notifaction
+    if status_bytes[0] == 0:
+        return None
+
+    for loop1, field in enumerate(notify_states):
+        if (status_bytes[0] & (1 << loop1)):
+            status_out[field] = True
+
+    # check solution level and change to levels
+    if 'solution' in status_out.keys():
+        num_correct = status_bytes[1] & 0x3
+        solution_index = (status_bytes[1] >> 2) & 0x7
+        status_out['solution'] = [solution_states[solution_index], num_correct]
+
+    # reports the sequence number
+    status_out['seq_num'] = status_bytes[2]
+
+    # Report timestamp
+    timestamp = (status_bytes[3] + (status_bytes[4] << 8)) / 512.0
+    status_out['timestamp'] = timestamp
+
+    return status_out
+
+def parse_status(data):
+    """Parses the up to 4 status events from the Status bytes"""
+
+    # build the output
+    status_out_list = list()
+
+    # Check the last three sequence numbers
+    for loop1 in range(4):
+
+        # Grab sequence
+        list_slice = data[loop1*5+1:loop1*5+6]
+        status_out = parse_status_info(list_slice)
+
+        if status_out:
+            status_out_list.append(status_out)
+
+    return status_out_list
+
+def parse_instructions(y):
+    """Parses the Instructions bytes into Moves()"""
+
+    # process instructions
+    num_inst = y[0]
+    instr_list = list()
+    skip = False
+    # Read out list of instructions
+    index = 1
+    for loop1 in range(num_inst):
+        # get value
+        if (loop1 & 0x1):
+            val = (y[index] >> 4) & 0xff
+            index += 1
+        else:
+            val = y[index] & 0xf
+        # append to list
+        if skip:
+            skip = False
+        elif (val == 0x7) or (val == 0x6):
+            skip = True
+        else:
+            instr_list.append(val)
+    instr = Moves()
+    instr.add_moves(instr_list)
+
+    logger.info('instructions: {}'.format(instr))
+    return instr
+
+def encode_instructions(instr_moves, append=False):
+    """Packs Moves() into the Instructions bytes, returns None if there are too many"""
+    data = list()
+    if len(instr_moves) > 52:
+        logger.error('Too many instructions')
+        return None
+
+    # convert into absolute rotations - TODO
+    # Need to add teh X/Y/Y rotations
+    # rot_cmd = self.cube.get_absolute_rotations(rot_cmd)
+    if len(instr_moves) == 0:
+        data.append(0)
+        data.append(0xff)
+        logger.info('write_instructions: send empty packet to clear it')
+    else:
+        logger.info('write_instructions: {}'.format(instr_moves))
+        data.append(len(instr_moves))
+        if append:
+            data[0] |= 0x80
+        for loop1, move in enumerate(instr_moves):
+            val = int(move) & 0xf
+
+            # Todo TODO - translate rotations"
+            if (loop1 % 2) == 0:
+                data.append(val)
+            else:
+                data[-1] |= val  << 4
+        if len(instr_moves) & 0x1:
+            data[-1] |= 0xf0
+
+    return data
+
+def encode_match(match, enable=True):
+    """Packs the Match() object into the MatchState bytes"""
+    data = list()
+
+    # Enable the match
+    if enable:
+        data.append(1)
+    else:
+        data.append(0)
+
+    match_list = match.to_list()
+    next_byte = 0
+    bit_pos = 0
+    for loop1, val in enumerate(match_list):
+
+        next_byte |= (val & 0x7) << bit_pos
+        bit_pos += 3
+
+        if (bit_pos >= 8):
+            data.append(next_byte & 0xff)
+            next_byte >>= 8
+            bit_pos -= 8
+    return data
+
+def encode_notify_flags(notify_list):
+    """Returns the Status flags that arm the listed notifications"""
+    status_flag = 0
+    for loop1, val in enumerate(notify_states):
+        if val in notify_list:
+            status_flag |= 1 << loop1
+    return status_flag
+
+def get_pattern_index(pattern):
+    """Returns the index of a pattern name or index, None if it is not valid"""
+
+    # Simulate patterns
+    num_patterns = len(pattern_names)
+
+    # Get the pattern index
+    pattern_index = None
+    if isinstance(pattern, int):
+        if (pattern < 0) or (pattern >= num_patterns):
+            logger.error('Error, pattern index must be [0,{}]'.format(num_patterns-1))
+        else:
+            pattern_index = pattern
+    else:
+        for loop1, val in enumerate(pattern_names):
+            if pattern == val:
+                pattern_index = loop1
+                break
+    return pattern_index
+
+def parse_accel(y):
+    """Returns which face is up, along with X,Y and Z acceleration vector from the Accel bytes"""
+
+    accel_scale = 2.0/128.0
+    accel_data = list()
+    max_index = 0
+    for loop1 in range(3):
+        val = int(y[loop1])
+        if val >= 128:
+            val -= 256
+        val *= accel_scale
+        accel_data.append(val)
+
+        # track max absolute value
+        if abs(val) > abs(accel_data[max_index]):
+            max_index = loop1
+
+
+    # get the orientation
+    face_up_set = [['White', 'Yellow'], ['Orange', 'Red'], ['Blue', 'Green']]
+
+    max_val = accel_data[max_index]
+    if max_val >= 0:
+        face_up = face_up_set[max_index][1]
+    else:
+        face_up = face_up_set[max_index][0]
+
+    return face_up, accel_data
+
+def calc_battery_capacity(batt_voltage):
+    """Converts the battery voltage into percent capacity"""
+
+    # convert voltage to battery life
+    capacity = 0
+    if batt_voltage < battery_capacity['volt'][0]:
+        capacity = battery_capacity['capacity'][0]
+    elif batt_voltage >= battery_capacity['volt'][-1]:
+        capacity = battery_capacity['capacity'][-1]
+    else:
+        for loop1 in range(len(battery_capacity['volt'])-1):
+            v0 = battery_capacity['volt'][loop1]
+            v1 = battery_capacity['volt'][loop1+1]
+            c0 = battery_capacity['capacity'][loop1]
+            c1 = battery_capacity['capacity'][loop1+1]
+
+            # compute fit
+            if batt_voltage >= v0 and batt_voltage < v1:
+                capacity = (c1-c0)/(v1-v0)*(batt_voltage - v0) + c0
+                break
+    return int(capacity*100)
+
+def parse_battery(y):
+    """Returns the capacity, voltage and charger status from the Battery bytes"""
+    if y[1] & 0x10:
+        chrg_status = 1
+    else:
+        chrg_status = 0
+
+    # voltage is u3.9 format
+    batt_voltage  =  float(y[0] + ((y[1] & 0xf) << 8))
+    batt_voltage /= 2.0**9
+
+    # compute capacity
+    capacity = calc_battery_capacity(batt_voltage)
+
+    return (capacity, batt_voltage, chrg_status)
+
 # -------------------------------------------------
 # -------------------------------------------------
 # Main HEYKUBE Object  
@@ -1338,8 +1810,11 @@ Send custom instructions
 Query the cube state, register for moves and notifications
     """
 
-    def __init__(self):
-        self.cube = Cube()
+    def __init__(self, connectivity=None):
+        self._cube = Cube()
+
+        # CubeState frames not yet applied to the cube, see the cube property
+        self.pending_frames = list()
     
         # Defines debug level
         self.debug = 0
@@ -1347,31 +1822,65 @@ Query the cube state, register for moves and notifications
         # Setup logging
         self.logger = logging.getLogger('heykube')
 
-        # defines connection
-        self.connectivity = heykube_btle()
+        # defines connection, heykube_btle() unless one is passed in (e.g. from heykube_hub)
+        if connectivity is None:
+            connectivity = heykube_btle()
+        self.connectivity = connectivity
 
 
         # setup time step
-        self.time_step = 1.0/512
+        self.time_step = time_step
+
+        # Wait for each write to complete, set False to fire-and-forget (LED animations)
+        self.wait_for_writes = True
 
         # Initialize BTLE device
         self.notify_queue = self.connectivity.notify_queue
+
+        # notification latency in seconds, from notification_handler to the caller
+        self.notify_latency = deque(maxlen=1024)
+
+        # notification handlers by field or event, see add_handler()
+        self.handlers = dict()
+        self.handler_seq_num = None
+        self.connectivity.notify_callbacks.append(self.dispatch_notify)
         self.device_name = None
 
         # Report the states
-        self.notify_states = ['solution', 'move', 'match', 'double_tap', 'instruction_empty', 'instruction_max']
-        self.solution_states = ['scrambled', 'bottom_cross', 'bottom_layer', 
-                                'middle_layer', 'top_layer_cross', 
-                                'top_layer_face', 'top_layer_corner', 'solved']
+        self.notify_states = notify_states
+        self.solution_states = solution_states
         # mark default last sequence
         self.last_status_seq_num = None
 
         # patterns
-        self.pattern_names = ['checkerboard', 'sixspots', 'cubeincube', 'anaconda', 
-                              'tetris', 'dontcrossline', 'greenmamba', 'spiralpattern', 
-                              'python', 'kilt', 'cubeincubeincube', 'orderinchaos', 
-                              'plusminus', 'displacedmotif', 'cuaround', 'verticalstripes'] 
-
+        self.pattern_names = pattern_names
+
+
+    @property
+    def cube(self):
+        """The Cube() tracking HEYKUBE, brought up to date with the CubeState notifications on first use"""
+        if self.pending_frames:
+            frames = self.pending_frames
+            self.pending_frames = list()
+
+            # only the last state needs decoding
+            for frame in frames[:-1]:
+                self._cube.update_moves(frame.data)
+            self._cube.set_state(frames[-1].data)
+        return self._cube
+
+    @cube.setter
+    def cube(self, cube):
+        self._cube = cube
+        self.pending_frames = list()
+
+    def add_frame(self, frame):
+        """Queues a CubeStateFrame for the cube, folding in the moves of old frames so the list stays short"""
+        self.pending_frames.append(frame)
+        if len(self.pending_frames) > 64:
+            for old_frame in self.pending_frames[:-1]:
+                self._cube.update_moves(old_frame.data)
+            self.pending_frames = self.pending_frames[-1:]
 
     def connect(self, device):
         """Connects to a specified HEYKUBE device
@@ -1418,11 +1927,14 @@ optional arguments:
     def read_cube(self, field):
         return self.connectivity.read_cube(field)
     
-    def write_cube(self, field, data,wait_for_response=True):
-        success = self.connectivity.write_cube(field, data, wait_for_response)
-        # TODO for now, make sure command is written before we return 
-        time.sleep(0.2)
-        return success
+    def write_cube(self, field, data, wait_for_response=None):
+        """Writes data to a HEYKUBE characteristic
+
+Waits for the write to complete unless wait_for_response is False, and
+defaults to the wait_for_writes setting"""
+        if wait_for_response is None:
+            wait_for_response = self.wait_for_writes
+        return self.connectivity.write_cube(field, data, wait_for_response)
 
     # Enable notifications
     def enable_notifications(self, notify_list):
@@ -1432,11 +1944,7 @@ optional arguments:
             self.connectivity.subscribe('CubeState')
         else:
             # arm the notifications
-            status_flag = 0
-            for loop1, val in enumerate(self.notify_states):
-                if val in notify_list:
-                    status_flag |= 1 << loop1
-            self.write_cube('Status', [status_flag])
+            self.write_cube('Status', [encode_notify_flags(notify_list)])
             self.connectivity.subscribe('Status')
 
     def disable_notifications(self):
@@ -1447,13 +1955,39 @@ optional arguments:
     def wait(self, timeout=10):
         """This method is used to wait for specified time
         """
-        start_time = time.time()
-        while True:
-            current_time = time.time()
-            if (current_time - start_time) >= timeout:
-                break
+        time.sleep(timeout)
+
+    def next_notify(self, timeout=None):
+        """Blocks until the next notification, up to timeout seconds (0 does not block)
+
+Returns the [field, data, receive time] entry, or None on timeout"""
+        try:
+            if timeout is not None and timeout <= 0:
+                status_message = self.notify_queue.get_nowait()
             else:
-                time.sleep(0.1)
+                status_message = self.notify_queue.get(timeout=timeout)
+        except Empty:
+            return None
+
+        # time from notification_handler to the caller
+        self.notify_latency.append(time.perf_counter() - status_message[2])
+        return status_message
+
+    def get_notify_latency(self):
+        """Returns the count, mean, median, p99 and max latency in milliseconds
+from notification_handler to the caller, over the recent notifications"""
+
+        latency = sorted(self.notify_latency)
+        if len(latency) == 0:
+            return None
+
+        val = dict()
+        val['count'] = len(latency)
+        val['mean'] = 1e3*sum(latency)/len(latency)
+        val['median'] = 1e3*latency[len(latency)//2]
+        val['p99'] = 1e3*latency[int(0.99*(len(latency)-1))]
+        val['max'] = 1e3*latency[-1]
+        return val
 
     def wait_for_cube_state(self,prev_seq_num=None, timeout=10):
         """This method is used to wait for events from the HEYKUBE
@@ -1475,52 +2009,29 @@ optional arguments:
           'instruction_empty' : True,
           'instruction_max'   : True,
           'seq_num'           :  [0-255]
+          'frame'             :  CubeStateFrame, the cube state is decoded on first use
         
         """
 
         status_out = dict()
         num_moves = 0
 
-        # Wait for timeout, keep heartbeart alive
-        start_time = time.time()
+        # Block on the queue for the rest of the timeout
+        end_time = time.monotonic() + timeout
         while True:
 
-            current_time = time.time()
-            if not self.notify_queue.empty():
-                status_message = self.notify_queue.get()
-                if status_message[0] == 'CubeState':
-                    self.cube.set_state(status_message[1])
-                    logger.info('{} notification'.format(status_message[0]))
-                    #status_out['cube_state'] = True
-                    status_out['seq_num'] = status_message[1][11]
-                    status_out['moves'] = Moves()
-
-                    # commpute number of moves
-                    if prev_seq_num is None:
-                        num_moves = 1
-                    else:
-                        num_moves = (status_out['seq_num'] - prev_seq_num) & 0xff
-
-                    # build the list of new moves
-                    index = 42 - num_moves  
-                    move_list = []
-                    for loop1 in range(num_moves):
-                        if index & 0x1:
-                            next_move = (status_message[1][index//2] >> 4) & 0xf
-                        else:
-                            next_move = status_message[1][index//2] & 0xf
-                        move_list.append(next_move)
-                        index += 1
-                    
-                    # append the list
-                    status_out['moves'].add_moves(move_list)
-                    break
-
-            elif (current_time - start_time) >= timeout:
-                #cube_state_end = self.read_cube_state()
+            status_message = self.next_notify(end_time - time.monotonic())
+            if status_message is None:
+                break
+
+            if status_message[0] == 'CubeState':
+                frame = CubeStateFrame(status_message[1], status_message[2])
+                self.add_frame(frame)
+                logger.info('{} notification'.format(status_message[0]))
+                status_out['seq_num'] = frame.seq_num
+                num_moves, status_out['moves'] = frame.get_moves(prev_seq_num)
+                status_out['frame'] = frame
                 break
-            else:
-                time.sleep(0.1)
 
         # Parse status bytes
         return num_moves, status_out
@@ -1546,37 +2057,25 @@ and includes a timeout mechanism if the event never happens
 """
         status_out = dict()
 
-        # Wait for timeout, keep heartbeart alive
-        start_time = time.time()
-        while True:
-
-            # Track time
-            current_time = time.time()
-
-            # Check the queue
-            if not self.notify_queue.empty():
-                status_message = self.notify_queue.get()
-                if status_message[0] == 'Status':
-                    status_bytes = status_message[1]
-                    status_out = self.parse_status_info(status_bytes[1:6])
-                    curr_seq_num = status_out['seq_num']
-                    logger.info('Status notification - {}'.format(status_out))
-                else:
-                    logger.error('Unknown status notification - {}'.format(status_message[0]))
-                    cube_state_end = self.read_cube_state()
-                    curr_seq_num = cube_state_end['seq_num']
-                    status_out['seq_num'] = cube_state_end['seq_num']
-                    status_out['timestamp'] = cube_state_end['timestamp']
-                break
-            elif (current_time - start_time) >= timeout:
-                logger.warning('Timeout in the Status notification')
-                cube_state_end = self.read_cube_state()
-                curr_seq_num = cube_state_end['seq_num']
-                status_out['seq_num'] = cube_state_end['seq_num']
-                status_out['timestamp'] = cube_state_end['timestamp']
-                break
-            else:
-                time.sleep(0.1)
+        # Block on the queue until the timeout
+        status_message = self.next_notify(timeout)
+        if status_message is None:
+            logger.warning('Timeout in the Status notification')
+            cube_state_end = self.read_cube_state()
+            curr_seq_num = cube_state_end['seq_num']
+            status_out['seq_num'] = cube_state_end['seq_num']
+            status_out['timestamp'] = cube_state_end['timestamp']
+        elif status_message[0] == 'Status':
+            status_bytes = status_message[1]
+            status_out = self.parse_status_info(status_bytes[1:6])
+            curr_seq_num = status_out['seq_num']
+            logger.info('Status notification - {}'.format(status_out))
+        else:
+            logger.error('Unknown status notification - {}'.format(status_message[0]))
+            cube_state_end = self.read_cube_state()
+            curr_seq_num = cube_state_end['seq_num']
+            status_out['seq_num'] = cube_state_end['seq_num']
+            status_out['timestamp'] = cube_state_end['timestamp']
 
         # compute number of moves 
         if prev_seq_num:
@@ -1588,26 +2087,85 @@ and includes a timeout mechanism if the event never happens
         # Parse status bytes
         return num_moves, status_out
 
-    def get_notify(self):
-        """Get immediate notification from the queue if it is there, otherwise returns None"""
+    def get_notify(self, timeout=0):
+        """Get a notification from the queue, waiting up to timeout seconds, otherwise returns None
+
+CubeState notifications return a CubeStateFrame, and the cube state is
+only decoded when self.cube or the frame .cube is used"""
+
+        status_message = self.next_notify(timeout)
+        if status_message is None:
+            return None
 
         status_out = None
-        if not self.notify_queue.empty():
-            status_message = self.notify_queue.get()
-            if status_message[0] == 'Status':
-                status_bytes = status_message[1]
-                status_out = self.parse_status_info(status_bytes[1:6])
-            elif status_message[0] == 'CubeState':
-                self.cube.set_state(status_message[1])
-                status_out = True
-            return [status_message[0], status_out]
+        if status_message[0] == 'Status':
+            status_bytes = status_message[1]
+            status_out = self.parse_status_info(status_bytes[1:6])
+        elif status_message[0] == 'CubeState':
+            status_out = CubeStateFrame(status_message[1], status_message[2])
+            self.add_frame(status_out)
+        return [status_message[0], status_out]
 
-        return None
+    # ----------------------------------------------------------------------
+    # Notification handlers
+    # ----------------------------------------------------------------------
+    def add_handler(self, event, handler):
+        """Calls handler(event, value) for every matching notification
+
+event is a notification field, 'CubeState' or 'Status', or one of the
+Status events in notify_states ('solution', 'move', 'match', ...).
+Each notification is decoded once, and the same value goes to every handler:
+
+    CubeState : dict with seq_num, num_moves, moves (new since the last CubeState), timestamp, data, frame (CubeStateFrame)
+    Status    : the parse_status_info() dict, for the field and each event set in it
+
+Handlers run on the connection thread, and should return quickly"""
+        self.handlers[event] = self.handlers.get(event, tuple()) + (handler,)
+
+    def remove_handler(self, event, handler):
+        """Removes a handler added with add_handler()"""
+        handlers = list(self.handlers.get(event, tuple()))
+        if handler in handlers:
+            handlers.remove(handler)
+            self.handlers[event] = tuple(handlers)
+
+    def dispatch_notify(self, field, data, receive_time):
+        """Decodes a notification once and passes it to the handlers"""
+
+        if not self.handlers:
+            return
+
+        # decode the notification
+        if field == 'CubeState':
+            value = parse_cube_state(data)
+            value['num_moves'], value['moves'] = parse_cube_state_moves(data, self.handler_seq_num)
+            value['data'] = data
+            value['frame'] = CubeStateFrame(data, receive_time)
+            self.handler_seq_num = value['seq_num']
+            events = [field]
+        elif field == 'Status':
+            value = parse_status_info(data[1:6])
+            if value is None:
+                return
+            events = [field] + [event for event in self.notify_states if event in value]
+        else:
+            return
+
+        # dispatch to everyone registered
+        for event in events:
+            for handler in self.handlers.get(event, tuple()):
+                try:
+                    handler(event, value)
+                except Exception:
+                    logger.exception('Notification handler for {} failed'.format(event))
 
     def clear_notify(self):
         """ Clear out old notify messages we do not need """
-        while not self.notify_queue.empty():
-            self.notify_queue.get()
+        try:
+            while True:
+                self.notify_queue.get_nowait()
+        except Empty:
+            pass
     # ----------------------------------------------------------------------
     # Commands to control the cube
     # ----------------------------------------------------------------------
@@ -1622,110 +2180,18 @@ and includes a timeout mechanism if the event never happens
     # Setup test mode
     def read_moves(self, prev_seq_num=None):
         """Reads up to the last 42 moves from HEYKUBE"""
-
-        # Read the moves
-        y = self.read_cube('Moves')
-        val = dict()
-        val['seq_num'] = y[0]
-        moves_list = list()
-        for loop1 in range(20): 
-            
-            next_move = y[loop1+1] & 0xf 
-            if (next_move != 0xf):
-                moves_list.append(next_move)
-            next_move = (y[loop1+1] >> 4) & 0xf 
-            if (next_move != 0xf):
-                moves_list.append(next_move)
-
-        # drop last moves
-        if prev_seq_num:
-            num_moves = (val['seq_num'] - prev_seq_num) & 0xff
-            moves_list = moves_list[-num_moves:]
-
-        # Form full list
-        val['moves'] = Moves()
-        val['moves'].add_moves(moves_list)
-        val['timestamp'] = (y[21] + (y[22] << 8)) * self.time_step
-
-        return val
+        return parse_move_history(self.read_cube('Moves'), prev_seq_num)
 
     # Setup test mode
     def read_version(self):
         """Reads the current SW version"""
-        y = self.read_cube('Version')
-        val = dict()
-
-        out_text = '0x'
-        for x in y:
-            out_text += '{:02x}'.format(x)
-        logger.info('HEYKUBE version: {}'.format(out_text))
-
-        # form the version number
-        val['version'] = 'v{}.{}'.format(y[1],y[0])
-        logger.info('HEYKUBE firmware version {}'.format(val['version']))
-
-        # check the accelerometer
-        if (y[2] & 0x2):
-            val['battery'] = True
-            logger.info('    Battery voltage in range')
-        else:
-            val['battery'] = False
-
-        # check the accelerometer
-        if (y[2] & 0x4):
-            val['motion'] = True
-            logger.info('    Motion enabled')
-        else:
-            val['motion'] = False
-
-        # Report the config
-        if (y[2] & 0x8):
-            val['full6'] = True
-            logger.info('    FULL6 Moves')
-        else:
-            val['full6'] = False
-
-        # Report the config
-        if (y[2] & 0x10):
-            val['custom_config'] = True
-            logger.info('    Using custom config')
-        else:
-            val['custom_config'] = False
-
-        # check the hints on/off
-        if (y[2] & 0x20):
-            val['hints'] = False
-            logger.info('    Hints off')
-        else:
-            val['hints'] = True
-
-        # Report BTLE disconnect
-        if y[3] in self.connectivity.disconnect_reasons:
-            val['disconnect_reason'] = self.connectivity.disconnect_reasons[y[3]]
-        else:
-            val['disconnect_reason'] = y[3]
-
-        return val
+        return parse_version(self.read_cube('Version'), self.connectivity.disconnect_reasons)
 
     def enable_pattern(self, pattern):
         """If HEYKUBE is solved, enables instructiosn for the specified pattern"""
 
-        # Simulate patterns
-        num_patterns = len(self.pattern_names)
-
-        # Get the pattern index
-        pattern_index = None
-        if isinstance(pattern, int):
-            if (pattern < 0) or (pattern >= num_patterns):
-                self.logger.error('Error, pattern index must be [0,{}]'.format(num_patterns-1))
-            else:
-                pattern_index = pattern
-        else:
-            for loop1, val in enumerate(self.pattern_names):
-                if pattern == val:
-                    pattern_index = loop1
-                    break
         # Send the pattern index
+        pattern_index = get_pattern_index(pattern)
         if not (pattern_index is None):
             y = [0x08, pattern_index]
             self.write_cube('Action', y)
@@ -1749,27 +2215,7 @@ and includes a timeout mechanism if the event never happens
 
     def set_match(self, match, enable=True):
         """This method allows the user to set the match from the class Match object"""
-        data = list()
-
-        # Enable the match
-        if enable:
-            data.append(1)
-        else:
-            data.append(0)
-
-        match_list = match.to_list()
-        next_byte = 0
-        bit_pos = 0
-        for loop1, val in enumerate(match_list):
-
-            next_byte |= (val & 0x7) << bit_pos
-            bit_pos += 3
-
-            if (bit_pos >= 8):
-                data.append(next_byte & 0xff)
-                next_byte >>= 8
-                bit_pos -= 8
-        self.write_cube('MatchState', data)
+        self.write_cube('MatchState', encode_match(match, enable))
 
     def clear_instructions(self):
         """Clears the instructions queue, and returns to the internal solver"""
@@ -1786,34 +2232,10 @@ and includes a timeout mechanism if the event never happens
  
         :param Class Moves(): Holds the list of moves
         """
-        data = list()
-        if len(instr_moves) > 52:
-            logger.error('Too many instructions')
+        data = encode_instructions(instr_moves, append)
+        if data is None:
             return
 
-        # convert into absolute rotations - TODO
-        # Need to add teh X/Y/Y rotations
-        # rot_cmd = self.cube.get_absolute_rotations(rot_cmd)
-        if len(instr_moves) == 0:
-            data.append(0)
-            data.append(0xff)
-            logger.info('write_instructions: send empty packet to clear it')
-        else:
-            logger.info('write_instructions: {}'.format(instr_moves))
-            data.append(len(instr_moves))
-            if append:
-                data[0] |= 0x80
-            for loop1, move in enumerate(instr_moves):
-                val = int(move) & 0xf
-    
-                # Todo TODO - translate rotations"
-                if (loop1 % 2) == 0:
-                    data.append(val)
-                else:
-                    data[-1] |= val  << 4
-            if len(instr_moves) & 0x1:
-                data[-1] |= 0xf0
-
         self.write_cube('Instructions', data)
 
     def read_instructions(self):
@@ -1822,33 +2244,7 @@ and includes a timeout mechanism if the event never happens
  
         :returns: str -- Returns the list of rotations
         """
-        y = self.read_cube('Instructions')
-
-        # process instructions
-        num_inst = y[0]
-        instr_list = list()
-        skip = False
-        # Read out list of instructions
-        index = 1
-        for loop1 in range(num_inst):
-            # get value
-            if (loop1 & 0x1):
-                val = (y[index] >> 4) & 0xff
-                index += 1
-            else:
-                val = y[index] & 0xf
-            # append to list
-            if skip:
-                skip = False
-            elif (val == 0x7) or (val == 0x6):
-                skip = True
-            else:
-                instr_list.append(val)
-        instr = Moves()
-        instr.add_moves(instr_list)
-
-        logger.info('instructions: {}'.format(instr))
-        return instr
+        return parse_instructions(self.read_cube('Instructions'))
 
     def initialize(self):
         """This method resets the internal state of the HEYKUBE back to the solved state
@@ -1886,32 +2282,14 @@ and includes a timeout mechanism if the event never happens
 
     def get_timestamp(self):
         """Reads the current timestamp from the cube"""
-        y = self.read_cube('CubeState')
-        timestamp = (y[21] + (y[22] << 8)) * self.time_step
-        return timestamp
+        return parse_cube_state(self.read_cube('CubeState'))['timestamp']
 
     def read_cube_state(self):
         y = self.read_cube('CubeState')
         self.cube.set_state(y)
 
         # get data from the cube
-        val = dict()
-        val['seq_num'] = int(y[11])
-        moves_list = list()
-        for loop1 in range(9): 
-            
-            next_move = y[loop1+12] & 0xf 
-            if (next_move != 0xf):
-                moves_list.append(next_move)
-            next_move = (y[loop1+12] >> 4) & 0xf 
-            if (next_move != 0xf):
-                moves_list.append(next_move)
-        # Form full list
-        val['moves'] = Moves()
-        val['moves'].add_moves(moves_list)
-        val['timestamp'] = (y[21] + (y[22] << 8)) * self.time_step
-
-        return val
+        return parse_cube_state(y)
 
     def read_status(self):
         """This method reads up to the last 3 status events registered in the HEYKUBE
@@ -1930,23 +2308,7 @@ and includes a timeout mechanism if the event never happens
               'seq_num'           :  [0-255]}
         """
 
-        # Read the characteristics
-        data = self.read_cube('Status')
-
-        # build the output
-        status_out_list = list()
-
-        # Check the last three sequence numbers
-        for loop1 in range(4):
-
-            # Grab sequence
-            list_slice = data[loop1*5+1:loop1*5+6]
-            status_out = self.parse_status_info(list_slice)
-            
-            if status_out:
-                status_out_list.append(status_out)
-
-        return status_out_list
+        return parse_status(self.read_cube('Status'))
 
 
     def read_last_status(self):
@@ -1965,75 +2327,15 @@ and includes a timeout mechanism if the event never happens
         :returns: which face is up, along with X,Y and Z acceleration vector
         """
 
-        # Read the accelerometer data
-        y = self.read_cube('Accel')
-
-        accel_scale = 2.0/128.0
-        accel_data = list()
-        max_index = 0
-        for loop1 in range(3):
-            val = int(y[loop1])
-            if val >= 128:
-                val -= 256
-            val *= accel_scale
-            accel_data.append(val)
-
-            # track max absolute value
-            if abs(val) > abs(accel_data[max_index]):
-                max_index = loop1
-
-
-        # get the orientation
-        face_up_set = [['White', 'Yellow'], ['Orange', 'Red'], ['Blue', 'Green']]
-
-        max_val = accel_data[max_index]
-        if max_val >= 0:
-            face_up = face_up_set[max_index][1]
-        else:
-            face_up = face_up_set[max_index][0]
-        
-        return face_up, accel_data
+        return parse_accel(self.read_cube('Accel'))
 
     def calc_battery_capacity(self, batt_voltage):
-
-        # battery capacity curves
-        self.battery_capacity = { 'volt'    : [3.0, 3.1, 3.2, 3.3, 3.4, 3.5, 3.6, 3.7, 3.8, 3.9, 4.0, 4.1, 4.2],
-                                 'capacity' : [0.0, 0.01, 0.03, 0.04, 0.05, 0.1, 0.18, 0.35, 0.65, 0.8, 0.9, 0.95, 1.0]}
-        # convert voltage to battery life
-        capacity = 0
-        if batt_voltage < self.battery_capacity['volt'][0]:
-            capacity = self.battery_capacity['capacity'][0]
-        elif batt_voltage >= self.battery_capacity['volt'][-1]:
-            capacity = self.battery_capacity['capacity'][-1]
-        else:
-            for loop1 in range(len(self.battery_capacity['volt'])-1):
-                v0 = self.battery_capacity['volt'][loop1]
-                v1 = self.battery_capacity['volt'][loop1+1]
-                c0 = self.battery_capacity['capacity'][loop1]
-                c1 = self.battery_capacity['capacity'][loop1+1]
-            
-                # compute fit
-                if batt_voltage >= v0 and batt_voltage < v1:
-                    capacity = (c1-c0)/(v1-v0)*(batt_voltage - v0) + c0
-                    break
-        return int(capacity*100)
+        self.battery_capacity = battery_capacity
+        return calc_battery_capacity(batt_voltage)
 
     def read_battery(self):
         """Reads the battery status and charging state"""
-        y = self.read_cube('Battery')
-        if y[1] & 0x10:
-            chrg_status = 1
-        else:
-            chrg_status = 0
-    
-        # voltage is u3.9 format
-        batt_voltage  =  float(y[0] + ((y[1] & 0xf) << 8))
-        batt_voltage /= 2.0**9
-
-        # compute capacity 
-        capacity = self.calc_battery_capacity(batt_voltage)
-
-        return (capacity, batt_voltage, chrg_status)
+        return parse_battery(self.read_cube('Battery'))
 
     def software_reset(self):
         """This method issues a software reset through BTLE
@@ -2099,33 +2401,7 @@ and includes a timeout mechanism if the event never happens
         return c
 
     def parse_status_info(self, status_bytes):
-
-        # Get the raw dictionary   
-        status_out = dict()
-
-        # Check first notifaction
-        if status_bytes[0] == 0:
-            return None
-
-        for loop1, field in enumerate(self.notify_states):
-            if (status_bytes[0] & (1 << loop1)):
-                status_out[field] = True
-
-        # check solution level and change to levels
-        if 'solution' in status_out.keys():
-            num_correct = status_bytes[1] & 0x3
-            solution_index = (status_bytes[1] >> 2) & 0x7
-            #solution = '{}:{}'.format(self.solution_states[solution_index], num_correct)
-            status_out['solution'] = [self.solution_states[solution_index], num_correct]
-
-        # reports the sequence number
-        status_out['seq_num'] = status_bytes[2]
-
-        # Report timestamp
-        timestamp = (status_bytes[3] + (status_bytes[4] << 8)) / 512.0
-        status_out['timestamp'] = timestamp
-
-        return status_out
+        return parse_status_info(status_bytes)
         
     def turn_hints_off(self):
         """Turns hints off on HEYKUBE - they will return once solved
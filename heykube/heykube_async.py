@@ -0,0 +1,411 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube import Cube, Moves
+from heykube.heykube import time_step, notify_states, solution_states, pattern_names
+from heykube.heykube import parse_cube_state, parse_cube_state_moves, parse_move_history, parse_version
+from heykube.heykube import parse_status_info, parse_status, parse_instructions, parse_accel, parse_battery
+from heykube.heykube import encode_instructions, encode_match, encode_notify_flags, get_pattern_index
+from heykube.heykube_btle import char_uuid, char_handles, disconnect_reasons, get_sender_id, get_char_senders
+from heykube.heykube_transport import notify_policies, make_notify_room
+from bleak import BleakClient
+from bleak import BleakScanner
+import asyncio
+import logging
+import time
+
+# -------------------------------------------------
+# asyncio version of the NotifyQueue
+# -------------------------------------------------
+class AsyncNotifyQueue(asyncio.Queue):
+    """Bounded asyncio queue of [field, data, receive time] notifications
+
+Takes the same policies as NotifyQueue, and makes room in the same way when
+it is full. Notifications arrive in a callback on the event loop, which
+cannot wait, so with 'block' a full queue hands the notification to a task
+that waits for room"""
+
+    policies = notify_policies
+
+    def __init__(self, maxsize=256, policy='block'):
+        asyncio.Queue.__init__(self, maxsize)
+        if policy not in self.policies:
+            raise ValueError('Notify queue policy must be one of {}'.format(self.policies))
+        self.policy = policy
+
+        # counters
+        self.dropped = 0
+        self.coalesced = 0
+
+    def put_notify(self, item):
+        """Queues a notification from a callback, following the policy"""
+
+        if self.policy == 'block':
+            try:
+                self.put_nowait(item)
+            except asyncio.QueueFull:
+                asyncio.ensure_future(self.put(item))
+            return
+
+        # make room
+        if self.full():
+            if make_notify_room(self._queue, item, self.policy) == 'coalesced':
+                self.coalesced += 1
+            else:
+                self.dropped += 1
+            self._unfinished_tasks -= 1
+
+        self.put_nowait(item)
+
+    def get_stats(self):
+        """Returns the queued, dropped and coalesced counts"""
+        return {'queued' : self.qsize(), 'dropped' : self.dropped, 'coalesced' : self.coalesced}
+
+# -------------------------------------------------
+# -------------------------------------------------
+# asyncio HEYKUBE object
+# -------------------------------------------------
+# -------------------------------------------------
+class AsyncHeyKube():
+    """Defines the asyncio HEYKUBE class
+
+Same commands as heykube, as coroutines that run the bleak client directly
+on the caller's event loop, with no helper thread. Notifications come
+through the notifications() async iterator, from a bounded queue with the
+same notify_maxsize and notify_policy choices as heykube_transport
+
+    cube = AsyncHeyKube()
+    devices = await cube.scan()
+    await cube.connect(devices[0])
+    await cube.enable_notifications(['CubeState'])
+    async for field, status in cube.notifications():
+        logging.info('{} - {}'.format(field, status))
+    """
+
+    def __init__(self, notify_maxsize=256, notify_policy='block'):
+        self.cube = Cube()
+
+        # Setup logging
+        self.logger = logging.getLogger('heykube')
+
+        # BTLE client, and notifications from it
+        self.client = None
+        if notify_policy not in AsyncNotifyQueue.policies:
+            raise ValueError('Notify queue policy must be one of {}'.format(AsyncNotifyQueue.policies))
+        self.notify_maxsize = notify_maxsize
+        self.notify_policy = notify_policy
+        self.notify_queue = None
+        self.notify_list = list()
+
+        # notification sender (handle or BlueZ path) to field, filled in at subscribe
+        self.sender_fields = dict(char_handles)
+
+        # setup time step
+        self.time_step = time_step
+
+        # Report the states
+        self.notify_states = notify_states
+        self.solution_states = solution_states
+        self.pattern_names = pattern_names
+
+    # ----------------------------------------------------------------------
+    # Connection
+    # ----------------------------------------------------------------------
+    async def scan(self, timeout=5.0):
+        """Scans for HEYKUBE devices"""
+
+        scan_devices = list()
+        all_devices = await BleakScanner.discover(timeout=timeout)
+        for d in all_devices:
+            if d.name and 'HEYKUBE' in d.name:
+                self.logger.info('Found {}({}) at {} dB RSSI'.format(d.name, d.address, d.rssi))
+                scan_devices.append(d)
+        return scan_devices
+
+    async def connect(self, device, timeout=10.0):
+        """Connects to a HEYKUBE device from scan(), returns True on success"""
+
+        self.notify_queue = AsyncNotifyQueue(self.notify_maxsize, self.notify_policy)
+        self.notify_list = list()
+        self.client = BleakClient(device.address)
+        try:
+            await asyncio.wait_for(self.client.connect(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.error('Timeout in connection after {} seconds'.format(timeout))
+        except Exception as e:
+            self.logger.error('Failed to connect to {} - {}'.format(device.address, e))
+
+        if not self.is_connected():
+            self.client = None
+            return False
+
+        self.logger.info('Connected to {}'.format(self.client))
+        self.client.set_disconnected_callback(self.on_disconnect)
+        return True
+
+    async def disconnect(self):
+        """Disconnects from the HEYKUBE device"""
+        if self.client:
+            await self.client.disconnect()
+            self.client = None
+
+    def is_connected(self):
+        if self.client and self.client.is_connected:
+            return True
+        else:
+            return False
+
+    def on_disconnect(self, client):
+        self.logger.warning('Disconnected from HEYKUBE')
+
+    # ----------------------------------------------------------------------
+    # Characteristics
+    # ----------------------------------------------------------------------
+    async def read_cube(self, field):
+        """Reads the bytes of a HEYKUBE characteristic"""
+        self.logger.info('Reading from {}'.format(field))
+        read_bytes = await self.client.read_gatt_char(char_uuid[field])
+        return list(read_bytes)
+
+    async def write_cube(self, field, data):
+        """Writes bytes to a HEYKUBE characteristic, returns once the write completes"""
+        self.logger.info('Writing to {}'.format(field))
+        await self.client.write_gatt_char(char_uuid[field], bytearray(data), response=False)
+        return True
+
+    async def subscribe(self, field):
+        """Subscribe to notifications"""
+        UUID = char_uuid[field]
+        if UUID in self.notify_list:
+            self.logger.warning('Already subscribed to {}'.format(field))
+        else:
+            # resolve the sender once, before notifications start
+            for sender in get_char_senders(self.client, UUID):
+                self.sender_fields[sender] = field
+            await self.client.start_notify(UUID, self.notification_handler)
+            self.notify_list.append(UUID)
+
+    async def unsubscribe(self, field):
+        """Unscubscribe from notifications"""
+        UUID = char_uuid[field]
+        if UUID in self.notify_list:
+            self.logger.info('unsubscribe from {}'.format(field))
+            await self.client.stop_notify(UUID)
+            self.notify_list.remove(UUID)
+
+    def notification_handler(self, sender, data):
+
+        # bleak calls this on the event loop
+        field = self.sender_fields.get(sender, False)
+        if field is False:
+            field = char_handles.get(get_sender_id(sender))
+            self.sender_fields[sender] = field
+        if field:
+            self.notify_queue.put_notify([field, list(data), time.perf_counter()])
+
+    # ----------------------------------------------------------------------
+    # Notifications
+    # ----------------------------------------------------------------------
+    async def enable_notifications(self, notify_list):
+        """Registers for notifications from HEYKUBE"""
+
+        if 'CubeState' in notify_list:
+            await self.subscribe('CubeState')
+        else:
+            # arm the notifications
+            await self.write_cube('Status', [encode_notify_flags(notify_list)])
+            await self.subscribe('Status')
+
+    async def disable_notifications(self):
+        """Disables BTLE notifications"""
+        await self.unsubscribe('CubeState')
+        await self.unsubscribe('Status')
+
+    def parse_notify(self, status_message):
+        """Parses a [field, bytes] notification, and updates the cube for CubeState"""
+        if status_message[0] == 'Status':
+            return parse_status_info(status_message[1][1:6])
+        elif status_message[0] == 'CubeState':
+            self.cube.set_state(status_message[1])
+            return parse_cube_state(status_message[1])
+        return None
+
+    async def notifications(self, timeout=None):
+        """Async iterator of (field, status) notifications
+
+field is 'Status' or 'CubeState'. Stops after timeout seconds without a
+notification, or runs forever if timeout is None"""
+        while True:
+            try:
+                status_message = await asyncio.wait_for(self.notify_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return
+            yield status_message[0], self.parse_notify(status_message)
+
+    def __aiter__(self):
+        return self.notifications()
+
+    async def wait_for_cube_state(self, prev_seq_num=None, timeout=10):
+        """Waits for the next CubeState notification, returns the number of moves and a dict
+with the seq_num and the new moves since prev_seq_num"""
+
+        status_out = dict()
+        num_moves = 0
+
+        # skip other notifications until the timeout
+        end_time = asyncio.get_event_loop().time() + timeout
+        while True:
+            try:
+                status_message = await asyncio.wait_for(self.notify_queue.get(), end_time - asyncio.get_event_loop().time())
+            except asyncio.TimeoutError:
+                break
+            if status_message[0] == 'CubeState':
+                self.cube.set_state(status_message[1])
+                status_out['seq_num'] = status_message[1][11]
+                num_moves, status_out['moves'] = parse_cube_state_moves(status_message[1], prev_seq_num)
+                break
+
+        return num_moves, status_out
+
+    async def wait_for_notify(self, timeout=10):
+        """Waits for the next Status notification, None on timeout"""
+        async for field, status in self.notifications(timeout):
+            if field == 'Status':
+                return status
+        return None
+
+    def clear_notify(self):
+        """ Clear out old notify messages we do not need """
+        while not self.notify_queue.empty():
+            self.notify_queue.get_nowait()
+
+    # ----------------------------------------------------------------------
+    # Reading the cube
+    # ----------------------------------------------------------------------
+    async def read_cube_state(self):
+        y = await self.read_cube('CubeState')
+        self.cube.set_state(y)
+
+        # get data from the cube
+        return parse_cube_state(y)
+
+    async def get_seq_num(self):
+        """Reads the current sequence number from the cube"""
+        return (await self.read_cube_state())['seq_num']
+
+    async def is_solved(self):
+        """Checks if the HEYKUBE is in the solved state"""
+        await self.read_cube_state()
+        return self.cube.is_solved()
+
+    async def read_moves(self, prev_seq_num=None):
+        """Reads up to the last 42 moves from HEYKUBE"""
+        return parse_move_history(await self.read_cube('Moves'), prev_seq_num)
+
+    async def read_version(self):
+        """Reads the current SW version"""
+        return parse_version(await self.read_cube('Version'), disconnect_reasons)
+
+    async def read_status(self):
+        """Reads up to the last 4 status events registered in the HEYKUBE"""
+        return parse_status(await self.read_cube('Status'))
+
+    async def read_instructions(self):
+        """Reads the current list of instructions in HEYKUBE"""
+        return parse_instructions(await self.read_cube('Instructions'))
+
+    async def read_accel(self):
+        """Returns which face is up, along with X,Y and Z acceleration vector"""
+        return parse_accel(await self.read_cube('Accel'))
+
+    async def read_battery(self):
+        """Reads the battery capacity, voltage and charging state"""
+        return parse_battery(await self.read_cube('Battery'))
+
+    # ----------------------------------------------------------------------
+    # Commands to control the cube
+    # ----------------------------------------------------------------------
+    async def initialize(self):
+        """Resets the internal state of the HEYKUBE back to the solved state"""
+        await self.write_cube('CubeState', [0, 0, 0, 0, 0, 0, 0, 0, 0, 8, 0])
+        await self.read_cube_state()
+        self.cube.clear_moves()
+
+    async def write_instructions(self, instr_moves, append=False):
+        """Sends a custom list of instructions from Moves() to the HEYKUBE"""
+        data = encode_instructions(instr_moves, append)
+        if data is None:
+            return False
+        return await self.write_cube('Instructions', data)
+
+    async def append_instructions(self, instr_moves):
+        """Appends more instructions to the instructions queue"""
+        return await self.write_instructions(instr_moves, append=True)
+
+    async def clear_instructions(self):
+        """Clears the instructions queue, and returns to the internal solver"""
+        return await self.write_cube('Instructions', [0x0])
+
+    async def set_match(self, match, enable=True):
+        """Sets the match from the Match object"""
+        return await self.write_cube('MatchState', encode_match(match, enable))
+
+    async def enable_match(self):
+        """Enables the match to fire again since it disable after each match"""
+        return await self.write_cube('MatchState', [1])
+
+    async def disable_match(self):
+        """Disables the match from firing"""
+        return await self.write_cube('MatchState', [0])
+
+    async def enable_pattern(self, pattern):
+        """If HEYKUBE is solved, enables instructions for the specified pattern"""
+        pattern_index = get_pattern_index(pattern)
+        if pattern_index is None:
+            return False
+        return await self.write_cube('Action', [0x08, pattern_index])
+
+    async def send_hint(self, index):
+        """Plays a hint on the faces"""
+        return await self.write_cube('Action', [0x0b, index])
+
+    async def play_sound(self, select=0):
+        """Plays one of the 8 sounds on the HEYKUBE"""
+        return await self.write_cube('Action', [0x06, select & 0x7])
+
+    async def light_led(self, led_index):
+        """Lights one of the LEDs on the cube"""
+        return await self.write_cube('Action', [0x0d, led_index])
+
+    async def turn_off_led(self):
+        """Turns off all the LEDs on the HEYKUBE"""
+        return await self.light_led(36)
+
+    async def flash_all_lights(self):
+        """Flashes all the LEDs on the HEYKUBE"""
+        return await self.write_cube('Action', [0x7, 0x6])
+
+    async def send_prompt(self, index):
+        """Flashes the LEDs on one face"""
+        return await self.write_cube('Action', [0x7, index % 6])
+
+    async def turn_hints_off(self):
+        """Turns hints off on HEYKUBE - they will return once solved"""
+        return await self.write_cube('Action', [0x0a, 0x0])
+
+    async def turn_hints_on(self):
+        """Turns HEYKUBE hints back on"""
+        return await self.write_cube('Action', [0x09, 0x0])
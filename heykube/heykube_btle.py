@@ -15,6 +15,9 @@
 # 
 # ========================================
 from queue import Queue
+from heykube.heykube_transport import heykube_transport, NotifyQueue
+import concurrent.futures
+import itertools
 import time
 import threading
 import asyncio
@@ -22,7 +25,6 @@ import re
 from bleak import BleakClient
 from bleak import BleakScanner
 import logging
-import argparse
 
 # -------------------------------------------------
 # -------------------------------------------------
@@ -30,66 +32,109 @@ import argparse
 # -------------------------------------------------
 # -------------------------------------------------
 
+# Setup device UUID
+heykube_uuid = "b46a791a-8273-4fc1-9e67-94d3dc2aac1c"
+char_uuid = {'Version' :      '5b9009f6-03bf-41aa-87fc-582d8b2bd6b9',
+             'Battery' :      'fd51b3ba-99c7-49c6-9f85-5644ff56a378',
+             'Config' :       'f0ac8d24-6daf-4f47-9953-fd921da215e1',
+             'CubeState' :    'a2f41a4e-0e31-4bbc-9389-4253475481fb',
+             'Status' :       '9bbc2d67-0ba7-4440-aedf-08fb019687f9',
+             'MatchState' :   '982af399-ef78-4eff-b24d-2e1a01aa9f13',
+             'Instructions' : '1379570d-86c6-45a4-8778-f552e7feb290',
+             'Action' :       'e06da2b8-c643-42b1-895b-a5acbbf30afd',
+             'Accel' :        '272a1fe9-058b-402b-8298-7fec5ce7473e',
+             'Moves' :        'F2FF5401-2BC0-415B-A2F1-6549D6CA0AD8'}
+
+# notification handles
+char_handles = {24 : 'Status', 19 : 'CubeState'}
+
+# set BTLE disconnect reasons
+disconnect_reasons = { 0x13 : "Remote User Terminated Connection",
+                       0x10 : "Connection Accept Timeout Exceeded",
+                       0x08 : "Connection timeout"}
+
+def get_char_senders(client, UUID):
+    """Returns the handle and BlueZ path that notifications from the characteristic use as sender"""
+    senders = list()
+    try:
+        char = client.services.get_characteristic(UUID)
+        if char is not None:
+            senders.append(char.handle)
+            if getattr(char, 'path', None):
+                senders.append(char.path)
+    except Exception:
+        pass
+    return senders
+
+def get_sender_id(sender):
+    """Returns the characteristic handle of a notification sender, int or BlueZ path"""
+
+    # Handle both int and characteristics list
+    sender_id = 0
+    if isinstance(sender, int):
+        sender_id = sender
+    else:
+        m = re.search('service000c\/char([0-9A-Fa-f]+)', sender)
+        if m:
+            sender_id = int(m.group(1),16)
+    return sender_id
+
 # HEYKUBE connectivity class
-class heykube_btle():
+class heykube_btle(heykube_transport):
 
     client: BleakClient = None
 
-    def __init__(self):
+    def __init__(self, hub=None, notify_maxsize=256, notify_policy='block'):
+        heykube_transport.__init__(self, notify_maxsize, notify_policy)
         self.logger = logging.getLogger('heykube_btle')
         self.logger.info('Initializing HEYKUBE BTLE class')
 
+        # shared heykube_hub event loop, otherwise each connection runs its own thread
+        self.hub = hub
+        self.thread = None
+        self.connection_future = None
+
         # Device state
-        self.connected = False
         self.connected_device = None
 
         # Setup multiple queues
         self.cmd_queue = Queue()
-        self.read_queue = Queue()
-        self.notify_queue = Queue()
+
+        # notification sender (handle or BlueZ path) to field, filled in at subscribe
+        self.sender_fields = dict(char_handles)
+
+        # Event loop of the connection, and the events that wake it for
+        # new commands and for disconnects
+        self.loop = None
+        self.cmd_event = None
+        self.disconnect_event = None
+        self.connect_future = None
+
+        # Requests waiting in cmd_queue or running, by request id
+        self.request_ids = itertools.count()
+        self.in_flight = dict()
+        self.max_pending_writes = 8
+        self.max_retries = 3
+
+        # seconds to wait after a failed connect, doubled on each retry
+        self.connection_backoff = 0.5
 
         # clear the device
         self.device = None
         self.addr = None
 
         # Setup device UUID
-        self.heykube_uuid = "b46a791a-8273-4fc1-9e67-94d3dc2aac1c"
-        self.char_uuid = {'Version' :      '5b9009f6-03bf-41aa-87fc-582d8b2bd6b9',
-                          'Battery' :      'fd51b3ba-99c7-49c6-9f85-5644ff56a378',
-                          'Config' :       'f0ac8d24-6daf-4f47-9953-fd921da215e1',
-                          'CubeState' :    'a2f41a4e-0e31-4bbc-9389-4253475481fb',
-                          'Status' :       '9bbc2d67-0ba7-4440-aedf-08fb019687f9',
-                          'MatchState' :   '982af399-ef78-4eff-b24d-2e1a01aa9f13',
-                          'Instructions' : '1379570d-86c6-45a4-8778-f552e7feb290',
-                          'Action' :       'e06da2b8-c643-42b1-895b-a5acbbf30afd',
-                          'Accel' :        '272a1fe9-058b-402b-8298-7fec5ce7473e',
-                          'Moves' :        'F2FF5401-2BC0-415B-A2F1-6549D6CA0AD8'}
-
-        self.char_handles = {24 : 'Status', 19 : 'CubeState'}
+        self.heykube_uuid = heykube_uuid
+        self.char_uuid = char_uuid
+        self.char_handles = char_handles
 
         # set BTLE disconnect reasons
-        self.disconnect_reasons = { 0x13 : "Remote User Terminated Connection", 
-                                    0x10 : "Connection Accept Timeout Exceeded",
-                                    0x08 : "Connection timeout"}
+        self.disconnect_reasons = disconnect_reasons
 
 
     # ---------------------------------------------------
     # Public interface
     # --------------------------------------------------
-    def parse_args(self):
-
-        parser = argparse.ArgumentParser(description='Defines the HEYKUBE connection options')
-        parser.add_argument("--verbose", help="increase output verbosity", action="store_true")
-        # 4 different options
-        parser.add_argument('-n', "--name", action='store', help="Directly defines name of a HEYKUBE for connection", type=str)
-        parser.add_argument('-a', "--address", action='store', help="Directly defines an HEYKUBE MAC address for connection", type=str)
-        parser.add_argument('-s', "--scan", help="Scans and reports all the available HEYKUBES", action="store_true")
-        parser.add_argument('-d', "--debug", action='store_true', help="Turns on debug prints")
-        parser.add_argument("--dev-board", action='store_true', help="Turns on the devboard mode with external user input")
-
-        #return parser.parse_args()
-        return parser.parse_known_args()
-
     def scan(self, timeout=5.0):
         """ Scan for HEYKUBE devices """
         # Run the loop for 5 seconds
@@ -156,69 +201,109 @@ class heykube_btle():
     def connect(self, device, timeout=10):
         """ Connect to a HEYKUBE """
 
+        self.connect_future = concurrent.futures.Future()
+
+        # Run the connection on the shared hub loop
+        if self.hub:
+            self.logger.info('Starting connection on the hub')
+            self.loop = self.hub.loop
+            self.connection_future = self.hub.submit(self.run_connection(device))
+            self.connection_future.add_done_callback(lambda f: self.release_requests())
+
         # Start the thread to connect
-        self.logger.info('Starting thread')
-        self.thread = threading.Thread(target=self.connection_thread,args=(device,))
-        self.thread.start()
-
-        # Wait for connection
-        start_time = time.time()
-        while True: 
-            if not self.read_queue.empty():
-                read_resp = self.read_queue.get()
-                #print('read_resp ', read_resp)
-                self.logger.info('read_resp {}'.format(read_resp))
-                if read_resp[0] == 'connected':
-                    return True
-
-            # timeout
-            elif (time.time() - start_time) >= timeout:
-                self.disconnect()
-                while not self.read_queue.empty():
-                    self.read_queue.get()
-                self.logger.error('Timeout in connection after {} seconds, disconnecting'.format(timeout))
-                return False
+        else:
+            self.logger.info('Starting thread')
+            self.thread = threading.Thread(target=self.connection_thread,args=(device,))
+            self.thread.start()
+
+        # Wait for connection, the connection thread resolves the future
+        try:
+            if self.connect_future.result(timeout=timeout):
+                return True
+            self.logger.error('Failed to connect to {}'.format(device.address))
+        except concurrent.futures.TimeoutError:
+            self.disconnect()
+            self.logger.error('Timeout in connection after {} seconds, disconnecting'.format(timeout))
+        return False
 
     def disconnect(self):
         """ Disconnect """
 
         # send the disconnect command
-        self.cmd_queue.put(['disconnect'])
+        self.send_command(['disconnect'])
 
         #print('Waiting for connection thread to finish')
         self.logger.info('Waiting for connection thread to finish')
-        self.thread.join()
+        if self.hub:
+            self.connection_future.result()
+        else:
+            self.thread.join()
         self.logger.info('Done with thread')
 
-    def read_cube(self, field):
+    def read_cube(self, field, timeout=5.0):
 
-        # read the characteristics
-        start_time = time.time()
+        # send the read command, the connection thread resolves the future
+        read_future = self.send_command(['read', field])
 
-        # send the disconnect command
-        self.cmd_queue.put(['read', field])
-
-        while True: 
-            if not self.read_queue.empty():
-                read_resp = self.read_queue.get()
-                self.logger.info('read_resp {}'.format(read_resp))
-                if read_resp[0] == 'read':
-                    return list(read_resp[1])
-            elif (time.time() - start_time) >= 5.0:
-                self.logger.error('ERROR timeout in cube read')
-                return list()
-
-    def write_cube(self, field, data, wait_for_response=True):
-        # send the disconnect command
-        self.cmd_queue.put(['write', field, data])
+        # wait for the GATT response
+        try:
+            read_bytes = list(read_future.result(timeout=timeout))
+            self.logger.info('read_resp {}'.format(read_bytes))
+            self.record('read', field, read_bytes)
+            return read_bytes
+        except concurrent.futures.TimeoutError:
+            # drop the read if it has not started yet
+            read_future.cancel()
+            self.logger.error('ERROR timeout in cube read')
+            return list()
+
+    def write_cube(self, field, data, wait_for_response=True, timeout=5.0):
+        """Writes data to the characteristic field
+
+With wait_for_response, blocks until write_gatt_char completes and returns
+True on success. Otherwise the write is queued and True returns right away"""
+
+        # send the write command
+        self.record('write', field, data)
+        write_future = self.send_command(['write', field, data])
+        if not wait_for_response:
+            return True
+
+        # wait for the transport to finish the write
+        try:
+            return write_future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            write_future.cancel()
+            self.logger.error('ERROR timeout in cube write')
+            return False
 
     def unsubscribe(self, field):
         """Unscubscribe from notifications"""
-        self.cmd_queue.put(['unsubscribe',field])
+        self.send_command(['unsubscribe',field])
 
     def subscribe(self, field):
         """Subscribe to notifications"""
-        self.cmd_queue.put(['subscribe',field])
+        self.send_command(['subscribe',field])
+
+    def send_command(self, cmd):
+        """Queues a command for the connection thread and wakes it up
+
+Returns a concurrent.futures.Future resolved when the command completes"""
+
+        # track the request until it is done
+        request_id = next(self.request_ids)
+        future = concurrent.futures.Future()
+        self.in_flight[request_id] = (cmd, future)
+        future.add_done_callback(lambda f: self.in_flight.pop(request_id, None))
+
+        self.cmd_queue.put((request_id, cmd, future))
+        if self.cmd_event is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.cmd_event.set)
+            except RuntimeError:
+                # loop already closed
+                pass
+        return future
 
     # ---------------------------------------------------
     # Internal code
@@ -226,6 +311,17 @@ class heykube_btle():
     def on_disconnect(self, client: BleakClient):
         self.connected = False
         print('Disconnected from HEYKUBE')
+        try:
+            self.loop.call_soon_threadsafe(self.wake_connection)
+        except RuntimeError:
+            # loop already closed
+            pass
+
+    def wake_connection(self):
+        """Wakes the connection and comms managers after a disconnect"""
+        if self.disconnect_event is not None:
+            self.disconnect_event.set()
+            self.cmd_event.set()
 
     def connection_thread(self, device):
 
@@ -233,32 +329,49 @@ class heykube_btle():
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
 
+        # Run til they are complete
+        self.loop.run_until_complete(self.run_connection(device))
+        self.loop.close()
+
+        self.release_requests()
+
+    async def run_connection(self, device):
+        """Connects to the device and runs its commands until it disconnects"""
+
+        self.cmd_event = asyncio.Event()
+        self.disconnect_event = asyncio.Event()
+
         # setup BLEAK client
         self.client = BleakClient(device.address, loop=self.loop)
         self.connected = False
         self.reconnected = False
         self.disconnected = False
 
-        # Launching the connection thread
-        tasks = []
-
         # run the connections manager
-        futures = asyncio.gather(self.connection_manager(), self.comms_manager())
-
-        # Run til they are complete
-        self.loop.run_until_complete(futures)
+        await asyncio.gather(self.connection_manager(), self.comms_manager())
         self.logger.info('Closing out the connection')
-        self.loop.close()
-        
+        self.cmd_event = None
+        self.disconnect_event = None
+
+    def release_requests(self):
+        """Releases anyone still waiting once the connection is closed"""
+
+        # connection never came up
+        if not self.connect_future.done():
+            self.connect_future.set_result(False)
+
         # Clear the command queue
         while not self.cmd_queue.empty():
             self.cmd_queue.get()
+        for cmd, future in list(self.in_flight.values()):
+            self.fail_request(cmd, future)
 
 
     async def connection_manager(self):
 
         connection_retries = 0
         first_connection = True
+        last_error = None
 
         # ------------------------------------------
         # Keep the connection going
@@ -271,7 +384,8 @@ class heykube_btle():
             if self.disconnected:
                 return
             elif self.connected:
-                await asyncio.sleep(0.1,loop=self.loop)
+                await self.disconnect_event.wait()
+                self.disconnect_event.clear()
             # ------------------------------------------------
             # Bail-out for disconnect
             # ------------------------------------------------
@@ -295,162 +409,204 @@ class heykube_btle():
 
                         # First connection 
                         if first_connection:
-                            self.read_queue.put(['connected'])
+                            self.connect_future.set_result(True)
                             first_connection = False
                         else:
                             self.reconnected = True
+
+                        # start the commands
+                        self.cmd_event.set()
                     else:
                         connection_retries += 1
                         self.logger.error('Failed to connect to {}'.format(self.client))
                 except Exception as e:
-                    #self.logger.error('connection_manager exception: {}'.format(e))
-                    self.logger.error('Trying to reconnect to HEYKUBE')
+                    last_error = e
+                    connection_retries += 1
+                    self.logger.error('Trying to reconnect to HEYKUBE - {}'.format(e))
 
                 if connection_retries >= 3:
-                    self.logger.error('connection_manager exception: {}'.format(e))
+                    if not self.connect_future.done():
+                        self.connect_future.set_result(False)
+                    self.logger.error('Giving up on {} after {} retries, last error: {}'.format(self.client, connection_retries, last_error))
+
+                    # stop the comms manager too
+                    self.disconnected = True
+                    self.cmd_event.set()
                     return
 
+                # back off before the next try
+                if connection_retries:
+                    await asyncio.sleep(self.connection_backoff * 2**(connection_retries-1))
+
     async def comms_manager(self):
-        
 
-        num_tries = 0
-        cmd = [None, None]
         notify_list = list()
-        
+
+        # writes run in order on their own coroutine, up to max_pending_writes queued
+        write_queue = asyncio.Queue(self.max_pending_writes)
+        writer = self.loop.create_task(self.write_manager(write_queue))
+        try:
+            await self.run_commands(notify_list, write_queue)
+        finally:
+            writer.cancel()
+
+    async def run_commands(self, notify_list, write_queue):
+
         # -------------------------------------------------
         # Run the connection
         # -------------------------------------------------
         while True:
 
-            # Run theh command
-            if self.connected:
+            if self.disconnected:
+                return
 
-                # Check if we get a new command
-                if cmd[0] is None:
-                    if not self.cmd_queue.empty():
-                        cmd = self.cmd_queue.get()
-                        self.logger.info('Testing {}'.format(cmd))
-                        num_tries += 1
+            # ------------------------------------
+            # wait for reconnection
+            # ------------------------------------
+            if not self.connected:
+                await self.wait_for_command()
+                continue
+
+            # -------------------------------------
+            # Reconnect subscription
+            # -------------------------------------
+            if self.reconnected:
+                for UUID in notify_list:
+                    try:
+                        await self.client.start_notify(UUID, self.notification_handler)
+                        self.reconnected = False
+                    except Exception as e:
+                        self.logger.exception('comms_manager::resubscribe Failure')
+                        print(e)
 
-                # -------------------------------------
-                # Reconnect subscription
-                # -------------------------------------
-                if self.reconnected:
-                    for UUID in notify_list:
-                        try:
-                            await self.client.start_notify(UUID, self.notification_handler)
-                            self.reconnected = False
-                        except Exception as e:
-                            self.logger.exception('comms_manager::resubscribe Failure')
-                            print(e)
+            # ------------------------------------
+            # wait for next command
+            # ------------------------------------
+            if self.cmd_queue.empty():
+                await self.wait_for_command()
+                continue
+
+            request_id, cmd, future = self.cmd_queue.get()
+            self.logger.info('Request {} - {}'.format(request_id, cmd))
+
+            # skip requests that timed out before they started
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            # -------------------------------------
+            # Pipeline the writes, the writer keeps them in order
+            # -------------------------------------
+            if cmd[0] == 'write':
+                await write_queue.put((request_id, cmd, future))
+                continue
+
+            # everything else sees the writes before it complete
+            await write_queue.join()
+
+            # -------------------------------------
+            # Disconnect
+            # -------------------------------------
+            if cmd[0] == 'disconnect':
+                self.disconnected = True
+                self.disconnect_event.set()
+                await self.client.disconnect()
+                self.client = None
+                future.set_result(True)
+                self.logger.info('Done with disconnect')
+                return
 
-                # -------------------------------------
-                # Disconnect 
-                # -------------------------------------
-                if cmd[0] == 'disconnect':
-                    self.disconnected = True
-                    await self.client.disconnect()
-                    self.client = None
-                    self.logger.info('Done with disconnect')
-                    return
+            await self.run_request(request_id, cmd, future, notify_list)
+
+    async def write_manager(self, write_queue):
+        """Runs the queued writes one at a time, so a write that is retried
+stays ahead of the writes after it"""
+
+        while True:
+            request_id, cmd, future = await write_queue.get()
+            try:
+                await self.run_request(request_id, cmd, future)
+            finally:
+                write_queue.task_done()
+
+    async def run_request(self, request_id, cmd, future, notify_list=None):
+        """Runs one read/write/subscribe request, retrying failures, and resolves its future"""
+
+        UUID = self.char_uuid[cmd[1]]
 
+        for num_tries in range(self.max_retries):
+            try:
                 # -------------------------------------
                 # Read characteristics
                 # -------------------------------------
-                elif cmd[0] == 'read':
-            
-                    UUID = self.char_uuid[cmd[1]]
+                if cmd[0] == 'read':
                     self.logger.info('Reading from {}'.format(cmd[1]))
+                    read_bytes = await self.client.read_gatt_char(UUID)
 
-                    read_bytes = list()
-                    try:
-                        read_bytes = await self.client.read_gatt_char(UUID)
-
-                        # success
-                        if len(read_bytes) > 0:
-                            cmd[0] = None
-                            num_tries = 0
-                            self.logger.info('Sending bytes {}'.format(read_bytes))
-                            self.read_queue.put(['read', read_bytes])
-                        else:
-                            self.logger.error('WHY AM I HERE -- Read did not fail correctly')
+                    # success
+                    if len(read_bytes) > 0:
+                        self.logger.info('Request {} - sending bytes {}'.format(request_id, read_bytes))
+                        future.set_result(read_bytes)
+                        return
+                    self.logger.error('WHY AM I HERE -- Read did not fail correctly')
 
-                    except Exception as e:
-                        self.logger.exception('comms_manager::Read Failure')
-                        print(e)
                 # -------------------------------------
                 # Write characteristics
                 # -------------------------------------
                 elif cmd[0] == 'write':
-                            
-                    # Setup data
-                    UUID = self.char_uuid[cmd[1]]
-                    bytes_to_send = bytearray(cmd[2])
-            
                     self.logger.info('Writing to {}'.format(cmd[1]))
-                    try:
-                        response = False
-                        await self.client.write_gatt_char(UUID, bytes_to_send, response=response)
-                        cmd[0] = None
-                        num_tries = 0
-                        if response:
-                            self.logger.info('Done with write')
-                    except Exception as e:
-                        self.logger.exception('comms_manager::Write Failure')
-                        print(e)
+                    response = False
+                    await self.client.write_gatt_char(UUID, bytearray(cmd[2]), response=response)
+                    future.set_result(True)
+                    return
 
                 # -------------------------------------
                 # Subscribe to characteristics
                 # -------------------------------------
                 elif cmd[0] == 'subscribe':
-                    UUID = self.char_uuid[cmd[1]]
-
                     if UUID in notify_list:
                         self.logger.warning('Already subscribed to {}'.format(cmd[1]))
-                        num_tries = 0
-                        cmd[0] = None
                     else:
-                        try:
-                            await self.client.start_notify(UUID, self.notification_handler)
-                            num_tries = 0
-                            cmd[0] = None
-                            notify_list.append(UUID)
-                        except Exception as e:
-                            self.logger.error('subscribe Failure with {}'.format(e))
+                        # resolve the sender once, before notifications start
+                        for sender in get_char_senders(self.client, UUID):
+                            self.sender_fields[sender] = cmd[1]
+                        await self.client.start_notify(UUID, self.notification_handler)
+                        notify_list.append(UUID)
+                    future.set_result(True)
+                    return
 
                 # -------------------------------------
                 # Unsubscribe if written
                 # -------------------------------------
                 elif cmd[0] == 'unsubscribe':
-                    UUID = self.char_uuid[cmd[1]]
-
-                    # handle unsubcribe
                     if UUID in notify_list:
-                        try:
-                            self.logger.info('unsubscribe from {}'.format(cmd[1]))
-                            await self.client.stop_notify(UUID)
-                            num_tries = 0
-                            cmd[0] = None
-                            notify_list.remove(UUID)
-                        except Exception as e:
-                            self.logger.exception('comms_manager::unsubscribe Failure')
-                            print(e)
-                    # ignore the command
-                    else:
-                        num_tries = 0
-                        cmd[0] = None
-            
-                # ------------------------------------
-                # wait for next command
-                # ------------------------------------
-                else:
-                    await asyncio.sleep(0.1,loop=self.loop)
+                        self.logger.info('unsubscribe from {}'.format(cmd[1]))
+                        await self.client.stop_notify(UUID)
+                        notify_list.remove(UUID)
+                    future.set_result(True)
+                    return
 
-            # ------------------------------------
-            # wait for reconnection
-            # ------------------------------------
+            except Exception as e:
+                self.logger.exception('comms_manager::{} Failure'.format(cmd[0]))
+                print(e)
+
+        self.logger.error('Request {} - {} failed after {} tries'.format(request_id, cmd[0], self.max_retries))
+        self.fail_request(cmd, future)
+
+    def fail_request(self, cmd, future):
+        """Releases the caller of a request that did not complete"""
+        if not future.cancel() and not future.done():
+            if cmd[0] == 'read':
+                future.set_result(bytearray())
             else:
-                await asyncio.sleep(0.1,loop=self.loop)
+                future.set_result(False)
+
+    async def wait_for_command(self, timeout=None):
+        """Sleeps until send_command() queues a new command, a connection change, or the timeout"""
+        try:
+            await asyncio.wait_for(self.cmd_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.cmd_event.clear()
 
     async def cleanup(self):
         self.logger.info('Cleaning up')
@@ -471,23 +627,19 @@ class heykube_btle():
 
     def notification_handler(self, sender: str, data):
 
-        try:
-            self.logger.info('Notification from {}'.format(sender))
+        # receive time, to measure the latency to the caller
+        receive_time = time.perf_counter()
 
-            # Handle both int and characteristics list
-            sender_id = 0
-            if isinstance(sender, int):
-                sender_id = sender
-            else:
-                m = re.search('service000c\/char([0-9A-Fa-f]+)', sender)
-                if m:
-                    sender_id = int(m.group(1),16)
-                    self.logger.info('Convert notification to {}'.format(sender_id))
-
-            #if sender == 20 or sender == 19:
-            if sender_id in self.char_handles:
-                field = self.char_handles[sender_id]
-                self.notify_queue.put([field, list(data)])
+        try:
+            # senders are resolved at subscribe, otherwise parse it once and remember
+            field = self.sender_fields.get(sender, False)
+            if field is False:
+                field = self.char_handles.get(get_sender_id(sender))
+                self.sender_fields[sender] = field
+                self.logger.info('Notification sender {} is {}'.format(sender, field))
+
+            if field:
+                self.notify(field, list(data), receive_time)
 
         except:
             self.logger.exception('Bad notification from {}'.format(sender))
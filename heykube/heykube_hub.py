@@ -0,0 +1,83 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube_btle import heykube_btle
+from heykube.heykube import heykube
+import threading
+import asyncio
+import logging
+
+# -------------------------------------------------
+# -------------------------------------------------
+# Runs many HEYKUBE connections on one event loop
+# -------------------------------------------------
+# -------------------------------------------------
+class heykube_hub():
+    """Runs the BTLE connections of many HEYKUBEs on one shared event loop thread
+
+Each cube keeps its own command and notify queues, but there is only one
+thread for all of them, and it sleeps until a command or notification arrives
+
+    hub = heykube_hub()
+    devices = hub.scan()
+    cubes = [hub.add_cube() for device in devices]
+    for cube, device in zip(cubes, devices):
+        cube.connect(device)
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger('heykube_btle')
+
+        # start the shared loop
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_loop, daemon=True)
+        self.thread.start()
+
+        # connections on the hub
+        self.connections = list()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Runs a coroutine on the hub loop, returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def scan(self, timeout=5.0):
+        """Scan for HEYKUBE devices on the hub loop"""
+        connection = heykube_btle(hub=self)
+        self.submit(connection.scan_run()).result()
+        return connection.scan_devices
+
+    def add_connection(self):
+        """Returns a new heykube_btle connection that runs on the hub"""
+        connection = heykube_btle(hub=self)
+        self.connections.append(connection)
+        return connection
+
+    def add_cube(self):
+        """Returns a new heykube object that connects through the hub"""
+        return heykube(connectivity=self.add_connection())
+
+    def close(self):
+        """Disconnects all the cubes and stops the hub loop"""
+        for connection in self.connections:
+            if connection.connection_future and not connection.connection_future.done():
+                connection.disconnect()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
@@ -0,0 +1,222 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube_transport import heykube_transport
+from heykube.heykube_sim import SimulatedDevice
+from heykube.heykube_btle import char_uuid, disconnect_reasons
+from collections import deque
+from queue import Empty
+import threading
+import struct
+import time
+import os
+import logging
+
+# -------------------------------------------------
+# Session log format
+#
+# A 6-byte file header, then one record per read, write or notification:
+#     timestamp (float64 perf_counter seconds), kind, field index, length
+# followed by the raw field bytes. The field index is the position in
+# char_uuid. Files are only appended to, so one log can hold many sessions.
+# Each session starts with a 'session' record holding the wall clock time,
+# and the perf_counter timestamps are only compared within a session
+# -------------------------------------------------
+log_magic = b'HKLOG\x01'
+log_record = struct.Struct('<dBBB')
+session_start = struct.Struct('<d')
+record_kinds = ['read', 'write', 'notify', 'session']
+record_fields = list(char_uuid)
+
+def read_session_log(file_name):
+    """Yields the (timestamp, kind, field, data) records in a session log
+
+'session' records mark the start of each session, with field None and
+the wall clock start time (time.time()) as data"""
+    with open(file_name, 'rb') as fh:
+        if fh.read(len(log_magic)) != log_magic:
+            raise ValueError('{} is not a HEYKUBE session log'.format(file_name))
+        while True:
+            record = fh.read(log_record.size)
+            if len(record) < log_record.size:
+                break
+            timestamp, kind, field_index, length = log_record.unpack(record)
+            data = fh.read(length)
+            if len(data) < length:
+                break
+            if record_kinds[kind] == 'session':
+                yield timestamp, 'session', None, session_start.unpack(data)[0]
+            else:
+                yield timestamp, record_kinds[kind], record_fields[field_index], list(data)
+
+class SessionRecorder():
+    """Appends the raw reads, writes and notifications of a connection to a session log"""
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.lock = threading.Lock()
+        self.fh = open(file_name, 'ab')
+        if self.fh.tell() == 0:
+            self.fh.write(log_magic)
+        self.num_records = 0
+        self.start_session()
+
+    def start_session(self, timestamp=None):
+        """Marks the start of a session, later timestamps are relative to its clock"""
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        record = log_record.pack(timestamp, record_kinds.index('session'), 0, session_start.size) + session_start.pack(time.time())
+        with self.lock:
+            if not self.fh.closed:
+                self.fh.write(record)
+
+    def write(self, kind, field, data, timestamp=None):
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        record = log_record.pack(timestamp, record_kinds.index(kind), record_fields.index(field), len(data)) + bytes(data)
+        with self.lock:
+            if self.fh.closed:
+                return
+            self.fh.write(record)
+            self.num_records += 1
+
+    def close(self):
+        with self.lock:
+            self.fh.close()
+
+# -------------------------------------------------
+# Replays a session log through heykube
+# -------------------------------------------------
+class heykube_replay(heykube_transport):
+    """Connectivity that plays back a session log
+
+Once connected, the recorded notifications are delivered with their original
+spacing divided by speed, or as fast as possible when speed is None. The
+sessions in the log are played one after the other. Reads
+return the recorded reads of each field in order, and writes are accepted
+and dropped. The notify queue blocks by default so nothing is lost.
+The playback keeps time with clock() and sleep(delay), which tests can replace
+
+    hk = heykube.heykube(heykube.heykube_replay('session.hklog', speed=None))
+    hk.connect(hk.connectivity.device)"""
+
+    def __init__(self, file_name, speed=1.0, notify_maxsize=256, notify_policy='block'):
+        heykube_transport.__init__(self, notify_maxsize, notify_policy)
+        self.logger = logging.getLogger('heykube_replay')
+
+        self.file_name = file_name
+        self.speed = speed
+        self.device = SimulatedDevice('HEYKUBE-REPLAY', os.path.basename(file_name))
+        self.disconnect_reasons = disconnect_reasons
+
+        # recorded reads by field, and the number of sessions and notifications
+        self.reads = dict()
+        self.num_sessions = 0
+        self.num_notify = 0
+        for timestamp, kind, field, data in read_session_log(file_name):
+            if kind == 'session':
+                self.num_sessions += 1
+            elif kind == 'read':
+                self.reads.setdefault(field, deque()).append(data)
+            elif kind == 'notify':
+                self.num_notify += 1
+        self.last_read = dict()
+
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.done_event = threading.Event()
+
+        # playback time, sleep returns True once stopped
+        self.clock = time.perf_counter
+        self.sleep = self.stop_event.wait
+
+    def scan(self, timeout=5.0):
+        return [self.device]
+
+    def get_device(self, args):
+        return self.device
+
+    def is_connected(self):
+        return self.connected
+
+    def connect(self, device=None, timeout=10):
+        """Starts the playback"""
+        self.connected = True
+        self.stop_event.clear()
+        self.done_event.clear()
+        self.thread = threading.Thread(target=self.replay_thread, daemon=True)
+        self.thread.start()
+        return True
+
+    def disconnect(self):
+        self.stop_event.set()
+        if self.thread:
+            # make room, the playback may be blocked on a full queue
+            while self.thread.is_alive():
+                try:
+                    self.notify_queue.get_nowait()
+                except Empty:
+                    pass
+                self.thread.join(0.01)
+            self.thread = None
+        self.connected = False
+
+    def replay_thread(self):
+
+        start_time = None
+        for timestamp, kind, field, data in read_session_log(self.file_name):
+            if self.stop_event.is_set():
+                break
+
+            # each session runs on its own clock, and starts right after the last one
+            if kind == 'session':
+                start_time = self.clock() - timestamp/self.speed if self.speed else None
+                continue
+            if kind != 'notify':
+                continue
+
+            # keep the original spacing
+            if self.speed:
+                if start_time is None:
+                    start_time = self.clock() - timestamp/self.speed
+                delay = start_time + timestamp/self.speed - self.clock()
+                if delay > 0 and self.sleep(delay):
+                    break
+
+            self.notify(field, data, self.clock())
+        self.done_event.set()
+
+    def wait_for_replay(self, timeout=None):
+        """Waits for all the notifications to be delivered, returns True if they were"""
+        return self.done_event.wait(timeout)
+
+    def read_cube(self, field, timeout=5.0):
+        """Returns the next recorded read of the field, or repeats the last one"""
+        if field in self.reads and self.reads[field]:
+            self.last_read[field] = self.reads[field].popleft()
+        if field not in self.last_read:
+            self.logger.error('No {} reads in {}'.format(field, self.file_name))
+            return list()
+        return list(self.last_read[field])
+
+    def write_cube(self, field, data, wait_for_response=True, timeout=5.0):
+        return True
+
+    def subscribe(self, field):
+        pass
+
+    def unsubscribe(self, field):
+        pass
@@ -0,0 +1,350 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube import Cube, Moves, Match, Cube_Color, notify_states, parse_instructions
+from heykube.heykube_transport import heykube_transport
+from heykube.heykube_btle import char_uuid, disconnect_reasons
+from collections import deque
+import threading
+import time
+import logging
+
+# Status flag bits, in notify_states order
+solution_flag = 1 << notify_states.index('solution')
+move_flag = 1 << notify_states.index('move')
+match_flag = 1 << notify_states.index('match')
+instruction_empty_flag = 1 << notify_states.index('instruction_empty')
+
+def pack_move_nibbles(move_list, num_bytes):
+    """Packs the last 2*num_bytes moves 2 per byte, oldest first, padded in front with 0xf"""
+    num_nibbles = 2*num_bytes
+    nibbles = [0xf]*(num_nibbles - len(move_list)) + list(move_list)[-num_nibbles:]
+    return [nibbles[loop1] | (nibbles[loop1+1] << 4) for loop1 in range(0, num_nibbles, 2)]
+
+def decode_match(data):
+    """Returns the Match() packed in the MatchState bytes, the inverse of encode_match()"""
+    match = Match()
+    bits = 0
+    num_bits = 0
+    ptr = 1
+    for loop1 in range(54):
+        if (loop1 % 9) == 4:
+            match.match_state[loop1] = Cube_Color(loop1 // 9)
+            continue
+        if num_bits < 3:
+            bits |= data[ptr] << num_bits
+            num_bits += 8
+            ptr += 1
+        match.match_state[loop1] = Cube_Color(min(bits & 0x7, Cube_Color.DontCare.value))
+        bits >>= 3
+        num_bits -= 3
+    return match
+
+class SimulatedDevice():
+    """Stands in for the bleak BLEDevice of a simulated HEYKUBE"""
+
+    def __init__(self, name='HEYKUBE-SIM', address='00:00:00:00:00:00', rssi=0):
+        self.name = name
+        self.address = address
+        self.rssi = rssi
+
+# -------------------------------------------------
+# In-process simulated HEYKUBE
+# -------------------------------------------------
+class heykube_sim(heykube_transport):
+    """Simulated HEYKUBE connectivity, for tests and benchmarks without a cube
+
+The CubeState, Moves, Status, Instructions and MatchState fields are
+answered from a Cube() model with the same byte formats as the cube.
+play_moves() turns the cube from a background thread at a given rate,
+and sends the CubeState and armed Status notifications for each move
+
+    hk = heykube.heykube(heykube.heykube_sim())
+    hk.connect(hk.get_device())
+    hk.enable_notifications(['CubeState'])
+    hk.connectivity.play_moves(100, rate=20.0)"""
+
+    def __init__(self, device=None, notify_maxsize=256, notify_policy='block'):
+        heykube_transport.__init__(self, notify_maxsize, notify_policy)
+        self.logger = logging.getLogger('heykube_sim')
+
+        if device is None:
+            device = SimulatedDevice()
+        self.device = device
+        self.char_uuid = char_uuid
+        self.disconnect_reasons = disconnect_reasons
+
+        # cube model, guarded by lock since the player thread turns it
+        self.lock = threading.RLock()
+        self.cube = Cube()
+        self.seq_num = 0
+        self.move_history = deque(maxlen=40)
+        self.solved = True
+        self.start_time = time.perf_counter()
+
+        # written by the library
+        self.notify_flags = 0
+        self.instructions = list()
+        self.match = None
+        self.match_enabled = False
+        self.config = [0x18]
+        self.subscribed = set()
+
+        # last 4 Status events, newest first
+        self.status_events = deque(maxlen=4)
+
+        # move player
+        self.player = None
+        self.stop_event = threading.Event()
+
+        self.readers = {'CubeState'    : self.encode_cube_state,
+                        'Moves'        : self.encode_moves,
+                        'Status'       : self.encode_status,
+                        'Instructions' : self.encode_instructions,
+                        'MatchState'   : self.encode_match_state,
+                        'Version'      : lambda: [0, 1, 0x6, 0x13],
+                        'Battery'      : lambda: [0x00, 0x08],
+                        'Accel'        : lambda: [0xc0, 0, 0],
+                        'Config'       : lambda: list(self.config)}
+
+    # ---------------------------------------------------
+    # Transport interface
+    # --------------------------------------------------
+    def scan(self, timeout=5.0):
+        return [self.device]
+
+    def get_device(self, args):
+        if args.name and args.name != self.device.name:
+            self.logger.warning('Did not find {}'.format(args.name))
+            return None
+        if args.address and args.address != self.device.address:
+            self.logger.warning('Did not find {}'.format(args.address))
+            return None
+        return self.device
+
+    def is_connected(self):
+        return self.connected
+
+    def connect(self, device=None, timeout=10):
+        self.connected = True
+        self.logger.info('Connected to {}'.format(self.device.name))
+        return True
+
+    def disconnect(self):
+        self.stop_moves()
+        self.subscribed.clear()
+        self.connected = False
+
+    def read_cube(self, field, timeout=5.0):
+        if not self.connected or field not in self.readers:
+            self.logger.error('Cannot read {}'.format(field))
+            return list()
+        with self.lock:
+            data = self.readers[field]()
+        self.record('read', field, data)
+        return data
+
+    def write_cube(self, field, data, wait_for_response=True, timeout=5.0):
+        if not self.connected:
+            self.logger.error('Cannot write {}, not connected'.format(field))
+            return False
+
+        data = list(data)
+        self.record('write', field, data)
+        with self.lock:
+            if field == 'CubeState':
+                valid_cube, new_state, center_orient = self.cube.decode_state(data)
+                if valid_cube:
+                    self.cube.state = new_state
+                    self.solved = self.cube.is_solved()
+            elif field == 'Status':
+                self.notify_flags = data[0]
+            elif field == 'Instructions':
+                self.write_instructions(data)
+            elif field == 'MatchState':
+                self.match_enabled = bool(data[0])
+                if len(data) > 1:
+                    self.match = decode_match(data)
+            elif field == 'Config':
+                self.config = data
+            elif field != 'Action':
+                self.logger.error('Cannot write {}'.format(field))
+                return False
+        return True
+
+    def subscribe(self, field):
+        self.subscribed.add(field)
+
+    def unsubscribe(self, field):
+        self.subscribed.discard(field)
+
+    # ---------------------------------------------------
+    # Field encoding
+    # --------------------------------------------------
+    def get_timestamp(self):
+        return int((time.perf_counter() - self.start_time) * 512) & 0xffff
+
+    def encode_cube_state(self, timestamp=None):
+        if timestamp is None:
+            timestamp = self.get_timestamp()
+        return self.cube.encode_state() + [self.seq_num] + pack_move_nibbles(self.move_history, 9) + [timestamp & 0xff, timestamp >> 8]
+
+    def encode_moves(self):
+        timestamp = self.get_timestamp()
+        return [self.seq_num] + pack_move_nibbles(self.move_history, 20) + [timestamp & 0xff, timestamp >> 8]
+
+    def encode_status(self):
+        data = [0]
+        for event in self.status_events:
+            data.extend(event)
+        return data + [0]*(21 - len(data))
+
+    def encode_instructions(self):
+        data = [len(self.instructions)]
+        for loop1, move in enumerate(self.instructions):
+            if loop1 & 0x1:
+                data[-1] |= move << 4
+            else:
+                data.append(move)
+        if len(self.instructions) & 0x1:
+            data[-1] |= 0xf0
+        return data
+
+    def encode_match_state(self):
+        if self.match is None:
+            return [int(self.match_enabled)]
+        data = [int(self.match_enabled)]
+        bits = 0
+        num_bits = 0
+        for val in self.match.to_list():
+            bits |= (val & 0x7) << num_bits
+            num_bits += 3
+            if num_bits >= 8:
+                data.append(bits & 0xff)
+                bits >>= 8
+                num_bits -= 8
+        return data
+
+    def write_instructions(self, data):
+        num_inst = data[0] & 0x7f
+        if num_inst == 0:
+            self.instructions = list()
+            return
+        new_instructions = parse_instructions([num_inst] + data[1:]).to_list()
+        if data[0] & 0x80:
+            self.instructions.extend(new_instructions)
+        else:
+            self.instructions = new_instructions
+
+    # ---------------------------------------------------
+    # Turning the cube
+    # --------------------------------------------------
+    def turn(self, move):
+        """Applies one face move (HEYKUBE index) and sends the notifications"""
+
+        with self.lock:
+            self.cube.apply_moves([move])
+            self.cube.clear_moves()
+            self.seq_num = (self.seq_num + 1) & 0xff
+            self.move_history.append(move)
+            timestamp = self.get_timestamp()
+            flags = move_flag
+
+            # follow the instructions
+            if self.instructions and self.instructions[0] == move:
+                self.instructions.pop(0)
+                if not self.instructions:
+                    flags |= instruction_empty_flag
+
+            # solved/scrambled, the stages in between are not simulated
+            solved = self.cube.is_solved()
+            if solved != self.solved:
+                flags |= solution_flag
+                self.solved = solved
+
+            # matches fire once until enabled again
+            if self.match_enabled and self.match is not None and self.cube.test_match(self.match):
+                flags |= match_flag
+                self.match_enabled = False
+
+            # moves are only logged when armed
+            if (flags & ~move_flag) or (flags & self.notify_flags):
+                solution_byte = 0x1c if solved else 0
+                self.status_events.appendleft([flags, solution_byte, self.seq_num, timestamp & 0xff, timestamp >> 8])
+
+            cube_state = self.encode_cube_state(timestamp)
+            status = self.encode_status()
+            notify_status = flags & self.notify_flags
+
+        # notify outside the lock, callbacks may read the cube
+        receive_time = time.perf_counter()
+        if 'CubeState' in self.subscribed:
+            self.notify('CubeState', cube_state, receive_time)
+        if notify_status and 'Status' in self.subscribed:
+            self.notify('Status', status, receive_time)
+
+    def play_moves(self, moves, rate=10.0, wait=False):
+        """Turns the cube through moves at rate moves per second from a background thread
+
+moves is a Moves(), a move string, a list of HEYKUBE indices, or the number
+of random moves to play. Rotations are skipped. A rate of None plays them
+as fast as possible. Returns the player thread, or waits for it if wait is set"""
+
+        if isinstance(moves, int):
+            num_moves = moves
+            moves = Moves()
+            moves.randomize(num_moves)
+        elif isinstance(moves, str):
+            moves = Moves(moves)
+        if isinstance(moves, Moves):
+            moves = moves.to_list()
+        move_list = [move for move in moves if move < 16]
+
+        # one player at a time
+        self.stop_moves()
+        self.stop_event.clear()
+        self.player = threading.Thread(target=self.run_player, args=(move_list, rate), daemon=True)
+        self.player.start()
+        if wait:
+            self.wait_for_moves()
+        return self.player
+
+    def run_player(self, move_list, rate):
+
+        next_time = time.perf_counter()
+        for move in move_list:
+            if rate:
+                next_time += 1.0/rate
+                delay = next_time - time.perf_counter()
+                if delay > 0 and self.stop_event.wait(delay):
+                    break
+            if self.stop_event.is_set():
+                break
+            self.turn(move)
+
+    def wait_for_moves(self, timeout=None):
+        """Waits for play_moves() to finish, returns True if it did"""
+        if self.player:
+            self.player.join(timeout)
+            return not self.player.is_alive()
+        return True
+
+    def stop_moves(self):
+        """Stops play_moves()"""
+        if self.player:
+            self.stop_event.set()
+            self.player.join()
+            self.player = None
@@ -0,0 +1,361 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube_transport import heykube_transport
+from heykube.heykube_sim import heykube_sim, SimulatedDevice
+from heykube.heykube_btle import char_uuid, disconnect_reasons
+from collections import deque
+import concurrent.futures
+import threading
+import asyncio
+import socket
+import struct
+import time
+import logging
+
+# -------------------------------------------------
+# Framing of the characteristic traffic
+#
+# Every message is a 4-byte header (op, field index, payload length)
+# followed by the payload. The field index is the position in char_uuid,
+# and payloads use the HEYKUBE byte formats. Responses come back in request
+# order, and notifications can arrive in between
+# -------------------------------------------------
+socket_fields = list(char_uuid)
+header = struct.Struct('<BBH')
+
+# requests
+op_scan = 1
+op_connect = 2
+op_read = 3
+op_write = 4
+op_write_no_response = 5
+op_subscribe = 6
+op_unsubscribe = 7
+
+# requests the client waits on, the others never get a response or error
+response_ops = [op_scan, op_connect, op_read, op_write]
+
+# from the server
+op_response = 16
+op_error = 17
+op_notify = 18
+
+default_port = 9523
+
+def encode_frame(op, field_index=0, payload=b''):
+    return header.pack(op, field_index, len(payload)) + bytes(payload)
+
+def get_socket_address(address):
+    """Returns the socket family and address, a str is a Unix socket path, otherwise (host, port)"""
+    if isinstance(address, str):
+        return socket.AF_UNIX, address
+    return socket.AF_INET, address
+
+# -------------------------------------------------
+# Server with the simulated cubes
+# -------------------------------------------------
+class heykube_server():
+    """Serves heykube_sim cubes over a local TCP or Unix socket
+
+Each client connects to one cube by name, then reads, writes and subscribes
+to its characteristics like a GATT client. With a rate set, every cube plays
+num_moves random moves at rate moves per second once a client connects.
+Notifications to a client with max_notify_buffer bytes still waiting to be
+sent are dropped, and counted in dropped_notify
+
+    server = heykube_server(num_cubes=64, rate=10.0)
+    server.run(('127.0.0.1', 9523))"""
+
+    def __init__(self, num_cubes=1, rate=None, num_moves=1000):
+        self.logger = logging.getLogger('heykube_server')
+        self.rate = rate
+        self.num_moves = num_moves
+
+        # notifications are forwarded, so the cubes keep a short queue
+        self.cubes = dict()
+        for loop1 in range(num_cubes):
+            device = SimulatedDevice('HEYKUBE-SIM{}'.format(loop1), 'SIM-{}'.format(loop1))
+            self.cubes[device.name] = heykube_sim(device, notify_maxsize=1, notify_policy='drop_oldest')
+
+        # bytes a client can have waiting before its notifications are dropped
+        self.max_notify_buffer = 64*1024
+        self.dropped_notify = 0
+
+        self.loop = None
+        self.server = None
+
+    def run(self, address=('127.0.0.1', default_port)):
+        """Serves until interrupted"""
+        try:
+            asyncio.run(self.serve(address))
+        except KeyboardInterrupt:
+            pass
+
+    async def serve(self, address):
+        self.loop = asyncio.get_running_loop()
+        family, address = get_socket_address(address)
+        if family == socket.AF_UNIX:
+            self.server = await asyncio.start_unix_server(self.handle_client, address)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, address[0], address[1])
+        self.logger.info('Serving {} cubes on {}'.format(len(self.cubes), address))
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def handle_client(self, reader, writer):
+
+        cube = None
+        sock = writer.get_extra_info('socket')
+        if sock is not None and sock.family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # notifications arrive on the player thread
+        def forward_notify(field, data, receive_time):
+            frame = encode_frame(op_notify, socket_fields.index(field), data)
+            self.loop.call_soon_threadsafe(send_notify, frame)
+
+        # a client that does not keep up loses notifications, instead of growing the buffer
+        def send_notify(frame):
+            if writer.transport.is_closing():
+                return
+            if writer.transport.get_write_buffer_size() >= self.max_notify_buffer:
+                self.dropped_notify += 1
+                return
+            writer.write(frame)
+
+        try:
+            while True:
+                op, field_index, length = header.unpack(await reader.readexactly(header.size))
+                payload = await reader.readexactly(length) if length else b''
+
+                if op == op_scan:
+                    writer.write(encode_frame(op_response, 0, '\n'.join(self.cubes).encode()))
+
+                elif op == op_connect:
+                    cube = self.cubes.get(payload.decode())
+                    if cube is None or cube.is_connected():
+                        writer.write(encode_frame(op_error))
+                        cube = None
+                        continue
+                    cube.connect()
+                    cube.notify_callbacks.append(forward_notify)
+                    writer.write(encode_frame(op_response))
+                    if self.rate:
+                        cube.play_moves(self.num_moves, rate=self.rate)
+
+                elif cube is None or field_index >= len(socket_fields):
+                    if op in response_ops:
+                        writer.write(encode_frame(op_error, field_index))
+                    else:
+                        self.logger.error('Dropping op {} for field {}, no cube connected or unknown field'.format(op, field_index))
+
+                elif op == op_read:
+                    data = cube.read_cube(socket_fields[field_index])
+                    writer.write(encode_frame(op_response, field_index, data))
+
+                elif op in [op_write, op_write_no_response]:
+                    success = cube.write_cube(socket_fields[field_index], payload)
+                    if op == op_write:
+                        writer.write(encode_frame(op_response if success else op_error, field_index))
+
+                elif op == op_subscribe:
+                    cube.subscribe(socket_fields[field_index])
+
+                elif op == op_unsubscribe:
+                    cube.unsubscribe(socket_fields[field_index])
+
+                await writer.drain()
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if cube:
+                cube.notify_callbacks.remove(forward_notify)
+                cube.disconnect()
+            writer.close()
+
+# -------------------------------------------------
+# Transport to the server
+# -------------------------------------------------
+class heykube_socket(heykube_transport):
+    """Connectivity to a heykube_server, for load testing on one machine
+
+address is (host, port) for TCP or a path for a Unix socket. Requests can be
+pipelined, and are answered in order by the server"""
+
+    def __init__(self, address=('127.0.0.1', default_port), notify_maxsize=256, notify_policy='block'):
+        heykube_transport.__init__(self, notify_maxsize, notify_policy)
+        self.logger = logging.getLogger('heykube_socket')
+
+        self.address = address
+        self.disconnect_reasons = disconnect_reasons
+        self.char_uuid = char_uuid
+
+        self.sock = None
+        self.thread = None
+        self.device = None
+
+        # futures waiting for a response, in request order
+        self.send_lock = threading.Lock()
+        self.pending = deque()
+
+    def open_socket(self):
+        family, address = get_socket_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.connect(address)
+        if family != socket.AF_UNIX:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def scan(self, timeout=5.0):
+        """Returns the cubes served"""
+        try:
+            sock = self.open_socket()
+        except OSError as err:
+            self.logger.error('Cannot reach the server at {}: {}'.format(self.address, err))
+            return list()
+        with sock, sock.makefile('rb') as fh:
+            sock.settimeout(timeout)
+            sock.sendall(encode_frame(op_scan))
+            op, field_index, length = header.unpack(fh.read(header.size))
+            names = fh.read(length).decode()
+        return [SimulatedDevice(name, 'SIM-{}'.format(loop1)) for loop1, name in enumerate(names.split('\n'))]
+
+    def get_device(self, args):
+        for device in self.scan():
+            if args.name in [None, device.name] and args.address in [None, device.address]:
+                return device
+        self.logger.warning('Did not find a HEYKUBE on {}'.format(self.address))
+        return None
+
+    def is_connected(self):
+        return self.connected
+
+    def connect(self, device, timeout=10):
+        """Connects to the cube named device.name on the server"""
+
+        try:
+            self.sock = self.open_socket()
+        except OSError as err:
+            self.logger.error('Cannot reach the server at {}: {}'.format(self.address, err))
+            return False
+
+        self.device = device
+        self.thread = threading.Thread(target=self.receive_thread, daemon=True)
+        self.thread.start()
+
+        future = self.send_request(op_connect, 0, device.name.encode())
+        try:
+            self.connected = future.result(timeout=timeout) is not None
+        except concurrent.futures.TimeoutError:
+            self.connected = False
+        if not self.connected:
+            self.logger.error('Failed to connect to {}'.format(device.name))
+            self.disconnect()
+        return self.connected
+
+    def disconnect(self):
+        self.connected = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+        if self.thread:
+            self.thread.join()
+        self.sock = None
+        self.thread = None
+
+    def send_request(self, op, field_index, payload=b'', wait_for_response=True):
+        """Sends a request, and returns the Future of the response if there is one"""
+        future = concurrent.futures.Future() if wait_for_response else None
+        with self.send_lock:
+            if future:
+                self.pending.append(future)
+            try:
+                self.sock.sendall(encode_frame(op, field_index, payload))
+            except (OSError, AttributeError):
+                if future:
+                    self.pending.remove(future)
+                    future.set_result(None)
+        return future
+
+    def receive_thread(self):
+        """Matches responses to requests, and passes on the notifications"""
+        try:
+            with self.sock.makefile('rb') as fh:
+                while True:
+                    frame_header = fh.read(header.size)
+                    if len(frame_header) < header.size:
+                        break
+                    op, field_index, length = header.unpack(frame_header)
+                    payload = fh.read(length) if length else b''
+
+                    if op == op_notify:
+                        self.notify(socket_fields[field_index], list(payload), time.perf_counter())
+                    elif self.pending:
+                        # None reports the error
+                        self.pending.popleft().set_result(list(payload) if op == op_response else None)
+        except (OSError, ValueError):
+            pass
+
+        # release anyone still waiting
+        self.connected = False
+        with self.send_lock:
+            while self.pending:
+                self.pending.popleft().set_result(None)
+
+    def read_cube(self, field, timeout=5.0):
+        if not self.connected:
+            self.logger.error('Cannot read {}, not connected'.format(field))
+            return list()
+        future = self.send_request(op_read, socket_fields.index(field))
+        try:
+            data = future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            self.logger.error('ERROR timeout in cube read')
+            return list()
+        if data is None:
+            self.logger.error('Failed to read {}'.format(field))
+            return list()
+        self.record('read', field, data)
+        return data
+
+    def write_cube(self, field, data, wait_for_response=True, timeout=5.0):
+        if not self.connected:
+            self.logger.error('Cannot write {}, not connected'.format(field))
+            return False
+
+        self.record('write', field, data)
+        field_index = socket_fields.index(field)
+        if not wait_for_response:
+            self.send_request(op_write_no_response, field_index, data, wait_for_response=False)
+            return True
+
+        future = self.send_request(op_write, field_index, data)
+        try:
+            return future.result(timeout=timeout) is not None
+        except concurrent.futures.TimeoutError:
+            self.logger.error('ERROR timeout in cube write')
+            return False
+
+    def subscribe(self, field):
+        self.send_request(op_subscribe, socket_fields.index(field), wait_for_response=False)
+
+    def unsubscribe(self, field):
+        self.send_request(op_unsubscribe, socket_fields.index(field), wait_for_response=False)
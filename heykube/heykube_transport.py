@@ -0,0 +1,191 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from queue import Queue
+import logging
+import argparse
+
+# -------------------------------------------------
+# Bounded queue for the notifications
+# -------------------------------------------------
+notify_policies = ['block', 'drop_oldest', 'coalesce']
+
+def make_notify_room(queue, item, policy):
+    """Removes one notification from a full deque of notifications, to make room for item
+
+With 'coalesce', a CubeState item replaces the newest queued CubeState, which
+the caller then appends at the tail so the order holds. Otherwise the oldest
+notification goes. Returns 'coalesced' or 'dropped'"""
+
+    if policy == 'coalesce' and item[0] == 'CubeState':
+        for loop1 in range(len(queue)-1, -1, -1):
+            if queue[loop1][0] == 'CubeState':
+                del queue[loop1]
+                return 'coalesced'
+    queue.popleft()
+    return 'dropped'
+
+class NotifyQueue(Queue):
+    """Bounded queue of [field, data, receive time] notifications
+
+When it is full, the policy picks what happens to a new notification
+    'block'       : the connection waits for room, like Queue()
+    'drop_oldest' : the oldest notification is dropped
+    'coalesce'    : the newest queued CubeState is dropped, since the new
+                    one carries the full state and the last 18 moves.
+                    Otherwise it drops the oldest"""
+
+    policies = notify_policies
+
+    def __init__(self, maxsize=256, policy='block'):
+        Queue.__init__(self, maxsize)
+        if policy not in self.policies:
+            raise ValueError('Notify queue policy must be one of {}'.format(self.policies))
+        self.policy = policy
+
+        # counters
+        self.dropped = 0
+        self.coalesced = 0
+
+    def put(self, item, block=True, timeout=None):
+
+        if self.policy == 'block':
+            return Queue.put(self, item, block, timeout)
+
+        with self.not_full:
+
+            # make room
+            if self.maxsize > 0 and self._qsize() >= self.maxsize:
+                if make_notify_room(self.queue, item, self.policy) == 'coalesced':
+                    self.coalesced += 1
+                else:
+                    self.dropped += 1
+                self.unfinished_tasks -= 1
+
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def get_stats(self):
+        """Returns the queued, dropped and coalesced counts"""
+        return {'queued' : self.qsize(), 'dropped' : self.dropped, 'coalesced' : self.coalesced}
+
+# -------------------------------------------------
+# Interface between heykube and a cube
+# -------------------------------------------------
+class heykube_transport():
+    """Base class for the heykube connectivity
+
+A transport reads and writes the HEYKUBE characteristics by field name
+('CubeState', 'Status', ...) using the raw byte formats, and delivers
+notifications for the subscribed fields with notify(). heykube_btle talks
+to a cube over bleak, heykube_sim answers from a simulated Cube()"""
+
+    def __init__(self, notify_maxsize=256, notify_policy='block'):
+        self.logger = logging.getLogger('heykube')
+
+        # Device state
+        self.connected = False
+
+        # notifications for the caller
+        self.notify_queue = NotifyQueue(notify_maxsize, notify_policy)
+
+        # called with (field, data, receive time) for every notification
+        self.notify_callbacks = list()
+
+        # disconnect reason codes reported in the Version field
+        self.disconnect_reasons = dict()
+
+        # session log, see start_recording()
+        self.recorder = None
+
+    def parse_args(self):
+
+        parser = argparse.ArgumentParser(description='Defines the HEYKUBE connection options')
+        parser.add_argument("--verbose", help="increase output verbosity", action="store_true")
+        # 4 different options
+        parser.add_argument('-n', "--name", action='store', help="Directly defines name of a HEYKUBE for connection", type=str)
+        parser.add_argument('-a', "--address", action='store', help="Directly defines an HEYKUBE MAC address for connection", type=str)
+        parser.add_argument('-s', "--scan", help="Scans and reports all the available HEYKUBES", action="store_true")
+        parser.add_argument('-d', "--debug", action='store_true', help="Turns on debug prints")
+        parser.add_argument("--dev-board", action='store_true', help="Turns on the devboard mode with external user input")
+
+        #return parser.parse_args()
+        return parser.parse_known_args()
+
+    def start_recording(self, file_name):
+        """Appends every read, write and notification to the session log file_name
+
+The log can be played back with heykube_replay"""
+        from heykube.heykube_replay import SessionRecorder
+        self.stop_recording()
+        self.recorder = SessionRecorder(file_name)
+
+    def stop_recording(self):
+        recorder = self.recorder
+        self.recorder = None
+        if recorder:
+            recorder.close()
+
+    def record(self, kind, field, data, timestamp=None):
+        """Adds a 'read', 'write' or 'notify' to the session log, if recording"""
+        recorder = self.recorder
+        if recorder:
+            recorder.write(kind, field, data, timestamp)
+
+    def notify(self, field, data, receive_time):
+        """Passes a notification to the callbacks and the notify queue"""
+        self.record('notify', field, data, receive_time)
+        for callback in self.notify_callbacks:
+            callback(field, data, receive_time)
+        self.notify_queue.put([field, data, receive_time])
+
+    # ---------------------------------------------------
+    # Implemented by each transport
+    # --------------------------------------------------
+    def scan(self, timeout=5.0):
+        """Returns the devices found"""
+        raise NotImplementedError('{} does not implement scan'.format(type(self).__name__))
+
+    def get_device(self, args):
+        """Returns the device picked by the parse_args() options, None if not found"""
+        raise NotImplementedError('{} does not implement get_device'.format(type(self).__name__))
+
+    def is_connected(self):
+        raise NotImplementedError('{} does not implement is_connected'.format(type(self).__name__))
+
+    def connect(self, device, timeout=10):
+        """Connects to the device, returns True on success"""
+        raise NotImplementedError('{} does not implement connect'.format(type(self).__name__))
+
+    def disconnect(self):
+        raise NotImplementedError('{} does not implement disconnect'.format(type(self).__name__))
+
+    def read_cube(self, field, timeout=5.0):
+        """Returns the field bytes as a list, or an empty list on failure"""
+        raise NotImplementedError('{} does not implement read_cube'.format(type(self).__name__))
+
+    def write_cube(self, field, data, wait_for_response=True, timeout=5.0):
+        """Writes data to the field, returns True on success"""
+        raise NotImplementedError('{} does not implement write_cube'.format(type(self).__name__))
+
+    def subscribe(self, field):
+        """Subscribe to notifications"""
+        raise NotImplementedError('{} does not implement subscribe'.format(type(self).__name__))
+
+    def unsubscribe(self, field):
+        """Unsubscribe from notifications"""
+        raise NotImplementedError('{} does not implement unsubscribe'.format(type(self).__name__))
@@ -0,0 +1,181 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube import Cube, Moves
+from heykube.permutation import is_valid_move, compose_moves, identity
+from heykube.cube_batch import CubeBatch
+from collections import OrderedDict
+import logging
+
+# numpy is optional, states are encoded one at a time without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger('heykube')
+
+# -------------------------------------------------------
+# Rebuilds the cube state after every move from streams
+# of move records, in three generator stages
+#
+#   expand_moves  : (session, seq_num, moves, timestamp) records
+#                   -> (session, seq_num, timestamp, move) per new move
+#   apply_moves   : -> (..., move, 54-byte facelet state)
+#   encode_states : -> (..., move, 11-byte CubeState encoding)
+# -------------------------------------------------------
+class MoveIngest():
+    """Reconstructs the cube state after every move of many sessions
+
+Records are (session, seq_num, moves, timestamp) like read_moves() and
+wait_for_cube_state() return, where moves ends with the move numbered
+seq_num. Records of different sessions can be interleaved. A session
+starts solved, and all the moves of its first record are applied.
+
+seq_num is 8 bits, so the new moves in a record are (seq_num - last) & 0xff:
+    0        : the record repeats moves already seen, and is skipped
+    >= 128   : the record is older than the last one, and is skipped
+    > moves  : moves were missed, the ones in the record are applied and
+               the gap is counted, the state is off from there on
+
+Memory is bounded by max_sessions (the least recently seen session is
+dropped) and chunk_size
+
+    ingest = MoveIngest()
+    for session, seq_num, timestamp, move, cstate in ingest.process(records):
+        ..."""
+
+    def __init__(self, max_sessions=4096, chunk_size=4096):
+        self.max_sessions = max_sessions
+        self.chunk_size = chunk_size
+
+        # session -> [last seq_num, facelet state bytes]
+        self.sessions = OrderedDict()
+
+        # counters
+        self.num_records = 0
+        self.num_moves = 0
+        self.duplicates = 0
+        self.stale = 0
+        self.gaps = 0
+        self.missed_moves = 0
+        self.dropped_sessions = 0
+
+    def get_session(self, session):
+        """Returns the [seq_num, state] of a session, None if it has not been seen"""
+        entry = self.sessions.get(session)
+        if entry is not None:
+            self.sessions.move_to_end(session)
+        return entry
+
+    def new_session(self, session, seq_num):
+        entry = [seq_num, identity]
+        self.sessions[session] = entry
+        if len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.dropped_sessions += 1
+        return entry
+
+    def expand_moves(self, records):
+        """Yields (session, seq_num, timestamp, move) for each new move in the records"""
+
+        for session, seq_num, moves, timestamp in records:
+            self.num_records += 1
+            if isinstance(moves, Moves):
+                moves = moves.to_list()
+
+            entry = self.get_session(session)
+            if entry is None:
+                entry = self.new_session(session, seq_num)
+                num_new = len(moves)
+            else:
+                num_new = (seq_num - entry[0]) & 0xff
+                if num_new == 0:
+                    self.duplicates += 1
+                    continue
+                if num_new >= 128:
+                    self.stale += 1
+                    continue
+                if num_new > len(moves):
+                    self.gaps += 1
+                    self.missed_moves += num_new - len(moves)
+                    logger.warning('Session {} missed {} moves before seq_num {}'.format(session, num_new - len(moves), seq_num))
+                    num_new = len(moves)
+            entry[0] = seq_num
+
+            # number the new moves back from seq_num
+            first_seq_num = seq_num - num_new + 1
+            for loop1, move in enumerate(moves[len(moves) - num_new:]):
+                yield session, (first_seq_num + loop1) & 0xff, timestamp, int(move)
+
+    def apply_moves(self, move_stream):
+        """Yields (session, seq_num, timestamp, move, state), state is the 54 facelets as bytes"""
+
+        sessions = self.sessions
+        for session, seq_num, timestamp, move in move_stream:
+            entry = sessions.get(session)
+            if entry is None:
+                entry = self.new_session(session, seq_num)
+
+            # one C-level gather per move
+            if not is_valid_move(move):
+                logger.error('Session {} has an invalid move {}'.format(session, move))
+                continue
+            entry[1] = compose_moves((move,), entry[1])
+            self.num_moves += 1
+            yield session, seq_num, timestamp, move, entry[1]
+
+    def encode_states(self, state_stream):
+        """Yields (session, seq_num, timestamp, move, cstate) with the 11-byte state encoding
+
+With numpy, states are encoded chunk_size at a time with CubeBatch"""
+
+        if np is None:
+            cube = Cube()
+            for session, seq_num, timestamp, move, state in state_stream:
+                cube.state = list(state)
+                yield session, seq_num, timestamp, move, bytes(cube.encode_state())
+            return
+
+        chunk = list()
+        for item in state_stream:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                yield from self.encode_chunk(chunk)
+                chunk = list()
+        if chunk:
+            yield from self.encode_chunk(chunk)
+
+    def encode_chunk(self, chunk):
+        states = np.frombuffer(b''.join(item[4] for item in chunk), dtype=np.uint8)
+        cstates = CubeBatch(states).encode_state()
+        for item, cstate in zip(chunk, cstates):
+            yield item[0], item[1], item[2], item[3], cstate.tobytes()
+
+    def process(self, records, encode=True):
+        """Chains the stages, yields (session, seq_num, timestamp, move, cstate)
+
+With encode=False the 54-byte facelet state is yielded instead of the encoding"""
+        states = self.apply_moves(self.expand_moves(records))
+        if not encode:
+            return states
+        return self.encode_states(states)
+
+    def get_stats(self):
+        """Returns the record, move, duplicate, stale, gap and missed move counts"""
+        return {'records' : self.num_records, 'moves' : self.num_moves, 'duplicates' : self.duplicates,
+                'stale' : self.stale, 'gaps' : self.gaps, 'missed_moves' : self.missed_moves,
+                'sessions' : len(self.sessions), 'dropped_sessions' : self.dropped_sessions}
@@ -0,0 +1,191 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube import Moves, time_step
+from array import array
+import struct
+import sys
+import logging
+
+# numpy is optional, sessions fall back to array()
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger('heykube')
+
+# -------------------------------------------------
+# Columnar move log
+#
+# An 8-byte file header, then one block per session:
+#     name length (uint16), name (utf-8)
+#     start time (float64 s), number of moves (uint32),
+#     time step (float64 s), number of long deltas (uint32)
+#     moves  : 4-bit HEYKUBE move codes, 2 per byte, low nibble first
+#     deltas : time steps since the previous move (the first since the
+#              start time), uint8. 255 marks a long delta
+#     long   : the long deltas in order, little-endian uint32
+# Files are only appended to
+# -------------------------------------------------
+move_log_magic = b'HKMOVES\x01'
+session_name = struct.Struct('<H')
+session_header = struct.Struct('<dIdI')
+long_delta = 0xff
+
+def pack_moves(move_list):
+    """Packs 4-bit move codes 2 per byte, low nibble first, padding with 0xf"""
+    data = bytearray((len(move_list) + 1)//2)
+    for loop1, move in enumerate(move_list):
+        if loop1 & 0x1:
+            data[loop1//2] |= move << 4
+        else:
+            data[loop1//2] = move
+    if len(move_list) & 0x1:
+        data[-1] |= 0xf0
+    return data
+
+def unpack_moves(data, num_moves, use_numpy=True):
+    """Returns the num_moves move codes packed in data, as a numpy uint8 array or array('B')"""
+    if use_numpy and np is not None:
+        packed = np.frombuffer(data, dtype=np.uint8)
+        moves = np.empty(2*len(packed), dtype=np.uint8)
+        moves[0::2] = packed & 0xf
+        moves[1::2] = packed >> 4
+        return moves[:num_moves]
+
+    moves = array('B', bytes(2*len(data)))
+    moves[0::2] = array('B', [val & 0xf for val in data])
+    moves[1::2] = array('B', [val >> 4 for val in data])
+    return moves[:num_moves]
+
+def encode_session(name, moves, timestamps=None, step=time_step, wrapped=False):
+    """Returns the session block for moves, or None if the moves do not fit a nibble
+
+moves is a Moves() or a list of HEYKUBE move indices. timestamps are the
+times of each move in seconds, and should not go backwards. A timestamp
+earlier than the one before it is logged and clamped to it.
+
+With wrapped set, the timestamps are the raw HEYKUBE values that wrap
+around at 128 seconds. A timestamp earlier than the one before it is then
+taken as a wrap, and is read back unwrapped"""
+
+    if isinstance(moves, Moves):
+        moves = moves.to_list()
+    if any(move >= 16 for move in moves):
+        logger.error('Session {} has rotations, only the face moves can be logged'.format(name))
+        return None
+    if timestamps is None:
+        timestamps = [0.0]*len(moves)
+    if len(timestamps) != len(moves):
+        logger.error('Session {} has {} moves but {} timestamps'.format(name, len(moves), len(timestamps)))
+        return None
+
+    # delta-encode the time steps
+    start_time = timestamps[0] if len(timestamps) else 0.0
+    wrap = int(round(128.0/step))
+    deltas = list()
+    offset = 0
+    prev_time = start_time
+    prev_ticks = 0
+    for loop1, timestamp in enumerate(timestamps):
+        if wrapped and timestamp < prev_time:
+            offset += wrap
+        prev_time = timestamp
+        ticks = int(round((timestamp - start_time)/step)) + offset
+        if ticks < prev_ticks:
+            logger.error('Session {} goes back {:.3f} s at move {}, clamping it'.format(name, (prev_ticks - ticks)*step, loop1))
+            ticks = prev_ticks
+        deltas.append(ticks - prev_ticks)
+        prev_ticks = ticks
+
+    # most deltas fit a byte, the rest go in their own column
+    long_deltas = array('I', [delta for delta in deltas if delta >= long_delta])
+    if sys.byteorder == 'big':
+        long_deltas.byteswap()
+    short_deltas = bytes(min(delta, long_delta) for delta in deltas)
+
+    name = name.encode()
+    return (session_name.pack(len(name)) + name +
+            session_header.pack(start_time, len(moves), step, len(long_deltas)) +
+            pack_moves(moves) + short_deltas + long_deltas.tobytes())
+
+class MoveLogWriter():
+    """Appends sessions to a columnar move log file"""
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.fh = open(file_name, 'ab')
+        if self.fh.tell() == 0:
+            self.fh.write(move_log_magic)
+
+    def write_session(self, name, moves, timestamps=None, step=time_step, wrapped=False):
+        """Adds a session, returns True if it was written. See encode_session() for wrapped"""
+        block = encode_session(name, moves, timestamps, step, wrapped)
+        if block is None:
+            return False
+        self.fh.write(block)
+        return True
+
+    def close(self):
+        self.fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def read_move_log(file_name, use_numpy=True):
+    """Yields (name, moves, timestamps) for each session in a move log
+
+moves are the HEYKUBE move codes and timestamps the time of each move in
+seconds, as numpy arrays (uint8 and float64) if numpy is installed and
+use_numpy is set, otherwise array('B') and array('d'). Sessions are read
+one at a time, so memory only grows with the largest session"""
+
+    with open(file_name, 'rb') as fh:
+        if fh.read(len(move_log_magic)) != move_log_magic:
+            raise ValueError('{} is not a HEYKUBE move log'.format(file_name))
+
+        while True:
+            header = fh.read(session_name.size)
+            if len(header) < session_name.size:
+                break
+            name = fh.read(session_name.unpack(header)[0]).decode()
+            start_time, num_moves, step, num_long = session_header.unpack(fh.read(session_header.size))
+
+            moves = unpack_moves(fh.read((num_moves + 1)//2), num_moves, use_numpy)
+            short_deltas = fh.read(num_moves)
+            long_bytes = fh.read(4*num_long)
+
+            # undo the deltas
+            if use_numpy and np is not None:
+                deltas = np.frombuffer(short_deltas, dtype=np.uint8).astype(np.int64)
+                deltas[deltas == long_delta] = np.frombuffer(long_bytes, dtype='<u4')
+                timestamps = start_time + np.cumsum(deltas)*step
+            else:
+                long_deltas = array('I', long_bytes)
+                if sys.byteorder == 'big':
+                    long_deltas.byteswap()
+                long_deltas = iter(long_deltas)
+                timestamps = array('d')
+                ticks = 0
+                for delta in short_deltas:
+                    ticks += next(long_deltas) if delta == long_delta else delta
+                    timestamps.append(start_time + ticks*step)
+
+            yield name, moves, timestamps
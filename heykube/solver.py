@@ -0,0 +1,444 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from heykube.heykube import Cube, Moves, Facelet, encode_perm, decode_perm
+from heykube.heykube import edge_locations, facelet_edge, facelet_edge_orient
+from heykube.heykube import corner_locations, facelet_corner, facelet_corner_orient
+from heykube.table_store import TableStore
+from array import array
+import time
+import logging
+
+logger = logging.getLogger('heykube')
+
+# ---------------------------------------------------------
+# ---------------------------------------------------------
+# Two-phase solver (Kociemba)
+#
+# Phase 1 moves the cube into the subgroup G1 = <U, D, L2, F2, R2, B2>
+# where all the pieces are oriented and the middle-slice edges are in the
+# middle slice. Phase 2 solves the cube using only the G1 moves.
+#
+# The coordinates are the same edge/corner permutations and orientations
+# that Cube.encode_state() uses, with the HEYKUBE edge order
+# UF UR UB UL DF DR DB DL FR FL BR BL, so the slice edges are 8-11
+# ---------------------------------------------------------
+# ---------------------------------------------------------
+
+# Opposite faces in the HEYKUBE order U L F R B D
+opposite_face = [5, 3, 4, 1, 2, 0]
+
+# Phase 1 moves are face*3 + power, power 0 = quarter, 1 = half, 2 = inverse
+num_moves = 18
+
+# Phase 2 moves, as phase 1 move indices
+phase2_moves = [0, 1, 2, 15, 16, 17, 4, 7, 10, 13]
+num_moves2 = len(phase2_moves)
+
+# Coordinate sizes
+num_twist = 2187        # 3^7 corner orientations
+num_flip = 2048         # 2^11 edge orientations
+num_slice = 495         # 12 choose 4 positions of the slice edges
+num_corner = 40320      # 8! corner permutations
+num_ud_edge = 40320     # 8! U/D edge permutations in phase 2
+num_slice_perm = 24     # 4! slice edge permutations in phase 2
+
+# Longest phase 1 search
+max_phase1_length = 12
+
+# ---------------------------------------------------------
+# Cubie level model
+# ---------------------------------------------------------
+def get_cubies(cube):
+    """Returns the (edge perm, edge orient, corner perm, corner orient) lists of a Cube()"""
+    state = cube.state
+    ep = [facelet_edge[state[loc]] for loc in edge_locations]
+    eo = [facelet_edge_orient[state[loc]] for loc in edge_locations]
+    cp = [facelet_corner[state[loc]] for loc in corner_locations]
+    co = [facelet_corner_orient[state[loc]] for loc in corner_locations]
+    return (ep, eo, cp, co)
+
+def multiply_cubies(a, m):
+    """Applies the move cubies m after the cubies a"""
+    ep, eo, cp, co = a
+    mep, meo, mcp, mco = m
+    return ([ep[mep[i]] for i in range(12)],
+            [eo[mep[i]] ^ meo[i] for i in range(12)],
+            [cp[mcp[i]] for i in range(8)],
+            [(co[mcp[i]] + mco[i]) % 3 for i in range(8)])
+
+# Cubies for the 6 quarter face turns
+def build_face_cubies():
+    face_cubies = list()
+    for face in range(6):
+        cube = Cube()
+        cube.apply_moves([face])
+        face_cubies.append(get_cubies(cube))
+    return face_cubies
+
+face_cubies = build_face_cubies()
+
+def apply_solver_move(cubies, move):
+    """Applies a phase 1 move index to the cubies"""
+    face, power = divmod(move, 3)
+    for loop1 in range(power + 1):
+        cubies = multiply_cubies(cubies, face_cubies[face])
+    return cubies
+
+def merge_solver_moves(path, phase2_path):
+    """Joins the phase 1 and phase 2 moves, merging turns of the same face where they meet"""
+    if path and phase2_path and path[-1] // 3 == phase2_path[0] // 3:
+        face = path[-1] // 3
+        quarter_turns = (path[-1] % 3 + phase2_path[0] % 3 + 2) % 4
+        merged = [face*3 + quarter_turns - 1] if quarter_turns else []
+        return path[:-1] + merged + phase2_path[1:]
+    return path + phase2_path
+
+def solver_moves_to_moves(move_list):
+    """Converts the solver moves into HEYKUBE Moves(), half turns are two quarter turns"""
+    moves = Moves()
+    for move in move_list:
+        face, power = divmod(move, 3)
+        if power == 0:
+            moves.add(face)
+        elif power == 1:
+            moves.add(face)
+            moves.add(face)
+        else:
+            moves.add(face | 0x8)
+    return moves
+
+# ---------------------------------------------------------
+# Coordinates
+# ---------------------------------------------------------
+def get_twist(co):
+    twist = 0
+    for i in range(7):
+        twist = 3*twist + co[i]
+    return twist
+
+def set_twist(twist):
+    co = [0]*8
+    for i in range(6, -1, -1):
+        co[i] = twist % 3
+        twist //= 3
+    co[7] = (-sum(co)) % 3
+    return co
+
+def get_flip(eo):
+    flip = 0
+    for i in range(11):
+        flip = 2*flip + eo[i]
+    return flip
+
+def set_flip(flip):
+    eo = [0]*12
+    for i in range(10, -1, -1):
+        eo[i] = flip & 0x1
+        flip >>= 1
+    eo[11] = sum(eo) & 0x1
+    return eo
+
+# binomial[n][k], n choose k for the slice ranking
+binomial = [[0]*5 for loop1 in range(12)]
+for n in range(12):
+    binomial[n][0] = 1
+    for k in range(1, min(n, 4) + 1):
+        binomial[n][k] = binomial[n-1][k-1] + binomial[n-1][k]
+
+def get_slice(ep):
+    """Ranks the positions of the slice edges, 0 when they are in the middle slice"""
+    # counts positions from BL back to UF, so the solved slice is 0
+    r = 0
+    k = 0
+    for i in range(12):
+        if ep[11-i] >= 8:
+            k += 1
+            r += binomial[i][k]
+    return r
+
+def set_slice(r):
+    """Returns an edge permutation with the slice edges in the ranked positions"""
+    ep = [-1]*12
+    k = 4
+    for i in range(11, -1, -1):
+        if k > 0 and binomial[i][k] <= r:
+            r -= binomial[i][k]
+            ep[11-i] = 8 + k - 1
+            k -= 1
+    # fill in the U/D edges
+    other = iter(range(8))
+    return [next(other) if val < 0 else val for val in ep]
+
+# ---------------------------------------------------------
+# Table generation
+# ---------------------------------------------------------
+def build_move_table(num_coords, get_cubies_of, get_coord, moves):
+    """Builds the coordinate move table, table[coord*len(moves) + move]"""
+    table = array('H', [0]*(num_coords*len(moves)))
+    for coord in range(num_coords):
+        cubies = get_cubies_of(coord)
+        for loop1, move in enumerate(moves):
+            table[coord*len(moves) + loop1] = get_coord(apply_solver_move(cubies, move))
+    return table
+
+def build_prune_table(move_a, move_b, size_b, num_coords, num_move):
+    """Breadth first search over the pair of coordinates, returns the distance to solved"""
+    table = bytearray(b'\xff'*num_coords)
+    table[0] = 0
+    frontier = [0]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = list()
+        for index in frontier:
+            a, b = divmod(index, size_b)
+            a *= num_move
+            b *= num_move
+            for move in range(num_move):
+                new_index = move_a[a + move]*size_b + move_b[b + move]
+                if table[new_index] == 0xff:
+                    table[new_index] = depth
+                    next_frontier.append(new_index)
+        frontier = next_frontier
+    return table
+
+# Identity pieces used to build the tables
+solved_ep = list(range(12))
+solved_eo = [0]*12
+solved_cp = list(range(8))
+solved_co = [0]*8
+
+solver_tables = [
+    # name, array type, size, builder
+    ('twist_move',      'H', num_twist*num_moves,
+     lambda t: build_move_table(num_twist, lambda c: (solved_ep, solved_eo, solved_cp, set_twist(c)),
+                                lambda x: get_twist(x[3]), range(num_moves))),
+    ('flip_move',       'H', num_flip*num_moves,
+     lambda t: build_move_table(num_flip, lambda c: (solved_ep, set_flip(c), solved_cp, solved_co),
+                                lambda x: get_flip(x[1]), range(num_moves))),
+    ('slice_move',      'H', num_slice*num_moves,
+     lambda t: build_move_table(num_slice, lambda c: (set_slice(c), solved_eo, solved_cp, solved_co),
+                                lambda x: get_slice(x[0]), range(num_moves))),
+    ('corner_move',     'H', num_corner*num_moves2,
+     lambda t: build_move_table(num_corner, lambda c: (solved_ep, solved_eo, decode_perm(c, 8), solved_co),
+                                lambda x: encode_perm(x[2]), phase2_moves)),
+    ('ud_edge_move',    'H', num_ud_edge*num_moves2,
+     lambda t: build_move_table(num_ud_edge, lambda c: (decode_perm(c, 8) + solved_ep[8:], solved_eo, solved_cp, solved_co),
+                                lambda x: encode_perm(x[0][:8]), phase2_moves)),
+    ('slice_perm_move', 'H', num_slice_perm*num_moves2,
+     lambda t: build_move_table(num_slice_perm, lambda c: (solved_ep[:8] + [8 + val for val in decode_perm(c, 4)], solved_eo, solved_cp, solved_co),
+                                lambda x: encode_perm([val - 8 for val in x[0][8:]]), phase2_moves)),
+    ('twist_slice_prune', 'B', num_twist*num_slice,
+     lambda t: build_prune_table(t['twist_move'], t['slice_move'], num_slice, num_twist*num_slice, num_moves)),
+    ('flip_slice_prune',  'B', num_flip*num_slice,
+     lambda t: build_prune_table(t['flip_move'], t['slice_move'], num_slice, num_flip*num_slice, num_moves)),
+    ('corner_slice_prune',  'B', num_corner*num_slice_perm,
+     lambda t: build_prune_table(t['corner_move'], t['slice_perm_move'], num_slice_perm, num_corner*num_slice_perm, num_moves2)),
+    ('ud_edge_slice_prune', 'B', num_ud_edge*num_slice_perm,
+     lambda t: build_prune_table(t['ud_edge_move'], t['slice_perm_move'], num_slice_perm, num_ud_edge*num_slice_perm, num_moves2)),
+]
+
+def load_tables(table_dir=None):
+    """Maps the solver tables from table_dir, generating and saving any that are missing"""
+
+    store = TableStore(table_dir)
+    tables = dict()
+    for name, typecode, size, builder in solver_tables:
+        # memoryviews index faster than numpy for the scalar lookups in the search
+        tables[name] = store.load(name, typecode, size, lambda: builder(tables), use_numpy=False)
+    return tables
+
+# ---------------------------------------------------------
+# Two phase solver
+# ---------------------------------------------------------
+class Solver():
+    """Two-phase solver for HEYKUBE states
+
+The move and pruning tables are generated the first time and saved under
+~/.heykube/tables (or table_dir), later runs memory-map them from disk"""
+
+    def __init__(self, table_dir=None):
+        self.tables = load_tables(table_dir)
+
+    def solve(self, cube, max_length=24, timeout=10.0, target_length=0):
+        """Returns Moves() that solve the Cube(), with at most max_length face turns
+(half turns count as one). Returns None if no solution is found before the timeout
+
+After the first solution, the search keeps going for shorter ones until the
+timeout, or until one has at most target_length face turns. The solution is
+for the white up, green front orientation, the same frame as the HEYKUBE
+instructions"""
+
+        # work from the white up, green front orientation
+        if [cube.state[loop1*9 + 4] for loop1 in range(6)] != [4, 13, 22, 31, 40, 49]:
+            oriented = Cube()
+            oriented.state = list(cube.state)
+            oriented.reset_orientation()
+            cube = oriented
+
+        # check for a legal state
+        cubies = get_cubies(cube)
+        ep, eo, cp, co = cubies
+        if (-1 in ep) or (-1 in cp) or (sum(eo) % 2) or (sum(co) % 3) or \
+           (encode_perm(ep) < 0) or (encode_perm(cp) < 0) or \
+           (self.perm_parity(ep) != self.perm_parity(cp)):
+            logger.error('Solver - cube state is not solvable')
+            return None
+
+        self.cubies = cubies
+        self.max_length = max_length
+        self.target_length = target_length
+        self.end_time = time.time() + timeout
+        self.solution = None
+
+        # phase 1 coordinates
+        twist = get_twist(co)
+        flip = get_flip(eo)
+        slice_index = get_slice(ep)
+
+        t = self.tables
+        h = max(t['twist_slice_prune'][twist*num_slice + slice_index],
+                t['flip_slice_prune'][flip*num_slice + slice_index])
+
+        # increase the phase 1 depth, each solution lowers max_length
+        for depth in range(h, max_phase1_length + 1):
+            if depth > self.max_length:
+                break
+            if self.phase1(twist, flip, slice_index, depth, -1, list()):
+                break
+            if time.time() > self.end_time:
+                break
+
+        if self.solution is None:
+            logger.error('Solver - no solution within {} moves'.format(max_length))
+            return None
+        return solver_moves_to_moves(self.solution)
+
+    def perm_parity(self, perm):
+        parity = 0
+        for i in range(len(perm)):
+            for j in range(i):
+                if perm[j] > perm[i]:
+                    parity ^= 1
+        return parity
+
+    def phase1(self, twist, flip, slice_index, togo, last_face, path):
+
+        # reached G1, solve phase 2
+        if togo == 0:
+            return self.start_phase2(path)
+
+        if time.time() > self.end_time:
+            return False
+
+        t = self.tables
+        twist_move = t['twist_move']
+        flip_move = t['flip_move']
+        slice_move = t['slice_move']
+        twist_prune = t['twist_slice_prune']
+        flip_prune = t['flip_slice_prune']
+
+        for face in range(6):
+            # skip same face, and only one order of opposite faces
+            if face == last_face or opposite_face[face] == last_face and face < last_face:
+                continue
+            for power in range(3):
+                move = face*3 + power
+
+                new_twist = twist_move[twist*num_moves + move]
+                new_flip = flip_move[flip*num_moves + move]
+                new_slice = slice_move[slice_index*num_moves + move]
+                h = max(twist_prune[new_twist*num_slice + new_slice],
+                        flip_prune[new_flip*num_slice + new_slice])
+
+                # a phase 1 solution that ends early would be found at a shorter depth
+                if h >= togo or (h == 0 and togo > 1):
+                    continue
+
+                path.append(move)
+                if self.phase1(new_twist, new_flip, new_slice, togo - 1, face, path):
+                    return True
+                path.pop()
+
+        return False
+
+    def start_phase2(self, path):
+
+        # apply phase 1 to get the phase 2 coordinates
+        cubies = self.cubies
+        for move in path:
+            cubies = apply_solver_move(cubies, move)
+        ep, eo, cp, co = cubies
+
+        corner = encode_perm(cp)
+        ud_edge = encode_perm(ep[:8])
+        slice_perm = encode_perm([val - 8 for val in ep[8:]])
+
+        t = self.tables
+        h = max(t['corner_slice_prune'][corner*num_slice_perm + slice_perm],
+                t['ud_edge_slice_prune'][ud_edge*num_slice_perm + slice_perm])
+
+        # after a phase 1 quarter turn, phase 2 can start on the same axis,
+        # R then R2 is merged into R'
+        last_face = path[-1] // 3 if path else -1
+        if path and path[-1] % 3 != 1:
+            last_face = -1
+
+        for depth in range(h, self.max_length - len(path) + 1):
+            phase2_path = list()
+            if self.phase2(corner, ud_edge, slice_perm, depth, last_face, phase2_path):
+                solution = merge_solver_moves(path, phase2_path)
+                if len(solution) <= self.max_length:
+                    self.solution = solution
+                    self.max_length = len(solution) - 1
+                    logger.info('Solver - found {} moves'.format(len(solution)))
+
+                # stop once it is short enough
+                return len(solution) <= self.target_length or self.max_length < 0
+        return False
+
+    def phase2(self, corner, ud_edge, slice_perm, togo, last_face, path):
+
+        if togo == 0:
+            return (corner == 0) and (ud_edge == 0) and (slice_perm == 0)
+
+        t = self.tables
+        corner_move = t['corner_move']
+        ud_edge_move = t['ud_edge_move']
+        slice_perm_move = t['slice_perm_move']
+        corner_prune = t['corner_slice_prune']
+        ud_edge_prune = t['ud_edge_slice_prune']
+
+        for loop1, move in enumerate(phase2_moves):
+            face = move // 3
+            if face == last_face or opposite_face[face] == last_face and face < last_face:
+                continue
+
+            new_corner = corner_move[corner*num_moves2 + loop1]
+            new_ud_edge = ud_edge_move[ud_edge*num_moves2 + loop1]
+            new_slice_perm = slice_perm_move[slice_perm*num_moves2 + loop1]
+            h = max(corner_prune[new_corner*num_slice_perm + new_slice_perm],
+                    ud_edge_prune[new_ud_edge*num_slice_perm + new_slice_perm])
+            if h >= togo:
+                continue
+
+            path.append(move)
+            if self.phase2(new_corner, new_ud_edge, new_slice_perm, togo - 1, face, path):
+                return True
+            path.pop()
+
+        return False
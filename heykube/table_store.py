@@ -0,0 +1,100 @@
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+#
+# ========================================
+from array import array
+import os
+import mmap
+import time
+import logging
+
+# numpy is optional, tables fall back to memoryviews
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger('heykube')
+
+def get_table_dir():
+    """Default location of the persisted tables"""
+    return os.path.join(os.path.expanduser('~'), '.heykube', 'tables')
+
+# -------------------------------------------------------
+# Flat binary tables, built once and memory-mapped
+# -------------------------------------------------------
+class TableStore():
+    """Stores coordinate/pruning tables as flat binary files in table_dir
+
+Tables are built once, written to <name>.bin in native byte order, and
+loaded with a read-only mmap. Every process that loads the same table
+shares one copy in the page cache, and loading only maps the file"""
+
+    def __init__(self, table_dir=None):
+
+        if table_dir is None:
+            table_dir = get_table_dir()
+        self.table_dir = table_dir
+        os.makedirs(self.table_dir, exist_ok=True)
+
+        # open maps, by table name
+        self.maps = dict()
+
+    def get_path(self, name):
+        return os.path.join(self.table_dir, name + '.bin')
+
+    def exists(self, name, typecode, size):
+        """True if the table file is on disk with the expected size"""
+        file_name = self.get_path(name)
+        return os.path.exists(file_name) and os.path.getsize(file_name) == size*array(typecode).itemsize
+
+    def save(self, name, table):
+        """Writes the array() table to disk"""
+
+        # write to a temp file and rename, so other processes never map a partial table
+        file_name = self.get_path(name)
+        temp_name = '{}.{}.tmp'.format(file_name, os.getpid())
+        with open(temp_name, 'wb') as fh:
+            table.tofile(fh)
+        os.replace(temp_name, file_name)
+
+    def load(self, name, typecode, size, builder=None, use_numpy=True):
+        """Returns a zero-copy view of the table, building and saving it with builder() if missing
+
+Returns a read-only numpy array if numpy is installed and use_numpy is set,
+otherwise a memoryview cast to the array typecode. Returns None if the table
+is missing and there is no builder"""
+
+        if not self.exists(name, typecode, size):
+            if builder is None:
+                logger.error('Table {} not found in {}'.format(name, self.table_dir))
+                return None
+
+            logger.warning('Generating table {}, this only happens once'.format(name))
+            start_time = time.time()
+            table = builder()
+            if not isinstance(table, array):
+                table = array(typecode, table)
+            self.save(name, table)
+            logger.info('Generated {} in {:.1f} seconds'.format(name, time.time() - start_time))
+
+        # map the file read-only
+        with open(self.get_path(name), 'rb') as fh:
+            table_map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.maps[name] = table_map
+
+        if use_numpy and np is not None:
+            return np.frombuffer(table_map, dtype=np.dtype(typecode))
+        return memoryview(table_map).cast(typecode)
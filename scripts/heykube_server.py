@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# ========================================
+# Copyright 2021 22nd Solutions, LLC
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated 
+# documentation files (the "Software"), to deal in the Software without restriction, including without limitation 
+# the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+# and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO 
+# THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE 
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+# 
+# ========================================
+import heykube
+from heykube.heykube_socket import default_port
+import logging
+import argparse
+
+# Setup logger
+logging.basicConfig()
+logger = logging.getLogger('heykube_server')
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Serves simulated HEYKUBEs on a local socket, for load testing')
+    parser.add_argument('-c', "--cubes", action='store', type=int, default=1, help="Number of simulated cubes")
+    parser.add_argument("--host", action='store', default='127.0.0.1', help="TCP address to listen on")
+    parser.add_argument('-p', "--port", action='store', type=int, default=default_port, help="TCP port to listen on")
+    parser.add_argument('-u', "--unix", action='store', type=str, help="Listens on this Unix socket path instead of TCP")
+    parser.add_argument('-r', "--rate", action='store', type=float, help="Moves per second each cube plays once connected")
+    parser.add_argument('-m', "--moves", action='store', type=int, default=1000, help="Number of random moves each cube plays")
+    parser.add_argument("--verbose", help="increase output verbosity", action="store_true")
+    args = parser.parse_args()
+
+    if args.verbose:
+        logger.setLevel(logging.INFO)
+
+    address = args.unix if args.unix else (args.host, args.port)
+    print('Serving {} simulated HEYKUBEs on {}'.format(args.cubes, address))
+    server = heykube.heykube_server(args.cubes, args.rate, args.moves)
+    server.run(address)
+
+if __name__ == '__main__':
+    main()
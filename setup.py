@@ -13,7 +13,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/pypa/sampleproject",
     packages=setuptools.find_packages(),
-    scripts=['scripts/heykube_cli.py'],
+    scripts=['scripts/heykube_cli.py', 'scripts/heykube_server.py'],
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -23,5 +23,8 @@ setuptools.setup(
     install_requires=[
         'bleak==0.10.0',
         'service_identity'
-    ]
+    ],
+    extras_require={
+        'numpy': ['numpy']
+    }
 )
@@ -0,0 +1,28 @@
+import heykube
+from heykube import CubeKey
+
+def test_round_trip():
+    cube = heykube.Cube()
+    cube.apply_moves("R U2 F' L D B2")
+    key = CubeKey.from_cube(cube)
+    assert key.to_cstate() == cube.encode_state()
+    assert key.to_cube().state == cube.state
+    assert len({key, CubeKey.from_cstate(cube.encode_state())}) == 1
+
+def test_rotated_round_trip():
+    cube = heykube.Cube()
+    cube.apply_moves("R U2 F' x y'")
+    key = CubeKey.from_cube(cube)
+
+    # keyed in the white up, green front orientation
+    oriented = heykube.Cube()
+    oriented.apply_moves("R U2 F'")
+    assert key == CubeKey.from_cube(oriented)
+    assert key.to_cube().state == oriented.state
+
+    # the center orientation bits of a state are kept
+    cstate = oriented.encode_state()
+    cstate[9] |= 0x50
+    cstate[10] = 0x1
+    assert CubeKey.from_cstate(cstate).to_cstate() == cstate
+    assert CubeKey.from_cstate(cstate) != key
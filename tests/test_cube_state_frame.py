@@ -0,0 +1,78 @@
+import heykube
+from heykube.heykube import Cube
+
+def connect():
+    hk = heykube.heykube(heykube.heykube_sim())
+    assert hk.connect(hk.connectivity.device)
+    hk.enable_notifications(['CubeState'])
+    return hk
+
+def read_frames(hk, eager):
+    """Takes the queued CubeState frames, and decodes each one into eager like before"""
+    num_frames = 0
+    while True:
+        notify = hk.get_notify(timeout=0.1)
+        if notify is None:
+            return num_frames
+        if notify[0] == 'CubeState':
+            eager.set_state(notify[1].data)
+            num_frames += 1
+
+def check_cube(hk, eager):
+    assert hk.cube.state == eager.state
+    assert hk.cube.moves == eager.moves
+    assert hk.cube.seq_num == eager.seq_num
+
+def test_lazy_cube_matches_eager():
+    hk = connect()
+    eager = Cube()
+    try:
+        # a few frames, then more than add_frame keeps before folding
+        for num_moves in [5, 100]:
+            hk.connectivity.play_moves(num_moves, rate=None, wait=True)
+            assert read_frames(hk, eager) == num_moves
+            assert len(hk.pending_frames) <= 65
+            check_cube(hk, eager)
+            assert hk.cube.state == hk.connectivity.cube.state
+    finally:
+        hk.disconnect()
+
+def test_lazy_cube_after_clear_notify():
+    hk = connect()
+    eager = Cube()
+    try:
+        hk.connectivity.play_moves(10, rate=None, wait=True)
+        read_frames(hk, eager)
+
+        # dropped notifications are caught up from the moves in the next frame
+        hk.connectivity.play_moves("R U F", rate=None, wait=True)
+        hk.clear_notify()
+        hk.connectivity.play_moves("L D", rate=None, wait=True)
+        assert read_frames(hk, eager) == 2
+        check_cube(hk, eager)
+        assert str(hk.cube.moves).endswith("R U F L D")
+    finally:
+        hk.disconnect()
+
+def test_lazy_cube_after_initialize():
+    hk = connect()
+    try:
+        hk.connectivity.play_moves(20, rate=None, wait=True)
+        for loop1 in range(20):
+            hk.get_notify(timeout=0.1)
+        assert hk.pending_frames
+
+        # back to solved, with the pending frames folded in first
+        hk.initialize()
+        assert not hk.pending_frames
+        assert hk.cube.is_solved()
+        assert len(hk.cube.moves) == 0
+
+        eager = Cube()
+        eager.state = list(hk.cube.state)
+        eager.seq_num = hk.cube.seq_num
+        hk.connectivity.play_moves(30, rate=None, wait=True)
+        read_frames(hk, eager)
+        check_cube(hk, eager)
+    finally:
+        hk.disconnect()
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+from heykube.heykube_async import AsyncHeyKube, AsyncNotifyQueue
+
+def fill(queue, items):
+    async def run():
+        for item in items:
+            queue.put_notify(item)
+        await asyncio.sleep(0)
+        out = list()
+        while not queue.empty():
+            out.append(queue.get_nowait())
+        return out
+    return run()
+
+def test_coalesce_keeps_the_order():
+    async def main():
+        queue = AsyncNotifyQueue(3, 'coalesce')
+        items = [['CubeState', [0], 0], ['Status', [1], 1], ['CubeState', [2], 2],
+                 ['Status', [3], 3], ['CubeState', [4], 4], ['CubeState', [5], 5]]
+        out = await fill(queue, items)
+        assert out == [['Status', [1], 1], ['Status', [3], 3], ['CubeState', [5], 5]]
+        assert queue.get_stats() == {'queued' : 0, 'dropped' : 1, 'coalesced' : 2}
+    asyncio.get_event_loop().run_until_complete(main())
+
+def test_coalesce_only_when_full():
+    async def main():
+        queue = AsyncNotifyQueue(8, 'coalesce')
+        items = [['CubeState', [n], n] for n in range(4)] + [['Status', [1], 4]]
+        assert await fill(queue, items) == items
+        assert queue.coalesced == 0
+    asyncio.get_event_loop().run_until_complete(main())
+
+def test_drop_oldest_is_bounded():
+    async def main():
+        queue = AsyncNotifyQueue(4, 'drop_oldest')
+        out = await fill(queue, [['Status', [n], n] for n in range(10)])
+        assert [item[2] for item in out] == [6, 7, 8, 9]
+        assert queue.get_stats()['dropped'] == 6
+    asyncio.get_event_loop().run_until_complete(main())
+
+def test_block_keeps_everything_in_order():
+    async def main():
+        queue = AsyncNotifyQueue(4, 'block')
+        for n in range(10):
+            queue.put_notify(['Status', [n], n])
+        assert queue.qsize() == 4
+        out = list()
+        for n in range(10):
+            out.append((await asyncio.wait_for(queue.get(), 1))[2])
+        assert out == list(range(10))
+    asyncio.get_event_loop().run_until_complete(main())
+
+def test_block_is_the_default():
+    assert AsyncNotifyQueue().policy == 'block'
+    assert AsyncHeyKube().notify_policy == 'block'
+
+def test_bad_policy():
+    with pytest.raises(ValueError):
+        AsyncHeyKube(notify_policy='unbounded')
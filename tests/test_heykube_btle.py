@@ -0,0 +1,107 @@
+import sys
+import asyncio
+import time
+import heykube
+from heykube.heykube_sim import SimulatedDevice
+
+btle_module = sys.modules['heykube.heykube_btle']
+
+class FailingClient():
+    """BleakClient that never connects"""
+
+    def __init__(self, address, loop=None):
+        self.address = address
+        self.is_connected = False
+        self.attempts = 0
+
+    async def connect(self):
+        self.attempts += 1
+
+    async def disconnect(self):
+        pass
+
+class RaisingClient(FailingClient):
+    """BleakClient whose connect raises, like bleak does when the cube is gone"""
+
+    async def connect(self):
+        self.attempts += 1
+        raise IOError('Device not found')
+
+class FlakyClient():
+    """BleakClient whose first write fails, after a while"""
+
+    def __init__(self, address, loop=None):
+        self.address = address
+        self.is_connected = False
+        self.writes = list()
+        self.failed = False
+
+    async def connect(self):
+        self.is_connected = True
+
+    def set_disconnected_callback(self, callback):
+        pass
+
+    async def write_gatt_char(self, UUID, data, response=False):
+        if not self.failed:
+            self.failed = True
+            await asyncio.sleep(0.05)
+            raise IOError('write failed')
+        self.writes.append(data[0])
+
+    async def disconnect(self):
+        self.is_connected = False
+
+def test_failed_connects_stop_the_thread(monkeypatch):
+    monkeypatch.setattr(btle_module, 'BleakClient', FailingClient)
+
+    connection = heykube.heykube_btle()
+    connection.connection_backoff = 0.01
+    assert not connection.connect(SimulatedDevice(), timeout=5)
+    connection.thread.join(timeout=5)
+
+    assert not connection.thread.is_alive()
+    assert connection.disconnected
+    assert connection.client.attempts == 3
+
+def test_raising_connects_give_up(monkeypatch):
+    monkeypatch.setattr(btle_module, 'BleakClient', RaisingClient)
+
+    connection = heykube.heykube_btle()
+    connection.connection_backoff = 0.01
+    start_time = time.perf_counter()
+    assert not connection.connect(SimulatedDevice(), timeout=5)
+    assert time.perf_counter() - start_time < 2
+    connection.thread.join(timeout=5)
+
+    assert not connection.thread.is_alive()
+    assert connection.disconnected
+    assert connection.client.attempts == 3
+
+def test_failed_connects_stop_on_the_hub(monkeypatch):
+    monkeypatch.setattr(btle_module, 'BleakClient', FailingClient)
+
+    hub = heykube.heykube_hub()
+    try:
+        connection = hub.add_connection()
+        connection.connection_backoff = 0.01
+        assert not connection.connect(SimulatedDevice(), timeout=5)
+
+        # run_connection, and with it the comms manager, has finished
+        connection.connection_future.result(timeout=5)
+        assert connection.disconnected
+    finally:
+        hub.close()
+
+def test_retried_write_stays_in_order(monkeypatch):
+    monkeypatch.setattr(btle_module, 'BleakClient', FlakyClient)
+
+    connection = heykube.heykube_btle()
+    assert connection.connect(SimulatedDevice(), timeout=5)
+    client = connection.client
+    for loop1 in range(5):
+        connection.write_cube('Instructions', [loop1], wait_for_response=False)
+    assert connection.write_cube('Instructions', [5])
+    connection.disconnect()
+
+    assert client.writes == [0, 1, 2, 3, 4, 5]
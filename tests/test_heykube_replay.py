@@ -0,0 +1,52 @@
+import pytest
+import heykube
+from heykube.heykube_replay import SessionRecorder, read_session_log
+
+def write_session(recorder, start, seq_nums):
+    recorder.start_session(start)
+    for loop1, seq_num in enumerate(seq_nums):
+        recorder.write('notify', 'CubeState', [0]*9 + [8, 0, seq_num] + [0]*11, start + 0.02*(loop1 + 1))
+
+class FakeClock():
+    """Playback clock that moves forward when the replay sleeps"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, delay):
+        self.now += delay
+        return False
+
+def test_sessions_replay_on_their_own_clock(tmp_path):
+    file_name = str(tmp_path / 'session.hklog')
+
+    # the second session's clock is behind, the third one hours ahead
+    recorder = SessionRecorder(file_name)
+    write_session(recorder, 1000.0, [1, 2])
+    write_session(recorder, 5.0, [3, 4])
+    write_session(recorder, 50000.0, [5, 6])
+    recorder.close()
+
+    kinds = [record[1] for record in read_session_log(file_name)]
+    assert kinds.count('session') == 4
+
+    replay = heykube.heykube_replay(file_name, speed=2.0)
+    assert replay.num_sessions == 4
+    clock = FakeClock()
+    replay.clock = clock
+    replay.sleep = clock.sleep
+    replay.connect()
+    assert replay.wait_for_replay(timeout=5)
+    replay.disconnect()
+
+    notifications = list()
+    while not replay.notify_queue.empty():
+        notifications.append(replay.notify_queue.get())
+    assert [data[11] for field, data, receive_time in notifications] == [1, 2, 3, 4, 5, 6]
+
+    # 0.02 s apart at half the time, with no gaps between the sessions
+    receive_times = [receive_time for field, data, receive_time in notifications]
+    assert receive_times == pytest.approx([0.01*(loop1 + 1) for loop1 in range(6)])
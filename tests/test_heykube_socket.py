@@ -0,0 +1,56 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+
+from heykube.heykube_socket import heykube_server, encode_frame, header, socket_fields
+from heykube.heykube_socket import op_scan, op_connect, op_read, op_write_no_response, op_subscribe, op_unsubscribe
+from heykube.heykube_socket import op_response, op_error
+
+def read_frame(fh):
+    op, field_index, length = header.unpack(fh.read(header.size))
+    return op, field_index, fh.read(length)
+
+def test_no_error_for_ops_without_response(tmp_path):
+    address = str(tmp_path / 'heykube.sock')
+    server = heykube_server(num_cubes=1)
+    threading.Thread(target=asyncio.run, args=(server.serve(address),), daemon=True).start()
+    for loop1 in range(100):
+        if os.path.exists(address):
+            break
+        time.sleep(0.01)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock, sock.makefile('rb') as fh:
+        sock.settimeout(5)
+        sock.connect(address)
+
+        # no cube connected, only the read and the scan are answered
+        sock.sendall(encode_frame(op_subscribe, 1) + encode_frame(op_write_no_response, 1, b'\x00') +
+                     encode_frame(op_unsubscribe, 1) + encode_frame(op_read, 1) + encode_frame(op_scan))
+        assert read_frame(fh)[:2] == (op_error, 1)
+        op, field_index, payload = read_frame(fh)
+        assert op == op_response
+        assert payload == b'HEYKUBE-SIM0'
+
+def test_slow_client_drops_notifications(tmp_path):
+    address = str(tmp_path / 'heykube.sock')
+    server = heykube_server(num_cubes=1)
+    server.max_notify_buffer = 1024
+    threading.Thread(target=asyncio.run, args=(server.serve(address),), daemon=True).start()
+    for loop1 in range(100):
+        if os.path.exists(address):
+            break
+        time.sleep(0.01)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock, sock.makefile('rb') as fh:
+        sock.settimeout(5)
+        sock.connect(address)
+        sock.sendall(encode_frame(op_connect, 0, b'HEYKUBE-SIM0') + encode_frame(op_subscribe, socket_fields.index('CubeState')))
+        assert read_frame(fh)[0] == op_response
+
+        # never read the notifications while the cube plays
+        cube = server.cubes['HEYKUBE-SIM0']
+        cube.play_moves(50000, rate=None, wait=True)
+        time.sleep(0.1)
+        assert server.dropped_notify > 0
@@ -0,0 +1,35 @@
+from heykube.heykube_transport import NotifyQueue
+
+def drain(queue):
+    out = list()
+    while not queue.empty():
+        out.append(queue.get_nowait())
+    return out
+
+def test_coalesce_only_when_full():
+    queue = NotifyQueue(8, 'coalesce')
+    items = [['CubeState', [0], 0], ['Status', [1], 1], ['CubeState', [2], 2], ['Status', [3], 3]]
+    for item in items:
+        queue.put(item)
+    assert drain(queue) == items
+    assert queue.get_stats() == {'queued' : 0, 'dropped' : 0, 'coalesced' : 0}
+
+def test_coalesce_keeps_the_order():
+    queue = NotifyQueue(3, 'coalesce')
+    for item in [['CubeState', [0], 0], ['Status', [1], 1], ['CubeState', [2], 2],
+                 ['Status', [3], 3], ['CubeState', [4], 4], ['CubeState', [5], 5]]:
+        queue.put(item)
+
+    # the Status notifications stay ahead of the newer CubeState
+    assert drain(queue) == [['Status', [1], 1], ['Status', [3], 3], ['CubeState', [5], 5]]
+    assert queue.get_stats() == {'queued' : 0, 'dropped' : 1, 'coalesced' : 2}
+
+def test_drop_oldest():
+    queue = NotifyQueue(2, 'drop_oldest')
+    for loop1 in range(5):
+        queue.put(['Status', [loop1], loop1])
+    assert [item[2] for item in drain(queue)] == [3, 4]
+    assert queue.dropped == 3
+
+def test_block_is_the_default():
+    assert NotifyQueue().policy == 'block'
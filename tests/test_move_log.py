@@ -0,0 +1,39 @@
+import heykube
+from heykube.move_log import MoveLogWriter, read_move_log
+
+def read_timestamps(file_name):
+    return [list(timestamps) for name, moves, timestamps in read_move_log(file_name, use_numpy=False)]
+
+def test_backwards_timestamps_are_clamped(tmp_path):
+    file_name = str(tmp_path / 'moves.hkmoves')
+    with MoveLogWriter(file_name) as writer:
+        # a little jitter, then a jump back of more than 128 s
+        assert writer.write_session('jitter', [0, 1, 2, 3], [10.0, 11.0, 10.998046875, 12.0])
+        assert writer.write_session('jump', [0, 1, 2], [300.0, 100.0, 301.0])
+
+    jitter, jump = read_timestamps(file_name)
+    assert jitter == [10.0, 11.0, 11.0, 12.0]
+    assert jump == [300.0, 300.0, 301.0]
+
+def test_wrapped_timestamps_are_unwrapped(tmp_path):
+    file_name = str(tmp_path / 'moves.hkmoves')
+    with MoveLogWriter(file_name) as writer:
+        assert writer.write_session('wrapped', [0, 1, 2, 3], [100.0, 127.5, 0.5, 10.0], wrapped=True)
+
+    assert read_timestamps(file_name) == [[100.0, 127.5, 128.5, 138.0]]
+
+def test_round_trip(tmp_path):
+    file_name = str(tmp_path / 'moves.hkmoves')
+    moves = heykube.Moves("R U R' U' F2 D")
+    timestamps = [loop1*0.25 + (600.0 if loop1 > 3 else 0.0) for loop1 in range(len(moves))]
+    with MoveLogWriter(file_name) as writer:
+        writer.write_session('session', moves, timestamps)
+        assert not writer.write_session('rotations', heykube.Moves("x y"))
+
+    for use_numpy in [True, False]:
+        sessions = list(read_move_log(file_name, use_numpy))
+        assert len(sessions) == 1
+        name, logged_moves, logged_timestamps = sessions[0]
+        assert name == 'session'
+        assert list(logged_moves) == moves.to_list()
+        assert list(logged_timestamps) == timestamps
@@ -0,0 +1,26 @@
+import heykube
+from heykube.heykube import Cube
+
+def test_iter_yields_move_indices():
+    moves = heykube.Moves("R U' x2")
+    assert list(moves) == [3, 8, 16, 16]
+    assert all(isinstance(move, int) for move in moves)
+    assert [heykube.Moves.InvFaceRotations[move] for move in moves] == ['R', "U'", 'x', 'x']
+
+def test_reverse():
+    assert str(heykube.Moves("R U F'").reverse()) == "F U' R'"
+    assert str(heykube.Moves("x y' z").reverse()) == "z' y x'"
+
+def test_reverse_undoes_the_moves():
+    moves = heykube.Moves("R u M' x y2 S z' E")
+    cube = Cube()
+    cube.apply_moves(moves)
+    assert not cube.is_solved()
+    cube.apply_moves(moves.reverse())
+    assert cube.is_solved()
+
+def test_absolute():
+    assert heykube.Moves("R U' B").absolute() == ['Re', "Wh'", 'Bl']
+    # x brings green up, and M is x' L' R
+    assert heykube.Moves("x U R' M U").absolute() == ['Gr', "Re'", "Or'", 'Re', 'Wh']
+    assert heykube.Moves("x y z").absolute() == []
@@ -0,0 +1,21 @@
+import pytest
+import heykube
+
+@pytest.fixture(scope='module')
+def solver():
+    # generates the tables under ~/.heykube/tables the first time
+    return heykube.Solver()
+
+@pytest.mark.parametrize('scramble', ["R", "R'", "F2", "U D'", "R U", "L2 B", "R U F", "F R' D2",
+                                      "R U R' U'", "B L' U2 F", "D F2 R' U L"])
+def test_short_scrambles(solver, scramble):
+    cube = heykube.Cube()
+    cube.apply_moves(scramble)
+    solution = solver.solve(cube, timeout=30)
+
+    cube.apply_moves(solution)
+    assert cube.is_solved()
+    assert len(solution) <= len(heykube.Moves(scramble))
+
+def test_solved_cube(solver):
+    assert len(solver.solve(heykube.Cube())) == 0